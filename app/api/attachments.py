@@ -0,0 +1,150 @@
+import os
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import get_db
+from ..models.user import User
+from ..models.note import Note
+from ..models.attachment import NoteAttachment
+from ..schemas.attachment import AttachmentResponse, AttachmentUsage
+from ..services.attachment_service import (
+    blob_store, save_attachment, user_usage, FileTooLargeError, QuotaExceededError
+)
+from ..utils.dependencies import get_current_active_user
+from ..utils.file_response import file_range_response
+
+router = APIRouter()
+
+ALLOWED_TYPES = {value.strip().lower() for value in settings.attachment_allowed_types.split(",") if value.strip()}
+
+def _get_user_note(db: Session, note_id: int, user_id: int) -> Note:
+    note = db.query(Note).filter(Note.id == note_id, Note.user_id == user_id).first()
+    if not note:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Note not found"
+        )
+    return note
+
+def _get_user_attachment(db: Session, attachment_id: int, user_id: int) -> NoteAttachment:
+    attachment = db.query(NoteAttachment).filter(
+        NoteAttachment.id == attachment_id,
+        NoteAttachment.user_id == user_id
+    ).first()
+    if not attachment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attachment not found"
+        )
+    return attachment
+
+@router.post("/notes/{note_id}/attachments", response_model=AttachmentResponse, status_code=status.HTTP_201_CREATED)
+async def upload_attachment(
+    note_id: int,
+    filename: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Anexa um arquivo à anotação. O corpo da requisição é o próprio arquivo
+    (não multipart), com o Content-Type dele; o nome vai em ?filename=.
+    O upload é gravado em disco conforme chega, sem passar pela memória.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in ALLOWED_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="File type not allowed"
+        )
+    
+    declared_size = request.headers.get("content-length")
+    if declared_size and declared_size.isdigit() and int(declared_size) > settings.attachment_max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="File too large"
+        )
+    
+    filename = os.path.basename(filename.replace("\\", "/")).strip()[:255]
+    if not filename:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid filename"
+        )
+    
+    note = _get_user_note(db, note_id, current_user.id)
+    try:
+        return await save_attachment(db, blob_store, note, current_user.id, filename, content_type, request.stream())
+    except FileTooLargeError:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="File too large"
+        )
+    except QuotaExceededError:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Attachment quota exceeded"
+        )
+
+@router.get("/notes/{note_id}/attachments", response_model=List[AttachmentResponse])
+async def get_note_attachments(
+    note_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Lista os anexos de uma anotação"""
+    _get_user_note(db, note_id, current_user.id)
+    return db.query(NoteAttachment).filter(
+        NoteAttachment.note_id == note_id
+    ).order_by(NoteAttachment.created_at.asc(), NoteAttachment.id.asc()).all()
+
+@router.get("/attachments/usage", response_model=AttachmentUsage)
+async def get_attachment_usage(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Espaço usado pelos anexos do usuário e a cota"""
+    return {
+        "used_bytes": user_usage(db, current_user.id),
+        "quota_bytes": settings.attachment_user_quota_bytes
+    }
+
+@router.get("/attachments/{attachment_id}/download")
+async def download_attachment(
+    attachment_id: int,
+    range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Baixa o anexo; aceita Range para retomar downloads e abrir PDFs por partes"""
+    attachment = _get_user_attachment(db, attachment_id, current_user.id)
+    try:
+        return file_range_response(
+            blob_store.path(attachment.blob_sha256),
+            size=attachment.size,
+            media_type=attachment.content_type,
+            filename=attachment.filename,
+            etag=attachment.blob_sha256,
+            range_header=range,
+            if_none_match=if_none_match
+        )
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attachment content not found"
+        )
+
+@router.delete("/attachments/{attachment_id}")
+async def delete_attachment(
+    attachment_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Remove o anexo; o arquivo sai do disco na coleta de órfãos se ninguém mais o usa"""
+    attachment = _get_user_attachment(db, attachment_id, current_user.id)
+    db.delete(attachment)
+    db.commit()
+    
+    return {"message": "Attachment deleted successfully"}
@@ -1,20 +1,21 @@
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..models.user import User, UserSettings
-from ..models.password_reset import PasswordResetToken
 from ..schemas.auth import UserRegister, UserLogin, Token, ForgotPassword, ResetPassword, UserResponse
 from ..utils.security import (
     verify_password, 
     get_password_hash, 
-    create_access_token, 
-    generate_reset_token,
-    create_reset_token_expires
+    create_access_token
 )
 from ..services.email_service import email_service
+from ..services.email_outbox import email_outbox, enqueue_email
+from ..services.auth_throttle import auth_throttle
+from ..services.auth_service import issue_reset_token, consume_reset_token
+from ..services.token_revocation import token_revocations, revoke_token, revoke_all_tokens
+from ..utils.dependencies import get_current_user
 from ..config import settings
-from datetime import datetime
 
 router = APIRouter()
 
@@ -49,8 +50,11 @@ async def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
     return db_user
 
 @router.post("/login", response_model=Token)
-async def login_user(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login_user(user_data: UserLogin, request: Request, db: Session = Depends(get_db)):
     """Faz login do usuário"""
+    # Antes do banco e do bcrypt: tentativas em excesso custam quase nada
+    auth_throttle.check("login", request.client.host if request.client else None, user_data.email)
+    
     user = db.query(User).filter(User.email == user_data.email).first()
     
     if not user or not verify_password(user_data.password, user.password_hash):
@@ -66,52 +70,81 @@ async def login_user(user_data: UserLogin, db: Session = Depends(get_db)):
             detail="Inactive user"
         )
     
+    auth_throttle.reset_email("login", user_data.email)
+    
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "uid": user.id, "ver": user.token_version or 0},
+        expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
+@router.post("/logout")
+async def logout(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Revoga o token usado nesta requisição"""
+    claims = request.state.token_claims
+    if claims.get("jti"):
+        revocation = revoke_token(db, current_user.id, claims["jti"], datetime.utcfromtimestamp(claims["exp"]))
+    else:
+        # Tokens emitidos antes do jti só podem ser revogados todos juntos
+        revocation = revoke_all_tokens(db, current_user)
+    db.commit()
+    token_revocations.apply(revocation)
+    
+    return {"message": "Logged out"}
+
+@router.post("/logout-all")
+async def logout_all(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Revoga todos os tokens do usuário (todos os dispositivos)"""
+    revocation = revoke_all_tokens(db, current_user)
+    db.commit()
+    token_revocations.apply(revocation)
+    
+    return {"message": "Logged out from all devices"}
+
 @router.post("/forgot-password")
-async def forgot_password(data: ForgotPassword, db: Session = Depends(get_db)):
+async def forgot_password(data: ForgotPassword, request: Request, db: Session = Depends(get_db)):
     """Solicita reset de senha"""
+    auth_throttle.check("forgot_password", request.client.host if request.client else None, data.email)
+    
     user = db.query(User).filter(User.email == data.email).first()
     if not user:
         # Não revela se o email existe ou não por segurança
         return {"message": "If this email exists, you will receive a reset link"}
     
-    # Gera token de reset
-    reset_token = generate_reset_token()
-    expires_at = create_reset_token_expires()
+    # Gera token de reset (só o hash é salvo) e invalida os anteriores
+    reset_token, _ = issue_reset_token(db, user.id)
     
-    # Salva token no banco
-    db_token = PasswordResetToken(
-        user_id=user.id,
-        token=reset_token,
-        expires_at=expires_at
-    )
-    db.add(db_token)
-    db.commit()
-    
-    # Envia email
-    await email_service.send_password_reset_email(
+    # Email vai para a outbox na mesma transação; o envio acontece em segundo plano
+    enqueue_email(
+        db,
+        kind="password_reset",
         to_email=user.email,
-        reset_token=reset_token,
-        user_name=user.name
+        rendered=email_service.render_password_reset_email(
+            reset_token,
+            user.name,
+            locale=user.settings.locale if user.settings else None
+        ),
+        user_id=user.id
     )
+    db.commit()
+    email_outbox.wake()
     
     return {"message": "If this email exists, you will receive a reset link"}
 
 @router.post("/reset-password")
 async def reset_password(data: ResetPassword, db: Session = Depends(get_db)):
     """Redefine senha usando token"""
-    # Busca token válido
-    token_record = db.query(PasswordResetToken).filter(
-        PasswordResetToken.token == data.token,
-        PasswordResetToken.used == False,
-        PasswordResetToken.expires_at > datetime.utcnow()
-    ).first()
+    # Busca token válido e já o marca como usado
+    token_record = consume_reset_token(db, data.token)
     
     if not token_record:
         raise HTTPException(
@@ -130,9 +163,9 @@ async def reset_password(data: ResetPassword, db: Session = Depends(get_db)):
     # Atualiza senha
     user.password_hash = get_password_hash(data.new_password)
     
-    # Marca token como usado
-    token_record.used = True
-    
+    # Sessões abertas com a senha antiga deixam de valer
+    revocation = revoke_all_tokens(db, user)
     db.commit()
+    token_revocations.apply(revocation)
     
     return {"message": "Password updated successfully"}
\ No newline at end of file
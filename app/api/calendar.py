@@ -10,6 +10,7 @@ from ..schemas.calendar_event import (
     CalendarEventCreate, CalendarEventUpdate, CalendarEventResponse, 
     CalendarEventWithDetails, EventTypeResponse
 )
+from ..services.event_broker import event_broker
 from ..utils.dependencies import get_current_active_user
 
 router = APIRouter()
@@ -117,6 +118,7 @@ async def create_calendar_event(
     db.add(db_event)
     db.commit()
     db.refresh(db_event)
+    event_broker.publish(current_user.id, "calendar_event.created", id=db_event.id, event_date=db_event.event_date)
     
     return db_event
 
@@ -166,8 +168,13 @@ async def update_calendar_event(
     for field, value in update_data.items():
         setattr(db_event, field, value)
     
+    # Evento remarcado: o lembrete precisa ser enviado de novo
+    if 'event_date' in update_data or 'reminder_days' in update_data:
+        db_event.reminder_sent = False
+    
     db.commit()
     db.refresh(db_event)
+    event_broker.publish(current_user.id, "calendar_event.updated", id=db_event.id, event_date=db_event.event_date)
     
     return db_event
 
@@ -191,5 +198,6 @@ async def delete_calendar_event(
     
     db.delete(db_event)
     db.commit()
+    event_broker.publish(current_user.id, "calendar_event.deleted", id=event_id)
     
     return {"message": "Event deleted successfully"}
\ No newline at end of file
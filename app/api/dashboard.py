@@ -0,0 +1,87 @@
+from datetime import date
+from typing import List
+from fastapi import APIRouter, Depends
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import get_db
+from ..models.user import User, EventType
+from ..models.subject import Subject
+from ..models.note import Note
+from ..models.calendar_event import CalendarEvent
+from ..schemas.dashboard import DashboardResponse
+from ..utils.dependencies import get_current_active_user
+
+router = APIRouter()
+
+def subjects_with_note_counts(db: Session, user_id: int) -> List[dict]:
+    """Matérias com a quantidade de anotações, num único SELECT com GROUP BY"""
+    counts = db.query(
+        Note.subject_id.label("subject_id"),
+        func.count(Note.id).label("note_count")
+    ).filter(Note.user_id == user_id).group_by(Note.subject_id).subquery()
+
+    rows = db.query(Subject, func.coalesce(counts.c.note_count, 0)).outerjoin(
+        counts, counts.c.subject_id == Subject.id
+    ).filter(Subject.user_id == user_id).order_by(Subject.period.asc(), Subject.name.asc()).all()
+
+    return [
+        {
+            "id": subject.id,
+            "name": subject.name,
+            "period": subject.period,
+            "color": subject.color,
+            "user_id": subject.user_id,
+            "created_at": subject.created_at,
+            "updated_at": subject.updated_at,
+            "note_count": note_count
+        }
+        for subject, note_count in rows
+    ]
+
+def recent_notes(db: Session, user_id: int, limit: int) -> List[dict]:
+    """Últimas anotações editadas; só colunas leves, sem o conteúdo"""
+    rows = db.query(Note.id, Note.title, Note.subject_id, Note.updated_at).filter(
+        Note.user_id == user_id
+    ).order_by(Note.updated_at.desc(), Note.id.desc()).limit(limit).all()
+    return [row._asdict() for row in rows]
+
+def upcoming_events(db: Session, user_id: int, today: date, limit: int) -> List[dict]:
+    """Próximos eventos com nome do tipo e da matéria, num único SELECT com JOIN"""
+    rows = db.query(
+        CalendarEvent.id,
+        CalendarEvent.title,
+        CalendarEvent.event_date,
+        CalendarEvent.event_time,
+        CalendarEvent.event_type_id,
+        EventType.name.label("event_type_name"),
+        EventType.color.label("event_type_color"),
+        CalendarEvent.subject_id,
+        Subject.name.label("subject_name")
+    ).join(
+        EventType, EventType.id == CalendarEvent.event_type_id
+    ).outerjoin(
+        Subject, Subject.id == CalendarEvent.subject_id
+    ).filter(
+        CalendarEvent.user_id == user_id,
+        CalendarEvent.event_date >= today
+    ).order_by(CalendarEvent.event_date.asc(), CalendarEvent.event_time.asc()).limit(limit).all()
+    return [row._asdict() for row in rows]
+
+@router.get("", response_model=DashboardResponse)
+async def get_dashboard(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Dados da tela inicial numa requisição só: matérias com contagem de
+    anotações, últimas anotações e próximos eventos. As três consultas são
+    rápidas e usam a sessão da requisição, em sequência: uma sessão por
+    consulta prenderia quatro conexões do pool por requisição.
+    """
+    return {
+        "user": current_user,
+        "subjects": subjects_with_note_counts(db, current_user.id),
+        "recent_notes": recent_notes(db, current_user.id, settings.dashboard_recent_notes),
+        "upcoming_events": upcoming_events(db, current_user.id, date.today(), settings.dashboard_upcoming_events)
+    }
@@ -0,0 +1,135 @@
+import asyncio
+import json
+from typing import Optional, Tuple
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.websockets import WebSocketState
+from ..database import SessionLocal
+from ..services.event_broker import (
+    event_broker, ConnectionLimitError, Subscription, PING, READY
+)
+from ..utils.dependencies import authenticate_token
+
+router = APIRouter()
+
+SSE_RETRY_MS = 5000
+WS_PING = json.dumps({"type": "ping"})
+
+def _request_token(authorization: Optional[str], access_token: Optional[str]) -> Optional[str]:
+    """
+    Token do cabeçalho Authorization ou de ?access_token=. EventSource e
+    WebSocket do navegador não enviam cabeçalhos; os logs de acesso só
+    registram o caminho, sem a query string.
+    """
+    if authorization and authorization.lower().startswith("bearer "):
+        return authorization[7:].strip()
+    return access_token
+
+def _authenticate(token: Optional[str]) -> Optional[Tuple[int, dict]]:
+    """
+    Autentica com uma sessão própria, fechada antes de a conexão ficar
+    aberta: com get_db a conexão do pool ficaria presa enquanto o cliente
+    estivesse conectado.
+    """
+    if not token:
+        return None
+    db = SessionLocal()
+    try:
+        authenticated = authenticate_token(db, token)
+        if authenticated is None or not authenticated[0].is_active:
+            return None
+        user, claims = authenticated
+        return user.id, claims
+    finally:
+        db.close()
+
+async def _sse_messages(subscription: Subscription):
+    try:
+        yield f"retry: {SSE_RETRY_MS}\ndata: {READY}\n\n"
+        while True:
+            message = await subscription.next()
+            if message is None:
+                return
+            # Comentário SSE: mantém a conexão viva e o EventSource o ignora
+            yield ": ping\n\n" if message is PING else f"data: {message}\n\n"
+    finally:
+        event_broker.unsubscribe(subscription)
+
+@router.get("/stream")
+async def stream_events(request: Request, access_token: Optional[str] = None):
+    """
+    Alterações nas matérias, anotações e eventos do calendário do usuário,
+    como Server-Sent Events. Cada mensagem é um JSON pequeno
+    ({"type": "note.updated", "id": 7, ...}); "resync" e "ready" pedem que o
+    cliente busque as listas de novo.
+    """
+    authenticated = _authenticate(_request_token(request.headers.get("authorization"), access_token))
+    if authenticated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    user_id, claims = authenticated
+    request.state.user_id = user_id
+    try:
+        subscription = event_broker.subscribe(user_id, claims, "sse")
+    except ConnectionLimitError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS if exc.per_user else status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many event connections"
+        )
+
+    return StreamingResponse(
+        _sse_messages(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Se o cliente cair antes da primeira mensagem o gerador nem começa
+        background=BackgroundTask(event_broker.unsubscribe, subscription)
+    )
+
+async def _watch_disconnect(websocket: WebSocket, subscription: Subscription):
+    """Lê (e descarta) o que o cliente mandar, para perceber quando ele sai"""
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+    finally:
+        subscription.close()
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, access_token: Optional[str] = None):
+    """As mesmas mensagens do /stream, por WebSocket"""
+    authenticated = _authenticate(_request_token(websocket.headers.get("authorization"), access_token))
+    if authenticated is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    user_id, claims = authenticated
+    try:
+        subscription = event_broker.subscribe(user_id, claims, "websocket")
+    except ConnectionLimitError:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    watcher = None
+    try:
+        await websocket.accept()
+        await websocket.send_text(READY)
+        watcher = asyncio.create_task(_watch_disconnect(websocket, subscription))
+        while True:
+            message = await subscription.next()
+            if message is None:
+                break
+            await websocket.send_text(WS_PING if message is PING else message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        event_broker.unsubscribe(subscription)
+        if watcher is not None:
+            watcher.cancel()
+        if websocket.client_state == WebSocketState.CONNECTED and websocket.application_state == WebSocketState.CONNECTED:
+            await websocket.close()
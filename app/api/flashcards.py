@@ -1,21 +1,42 @@
-from typing import List
+from typing import List, Optional
+from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session, selectinload
 from pydantic import BaseModel
-import httpx
 import json
+import logging
+from contextlib import aclosing
 from ..database import get_db
 from ..models.user import User
+from ..models.subject import Subject
+from ..models.note import Note
+from ..models.flashcard import FlashcardDeck, FlashcardCard
+from ..models.flashcard_job import FlashcardJob
+from ..schemas.flashcard import (
+    FlashcardDeckCreate, FlashcardDeckResponse, FlashcardDeckWithCards,
+    FlashcardCardResponse, FlashcardReviewBatch, FlashcardReviewResult,
+    FlashcardJobResponse
+)
+from ..services.srs_service import ReviewState, schedule_review
 from ..utils.dependencies import get_current_active_user
 from ..config import settings
+from ..services import flashcard_service
+from ..services.flashcard_cache import flashcard_cache
+from ..services.flashcard_jobs import flashcard_job_queue, QUEUED, RUNNING
+from ..services.llm_client import llm_client, LLMError, LLMUnavailableError
+from ..utils.json_stream import JSONArrayStreamParser
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Schemas
 class FlashcardRequest(BaseModel):
     subject: str
     topic: str = ""
     count: int = 20
+    regenerate: bool = False  # ignora o cache e gera um conjunto novo
     
     class Config:
         json_schema_extra = {
@@ -33,111 +54,53 @@ class Flashcard(BaseModel):
 class FlashcardResponse(BaseModel):
     subject: str
     flashcards: List[Flashcard]
+    cached: bool = False
+
+class FlashcardNotesRequest(BaseModel):
+    subject_id: int
+    note_ids: Optional[List[int]] = None  # vazio usa todas as anotações da matéria
+    cards_per_chunk: int = 10
+    max_cards: int = 100
+
+class FlashcardNotesResponse(FlashcardResponse):
+    chunk_count: int
+    cached_chunk_count: int
+    failed_chunk_count: int
 
 async def generate_flashcards_with_llm(subject: str, topic: str = None, count: int = 20) -> List[dict]:
     """
-    Gera flashcards usando a API da OpenAI (ou outro LLM)
+    Gera flashcards usando o provedor de LLM configurado (Groq ou OpenAI)
     Você precisará configurar a API key no .env
     """
     
-    print(f"Gerando flashcards para: {subject}, tópico: {topic}, quantidade: {count}")
-    
-    # Montar o prompt
-    if topic:
-        prompt = f"""Crie exatamente {count} flashcards educacionais sobre {subject}, focando especificamente em: {topic}.
-
-Cada flashcard deve ter:
-- Uma pergunta clara e direta
-- Uma resposta concisa e precisa
-
-Formate sua resposta como um JSON array com objetos contendo 'question' e 'answer'.
-
-Exemplo de formato esperado:
-[
-  {{"question": "O que é...?", "answer": "É..."}},
-  {{"question": "Como funciona...?", "answer": "Funciona através de..."}}
-]
-
-Agora crie os {count} flashcards:"""
-    else:
-        prompt = f"""Crie exatamente {count} flashcards educacionais sobre {subject}.
-
-Cada flashcard deve ter:
-- Uma pergunta clara e direta
-- Uma resposta concisa e precisa
-
-Formate sua resposta como um JSON array com objetos contendo 'question' e 'answer'.
-
-Exemplo de formato esperado:
-[
-  {{"question": "O que é...?", "answer": "É..."}},
-  {{"question": "Como funciona...?", "answer": "Funciona através de..."}}
-]
-
-Agora crie os {count} flashcards:"""
-
-    try:        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.groq_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "llama-3.3-70b-versatile",
-                    "messages": [
-                        {"role": "system", "content": "Você é um professor especializado em criar flashcards educacionais."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 2000
-                },
-                timeout=30.0
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                content = data['choices'][0]['message']['content']
-                
-                # Extrair JSON da resposta
-                content = content.strip()
-                if content.startswith('```json'):
-                    content = content[7:]
-                if content.startswith('```'):
-                    content = content[3:]
-                if content.endswith('```'):
-                    content = content[:-3]
-                
-                flashcards = json.loads(content.strip())
-                print(f"Flashcards gerados via Groq: {len(flashcards)}")
-                return flashcards
-        
-        
-        # Opção 2: Mock data para testes
-        # Flashcards gerados localmente para testes
-        """print(f"Gerando {count} flashcards mock...")
-        flashcards = []
-        
-        topic_text = f" - {topic}" if topic else ""
-        
-        for i in range(min(count, 50)):
-            flashcards.append({
-                "question": f"Pergunta {i+1} sobre {subject}{topic_text}: Qual é um conceito importante?",
-                "answer": f"Resposta {i+1}: Esta é uma explicação detalhada sobre um conceito fundamental de {subject}{topic_text}. É importante compreender este tópico para avançar nos estudos."
-            })
-        
-        print(f"Flashcards gerados com sucesso: {len(flashcards)}")
-        return flashcards"""
-        
-    except Exception as e:
-        print(f"Erro ao gerar flashcards: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+    logger.debug("Gerando flashcards para: %s, tópico: %s, quantidade: %s", subject, topic, count)
+    
+    try:
+        flashcards = await flashcard_service.request_flashcards(subject, topic, count)
+    except LLMUnavailableError as e:
+        logger.warning("Erro ao gerar flashcards: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Serviço de geração de flashcards indisponível no momento"
+        )
+    except LLMError as e:
+        logger.warning("Erro ao gerar flashcards: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
             detail=f"Erro ao gerar flashcards: {str(e)}"
         )
+    except ValueError as e:
+        logger.exception("Erro ao gerar flashcards: resposta inválida do modelo")
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Erro ao gerar flashcards: resposta inválida do modelo"
+        )
+    
+    logger.info(
+        "Flashcards gerados via %s: %s", llm_client.provider.name, len(flashcards),
+        extra={"provider": llm_client.provider.name, "count": len(flashcards)}
+    )
+    return flashcards
 
 @router.post("/generate", response_model=FlashcardResponse)
 async def generate_flashcards(
@@ -155,13 +118,470 @@ async def generate_flashcards(
     # Converter string vazia para None
     topic = request.topic if request.topic else None
     
-    flashcards = await generate_flashcards_with_llm(
-        subject=request.subject,
-        topic=topic,
-        count=request.count
+    # Pedidos iguais (mesma matéria, tópico e quantidade) compartilham o resultado
+    cache_key = flashcard_service.cache_key_for(request.subject, topic, request.count)
+    flashcards, cached = await flashcard_cache.get_or_create(
+        cache_key,
+        lambda: generate_flashcards_with_llm(
+            subject=request.subject,
+            topic=topic,
+            count=request.count
+        ),
+        refresh=request.regenerate
     )
     
     return {
         "subject": request.subject,
-        "flashcards": flashcards
-    }
\ No newline at end of file
+        "flashcards": flashcards,
+        "cached": cached
+    }
+
+async def stream_flashcards_with_llm(subject: str, topic: str, count: int, cache_key: str, refresh: bool):
+    """
+    Gera flashcards em NDJSON: uma linha {"type": "card"} para cada card
+    assim que o modelo termina de escrevê-lo, e uma linha final "done"
+    (ou "error").
+    """
+    def line(data: dict) -> str:
+        return json.dumps(data, ensure_ascii=False) + "\n"
+    
+    cached = None if refresh else flashcard_cache.get(cache_key)
+    if cached is not None:
+        for card in cached:
+            yield line({"type": "card", "card": card})
+        yield line({"type": "done", "count": len(cached), "cached": True})
+        return
+    
+    parser = JSONArrayStreamParser()
+    flashcards = []
+    chunks = llm_client.stream_chat(
+        flashcard_service.flashcard_messages(
+            flashcard_service.build_flashcard_prompt(subject, topic, count)
+        ),
+        temperature=0.7,
+        max_tokens=2000
+    )
+    try:
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                for item in parser.feed(chunk):
+                    try:
+                        card = Flashcard(**item).model_dump()
+                    except ValueError:
+                        continue
+                    flashcards.append(card)
+                    yield line({"type": "card", "card": card})
+                if parser.done or len(flashcards) >= count:
+                    break
+        parser.close()
+    except LLMUnavailableError:
+        yield line({"type": "error", "detail": "Serviço de geração de flashcards indisponível no momento"})
+        return
+    except LLMError as e:
+        logger.warning("Erro ao gerar flashcards: %s", e)
+        yield line({"type": "error", "detail": f"Erro ao gerar flashcards: {str(e)}"})
+        return
+    
+    if parser.errors:
+        logger.info("Flashcards descartados por JSON inválido: %s", parser.errors)
+    if flashcards:
+        flashcard_cache.set(cache_key, flashcards)
+    yield line({"type": "done", "count": len(flashcards), "cached": False})
+
+@router.post("/generate-from-notes", response_model=FlashcardNotesResponse)
+async def generate_flashcards_from_notes(
+    request: FlashcardNotesRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Gera flashcards a partir das anotações de uma matéria"""
+    
+    if request.cards_per_chunk < 1 or request.cards_per_chunk > 50:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O número de flashcards por trecho deve estar entre 1 e 50"
+        )
+    
+    if request.max_cards < 1 or request.max_cards > settings.flashcard_notes_max_cards:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"O número máximo de flashcards deve estar entre 1 e {settings.flashcard_notes_max_cards}"
+        )
+    
+    subject = db.query(Subject).filter(
+        Subject.id == request.subject_id,
+        Subject.user_id == current_user.id
+    ).first()
+    
+    if not subject:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Subject not found"
+        )
+    
+    query = db.query(Note).filter(
+        Note.subject_id == subject.id,
+        Note.user_id == current_user.id
+    )
+    if request.note_ids:
+        query = query.filter(Note.id.in_(request.note_ids))
+    note_texts = [note.content for note in query.order_by(Note.id.asc()).all() if note.content.strip()]
+    
+    if not note_texts:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A matéria não tem anotações para gerar flashcards"
+        )
+    
+    result = await flashcard_service.generate_from_notes(
+        subject.name,
+        note_texts,
+        cards_per_chunk=request.cards_per_chunk,
+        max_cards=request.max_cards
+    )
+    
+    if result.failed_chunk_count == result.chunk_count:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Erro ao gerar flashcards a partir das anotações"
+        )
+    
+    return {
+        "subject": subject.name,
+        "flashcards": result.flashcards,
+        "cached": result.cached_chunk_count == result.chunk_count,
+        "chunk_count": result.chunk_count,
+        "cached_chunk_count": result.cached_chunk_count,
+        "failed_chunk_count": result.failed_chunk_count
+    }
+
+@router.post("/generate/stream")
+async def generate_flashcards_stream(
+    request: FlashcardRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Gera flashcards usando IA, enviando cada card assim que fica pronto (NDJSON)"""
+    
+    if request.count < 1 or request.count > 50:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O número de flashcards deve estar entre 1 e 50"
+        )
+    
+    topic = request.topic if request.topic else None
+    cache_key = flashcard_service.cache_key_for(request.subject, topic, request.count)
+    
+    return StreamingResponse(
+        stream_flashcards_with_llm(request.subject, topic, request.count, cache_key, request.regenerate),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+MAX_REVIEWS_PER_BATCH = 500
+
+def _deck_counts(db: Session, user_id: int, deck_ids: List[int]) -> dict:
+    """Total de cards e cards vencidos por deck, em uma única consulta agregada"""
+    if not deck_ids:
+        return {}
+    now = datetime.utcnow()
+    rows = db.query(
+        FlashcardCard.deck_id,
+        func.count(FlashcardCard.id),
+        func.sum(case((FlashcardCard.due_at <= now, 1), else_=0))
+    ).filter(
+        FlashcardCard.user_id == user_id,
+        FlashcardCard.deck_id.in_(deck_ids)
+    ).group_by(FlashcardCard.deck_id).all()
+    return {deck_id: (total, due or 0) for deck_id, total, due in rows}
+
+def _deck_response(deck: FlashcardDeck, counts: dict) -> dict:
+    card_count, due_count = counts.get(deck.id, (0, 0))
+    return {
+        "id": deck.id,
+        "title": deck.title,
+        "topic": deck.topic,
+        "subject_id": deck.subject_id,
+        "user_id": deck.user_id,
+        "created_at": deck.created_at,
+        "updated_at": deck.updated_at,
+        "card_count": card_count,
+        "due_count": due_count
+    }
+
+@router.get("/decks", response_model=List[FlashcardDeckResponse])
+async def get_decks(
+    subject_id: int = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Lista os decks de flashcards do usuário"""
+    query = db.query(FlashcardDeck).filter(FlashcardDeck.user_id == current_user.id)
+    if subject_id:
+        query = query.filter(FlashcardDeck.subject_id == subject_id)
+    
+    decks = query.order_by(FlashcardDeck.created_at.desc()).all()
+    counts = _deck_counts(db, current_user.id, [deck.id for deck in decks])
+    return [_deck_response(deck, counts) for deck in decks]
+
+@router.post("/decks", response_model=FlashcardDeckResponse)
+async def create_deck(
+    deck_data: FlashcardDeckCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Salva um deck de flashcards (por exemplo, um conjunto gerado pela IA)"""
+    subject = db.query(Subject).filter(
+        Subject.id == deck_data.subject_id,
+        Subject.user_id == current_user.id
+    ).first()
+    
+    if not subject:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Subject not found"
+        )
+    
+    now = datetime.utcnow()
+    db_deck = FlashcardDeck(
+        title=deck_data.title,
+        topic=deck_data.topic,
+        subject_id=subject.id,
+        user_id=current_user.id
+    )
+    db_deck.cards = [
+        FlashcardCard(
+            question=card.question,
+            answer=card.answer,
+            user_id=current_user.id,
+            due_at=now
+        )
+        for card in deck_data.flashcards
+    ]
+    db.add(db_deck)
+    db.commit()
+    db.refresh(db_deck)
+    
+    return _deck_response(db_deck, {db_deck.id: (len(deck_data.flashcards), len(deck_data.flashcards))})
+
+@router.get("/decks/{deck_id}", response_model=FlashcardDeckWithCards)
+async def get_deck(
+    deck_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Obtém um deck com todos os seus cards"""
+    deck = db.query(FlashcardDeck).options(selectinload(FlashcardDeck.cards)).filter(
+        FlashcardDeck.id == deck_id,
+        FlashcardDeck.user_id == current_user.id
+    ).first()
+    
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deck not found"
+        )
+    
+    now = datetime.utcnow()
+    due_count = sum(1 for card in deck.cards if card.due_at <= now)
+    return {
+        **_deck_response(deck, {deck.id: (len(deck.cards), due_count)}),
+        "cards": deck.cards
+    }
+
+@router.delete("/decks/{deck_id}")
+async def delete_deck(
+    deck_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Deleta um deck e seus cards"""
+    deck = db.query(FlashcardDeck).filter(
+        FlashcardDeck.id == deck_id,
+        FlashcardDeck.user_id == current_user.id
+    ).first()
+    
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deck not found"
+        )
+    
+    db.delete(deck)
+    db.commit()
+    
+    return {"message": "Deck deleted successfully"}
+
+@router.get("/due", response_model=List[FlashcardCardResponse])
+async def get_due_flashcards(
+    limit: int = 50,
+    deck_id: int = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Retorna o próximo lote de cards para revisar (índice user_id, due_at)"""
+    limit = max(1, min(limit, 200))
+    query = db.query(FlashcardCard).filter(
+        FlashcardCard.user_id == current_user.id,
+        FlashcardCard.due_at <= datetime.utcnow()
+    )
+    if deck_id:
+        query = query.filter(FlashcardCard.deck_id == deck_id)
+    
+    return query.order_by(FlashcardCard.due_at.asc()).limit(limit).all()
+
+@router.post("/reviews", response_model=List[FlashcardReviewResult])
+async def submit_reviews(
+    batch: FlashcardReviewBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Registra o resultado de um lote de revisões e reagenda os cards"""
+    if len(batch.reviews) > MAX_REVIEWS_PER_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No máximo {MAX_REVIEWS_PER_BATCH} revisões por lote"
+        )
+    if any(review.grade < 0 or review.grade > 5 for review in batch.reviews):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A nota da revisão deve estar entre 0 e 5"
+        )
+    
+    card_ids = {review.card_id for review in batch.reviews}
+    cards = {card.id: card for card in db.query(FlashcardCard).filter(
+        FlashcardCard.id.in_(card_ids),
+        FlashcardCard.user_id == current_user.id
+    ).all()}
+    
+    if len(cards) != len(card_ids):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Card not found"
+        )
+    
+    now = datetime.utcnow()
+    for review in batch.reviews:
+        # Datas com fuso são convertidas para UTC sem fuso, como no resto do banco
+        if review.reviewed_at is None:
+            review.reviewed_at = now
+        elif review.reviewed_at.tzinfo is not None:
+            review.reviewed_at = review.reviewed_at.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    for review in sorted(batch.reviews, key=lambda r: r.reviewed_at):
+        card = cards[review.card_id]
+        reviewed_at = review.reviewed_at
+        state, due_at = schedule_review(
+            ReviewState(card.ease_factor, card.interval_days, card.repetitions, card.lapses),
+            review.grade,
+            reviewed_at
+        )
+        card.ease_factor = state.ease_factor
+        card.interval_days = state.interval_days
+        card.repetitions = state.repetitions
+        card.lapses = state.lapses
+        card.due_at = due_at
+        card.last_reviewed_at = reviewed_at
+    
+    results = [
+        {
+            "card_id": card.id,
+            "ease_factor": card.ease_factor,
+            "interval_days": card.interval_days,
+            "repetitions": card.repetitions,
+            "due_at": card.due_at
+        }
+        for card in cards.values()
+    ]
+    
+    # O flush agrupa os UPDATEs dos cards em executemany
+    db.commit()
+    
+    return results
+
+def _job_response(job: FlashcardJob) -> dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "subject": job.subject,
+        "topic": job.topic,
+        "count": job.count,
+        "attempts": job.attempts,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "next_attempt_at": job.next_attempt_at,
+        "flashcards": json.loads(job.result) if job.result else None
+    }
+
+@router.post("/jobs", response_model=FlashcardJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_flashcard_job(
+    request: FlashcardRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Agenda a geração de flashcards em segundo plano; consulte o job pelo id"""
+    
+    if request.count < 1 or request.count > 50:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O número de flashcards deve estar entre 1 e 50"
+        )
+    
+    pending = db.query(func.count(FlashcardJob.id)).filter(
+        FlashcardJob.user_id == current_user.id,
+        FlashcardJob.status.in_([QUEUED, RUNNING])
+    ).scalar()
+    if pending >= settings.flashcard_job_max_pending_per_user:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas gerações em andamento; aguarde as anteriores terminarem"
+        )
+    
+    job = FlashcardJob(
+        user_id=current_user.id,
+        status=QUEUED,
+        subject=request.subject,
+        topic=request.topic if request.topic else None,
+        count=request.count,
+        regenerate=request.regenerate
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    
+    flashcard_job_queue.enqueue(job.id, current_user.id)
+    
+    return _job_response(job)
+
+@router.get("/jobs", response_model=List[FlashcardJobResponse])
+async def get_flashcard_jobs(
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Lista os jobs de geração mais recentes do usuário"""
+    jobs = db.query(FlashcardJob).filter(
+        FlashcardJob.user_id == current_user.id
+    ).order_by(FlashcardJob.id.desc()).limit(max(1, min(limit, 100))).all()
+    return [_job_response(job) for job in jobs]
+
+@router.get("/jobs/{job_id}", response_model=FlashcardJobResponse)
+async def get_flashcard_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Obtém o status (e o resultado, quando pronto) de um job de geração"""
+    job = db.query(FlashcardJob).filter(
+        FlashcardJob.id == job_id,
+        FlashcardJob.user_id == current_user.id
+    ).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return _job_response(job)
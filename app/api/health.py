@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from ..config import settings
+from ..database import engine
+from ..services.llm_client import llm_client, CircuitBreaker
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+OK = "ok"
+DEGRADED = "degraded"
+FAIL = "fail"
+
+class HealthState:
+    """
+    Resultado da última verificação de prontidão, reaproveitado por
+    HEALTH_CACHE_SECONDS para que probes frequentes (de vários balanceadores)
+    não virem carga no banco e no SMTP.
+    """
+
+    def __init__(self):
+        self.shutting_down = False
+        self.checked_at = 0.0
+        self.result: Optional[dict] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def begin_shutdown(self):
+        """A partir daqui o readiness responde 503 e o balanceador para de mandar tráfego"""
+        if not self.shutting_down:
+            logger.info("Readiness set to not ready: shutting down")
+        self.shutting_down = True
+
+    async def readiness(self) -> dict:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Uma verificação por vez; quem esperou usa o resultado dela
+            if self.result is None or time.monotonic() - self.checked_at >= settings.health_cache_seconds:
+                self.result = await run_checks()
+                self.checked_at = time.monotonic()
+            return self.result
+
+health_state = HealthState()
+
+def check_db_pool() -> dict:
+    pool = engine.pool
+    size = getattr(pool, "size", None)
+    checked_out = getattr(pool, "checkedout", None)
+    if size is None or checked_out is None:
+        return {"status": OK}
+
+    capacity = size() + max(getattr(pool, "_max_overflow", 0), 0)
+    in_use = checked_out()
+    saturation = in_use / capacity if capacity else 0.0
+    return {
+        # Pool esgotado: novas requisições esperariam até o pool_timeout
+        "status": FAIL if saturation >= settings.health_pool_saturation_threshold else OK,
+        "in_use": in_use,
+        "capacity": capacity,
+        "saturation": round(saturation, 2)
+    }
+
+def _ping_db():
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+async def check_db() -> dict:
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(asyncio.to_thread(_ping_db), settings.health_check_timeout_seconds)
+    except asyncio.TimeoutError:
+        return {"status": FAIL, "error": "timeout"}
+    except Exception as e:
+        return {"status": FAIL, "error": type(e).__name__}
+    return {"status": OK, "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+async def check_smtp() -> dict:
+    """Só abre e fecha a conexão TCP; emails saem pela outbox, então falha aqui é 'degraded'"""
+    start = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(settings.smtp_host, settings.smtp_port),
+            settings.health_check_timeout_seconds
+        )
+    except asyncio.TimeoutError:
+        return {"status": DEGRADED, "error": "timeout"}
+    except OSError as e:
+        return {"status": DEGRADED, "error": type(e).__name__}
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return {"status": OK, "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+def check_llm() -> dict:
+    """Circuito aberto só afeta a geração de flashcards: 'degraded', não fora do ar"""
+    state = llm_client.breaker.state
+    return {
+        "status": DEGRADED if state == CircuitBreaker.OPEN else OK,
+        "provider": llm_client.provider.name,
+        "circuit": state
+    }
+
+async def run_checks() -> dict:
+    checks = {"db_pool": check_db_pool()}
+    # Com o pool esgotado o SELECT 1 ficaria esperando uma conexão
+    if checks["db_pool"]["status"] == FAIL:
+        checks["database"] = {"status": FAIL, "error": "pool exhausted"}
+    else:
+        checks["database"] = await check_db()
+    if settings.health_check_smtp:
+        checks["smtp"] = await check_smtp()
+    checks["llm"] = check_llm()
+
+    statuses = {check["status"] for check in checks.values()}
+    if FAIL in statuses:
+        overall = FAIL
+    elif DEGRADED in statuses:
+        overall = DEGRADED
+    else:
+        overall = OK
+    if overall == FAIL:
+        logger.warning("Readiness check failed", extra={"checks": checks})
+    return {"status": overall, "checks": checks}
+
+@router.get("/live")
+async def liveness():
+    """O processo está de pé e o event loop respondendo"""
+    return {"status": OK}
+
+@router.get("/ready")
+async def readiness():
+    """Pronto para receber tráfego: banco acessível e pool com folga"""
+    if health_state.shutting_down:
+        return JSONResponse(status_code=503, content={"status": "shutting_down"})
+
+    result = await health_state.readiness()
+    return JSONResponse(status_code=503 if result["status"] == FAIL else 200, content=result)
@@ -0,0 +1,43 @@
+import hmac
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from ..config import settings
+from ..database import engine
+from ..utils.metrics import registry
+
+router = APIRouter()
+
+DB_POOL = registry.gauge(
+    "db_pool_connections", "Conexões do pool do banco por estado", ("state",)
+)
+
+def collect_db_pool():
+    pool = engine.pool
+    for state, getter in (
+        ("size", "size"),
+        ("checked_out", "checkedout"),
+        ("checked_in", "checkedin"),
+        ("overflow", "overflow"),
+    ):
+        value = getattr(pool, getter, None)
+        if value is not None:
+            # overflow() fica negativo enquanto o pool não está cheio
+            DB_POOL.set(max(value(), 0), state)
+
+registry.add_collector(collect_db_pool)
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics(authorization: str = Header(None)):
+    """Métricas no formato texto do Prometheus"""
+    if settings.metrics_token:
+        expected = f"Bearer {settings.metrics_token}"
+        if not authorization or not hmac.compare_digest(authorization, expected):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid metrics token"
+            )
+    
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
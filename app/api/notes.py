@@ -1,11 +1,16 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session, joinedload
 from ..database import get_db
 from ..models.user import User
 from ..models.note import Note
 from ..models.subject import Subject
-from ..schemas.note import NoteCreate, NoteUpdate, NoteResponse, NoteWithSubject
+from ..schemas.note import (
+    NoteCreate, NoteUpdate, NoteResponse, NoteWithSubject,
+    NoteRevisionResponse, NoteRevisionDetail, SimilarNote, DuplicateNotePair
+)
+from ..services import note_service
+from ..services.event_broker import event_broker
 from ..utils.dependencies import get_current_active_user
 
 router = APIRouter()
@@ -27,6 +32,15 @@ async def get_notes(
     notes = query.order_by(Note.updated_at.desc()).all()
     return notes
 
+@router.get("/duplicates", response_model=List[DuplicateNotePair])
+async def get_duplicate_notes(
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Lista pares de anotações possivelmente duplicadas"""
+    return note_service.find_duplicate_notes(db, current_user.id, limit=limit)
+
 @router.get("/{note_id}", response_model=NoteWithSubject)
 async def get_note(
     note_id: int,
@@ -71,8 +85,12 @@ async def create_note(
         user_id=current_user.id
     )
     db.add(db_note)
+    db.flush()
+    note_service.record_revision(db, db_note)
+    await note_service.refresh_note_similarity(db, db_note)
     db.commit()
     db.refresh(db_note)
+    event_broker.publish(current_user.id, "note.created", id=db_note.id, subject_id=db_note.subject_id)
     
     return db_note
 
@@ -110,11 +128,22 @@ async def update_note(
                 detail="Subject not found"
             )
     
+    # Título e conteúdo entram no histórico de revisões
+    track_revision = 'title' in update_data or 'content' in update_data
+    if track_revision:
+        created_baseline = note_service.ensure_baseline_revision(db, db_note)
+    
     for field, value in update_data.items():
         setattr(db_note, field, value)
     
+    if track_revision:
+        note_service.record_revision(db, db_note, coalesce=not created_baseline)
+    if 'content' in update_data:
+        await note_service.refresh_note_similarity(db, db_note)
+    
     db.commit()
     db.refresh(db_note)
+    event_broker.publish(current_user.id, "note.updated", id=db_note.id, subject_id=db_note.subject_id)
     
     return db_note
 
@@ -136,7 +165,107 @@ async def delete_note(
             detail="Note not found"
         )
     
+    subject_id = db_note.subject_id
     db.delete(db_note)
     db.commit()
+    event_broker.publish(current_user.id, "note.deleted", id=note_id, subject_id=subject_id)
     
     return {"message": "Note deleted successfully"}
+
+def _get_user_note(db: Session, note_id: int, user_id: int) -> Note:
+    note = db.query(Note).filter(
+        Note.id == note_id,
+        Note.user_id == user_id
+    ).first()
+    
+    if not note:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Note not found"
+        )
+    
+    return note
+
+@router.get("/{note_id}/similar", response_model=List[SimilarNote])
+async def get_similar_notes(
+    note_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Lista anotações com conteúdo parecido"""
+    note = _get_user_note(db, note_id, current_user.id)
+    
+    # Anotações anteriores ao índice são indexadas na primeira consulta
+    if note.signature is None:
+        await note_service.refresh_note_similarity(db, note)
+        db.commit()
+    
+    return note_service.find_similar_notes(db, note, limit=limit)
+
+@router.get("/{note_id}/revisions", response_model=List[NoteRevisionResponse])
+async def get_note_revisions(
+    note_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Lista o histórico de revisões de uma anotação"""
+    note = _get_user_note(db, note_id, current_user.id)
+    return note_service.list_revisions(db, note.id)
+
+@router.get("/{note_id}/revisions/{revision}", response_model=NoteRevisionDetail)
+async def get_note_revision(
+    note_id: int,
+    revision: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Obtém o conteúdo de uma revisão específica"""
+    note = _get_user_note(db, note_id, current_user.id)
+    db_revision = note_service.get_revision(db, note.id, revision)
+    
+    if not db_revision:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Revision not found"
+        )
+    
+    return NoteRevisionDetail(
+        revision=db_revision.revision,
+        title=db_revision.title,
+        kind=db_revision.kind,
+        content_size=db_revision.content_size,
+        created_at=db_revision.created_at,
+        updated_at=db_revision.updated_at,
+        content=note_service.revision_content(db, db_revision)
+    )
+
+@router.post("/{note_id}/revisions/{revision}/restore", response_model=NoteResponse)
+async def restore_note_revision(
+    note_id: int,
+    revision: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Restaura uma anotação para o conteúdo de uma revisão anterior"""
+    db_note = _get_user_note(db, note_id, current_user.id)
+    db_revision = note_service.get_revision(db, db_note.id, revision)
+    
+    if not db_revision:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Revision not found"
+        )
+    
+    db_note.title = db_revision.title
+    db_note.content = note_service.revision_content(db, db_revision)
+    
+    # A restauração sempre gera uma revisão nova, sem agrupar com o autosave
+    note_service.record_revision(db, db_note, coalesce=False)
+    await note_service.refresh_note_similarity(db, db_note)
+    
+    db.commit()
+    db.refresh(db_note)
+    event_broker.publish(current_user.id, "note.updated", id=db_note.id, subject_id=db_note.subject_id)
+    
+    return db_note
@@ -5,6 +5,7 @@ from ..database import get_db
 from ..models.user import User
 from ..models.subject import Subject
 from ..schemas.subject import SubjectCreate, SubjectUpdate, SubjectResponse
+from ..services.event_broker import event_broker
 from ..utils.dependencies import get_current_active_user
 
 router = APIRouter()
@@ -50,6 +51,7 @@ async def create_subject(
     db.add(db_subject)
     db.commit()
     db.refresh(db_subject)
+    event_broker.publish(current_user.id, "subject.created", id=db_subject.id)
     
     return db_subject
 
@@ -78,6 +80,7 @@ async def update_subject(
     
     db.commit()
     db.refresh(db_subject)
+    event_broker.publish(current_user.id, "subject.updated", id=db_subject.id)
     
     return db_subject
 
@@ -101,5 +104,7 @@ async def delete_subject(
     
     db.delete(db_subject)
     db.commit()
+    # As anotações da matéria saem junto e os eventos ficam sem matéria: o cliente recarrega as listas
+    event_broker.publish(current_user.id, "subject.deleted", id=subject_id)
     
     return {"message": "Subject deleted successfully"}
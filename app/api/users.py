@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from ..database import get_db
-from ..models.user import User
-from ..schemas.user import UserResponse
+from ..models.user import User, UserSettings
+from ..schemas.user import UserResponse, UserSettingsResponse, UserSettingsUpdate
+from ..services.calendar_service import get_zone
 from ..utils.dependencies import get_current_active_user
 
 router = APIRouter()
@@ -12,4 +13,53 @@ async def get_current_user_info(
     current_user: User = Depends(get_current_active_user)
 ):
     """Retorna informações do usuário atual"""
-    return current_user
\ No newline at end of file
+    return current_user
+
+def _get_or_create_settings(db: Session, user: User) -> UserSettings:
+    user_settings = db.query(UserSettings).filter(UserSettings.user_id == user.id).first()
+    if not user_settings:
+        user_settings = UserSettings(user_id=user.id)
+        db.add(user_settings)
+        db.commit()
+        db.refresh(user_settings)
+    return user_settings
+
+@router.get("/me/settings", response_model=UserSettingsResponse)
+async def get_user_settings(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Retorna as configurações do usuário atual"""
+    return _get_or_create_settings(db, current_user)
+
+@router.put("/me/settings", response_model=UserSettingsResponse)
+async def update_user_settings(
+    settings_data: UserSettingsUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Atualiza as configurações do usuário atual"""
+    update_data = settings_data.dict(exclude_unset=True)
+    
+    if update_data.get("digest_hour") is not None and not 0 <= update_data["digest_hour"] <= 23:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="digest_hour must be between 0 and 23"
+        )
+    
+    if update_data.get("timezone"):
+        # get_zone cai para o fuso padrão quando o nome não existe
+        if get_zone(update_data["timezone"]).key != update_data["timezone"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Unknown timezone"
+            )
+    
+    user_settings = _get_or_create_settings(db, current_user)
+    for field, value in update_data.items():
+        setattr(user_settings, field, value)
+    
+    db.commit()
+    db.refresh(user_settings)
+    
+    return user_settings
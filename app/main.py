@@ -1,18 +1,78 @@
 # app/main.py
+import logging
+import os
+import tempfile
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .config import settings
-from .database import engine, Base
-from .models import user, subject, note, calendar_event, password_reset
-from .api import auth, subjects, notes, calendar, users, flashcards
+from .database import engine, Base, sync_schema
+from .models import user, subject, note, note_revision, note_similarity, calendar_event, password_reset, flashcard_cache, flashcard, flashcard_job, scheduler_lease, email_outbox, token_revocation, attachment, change_event
+from .api import auth, subjects, notes, calendar, users, flashcards, metrics, health, dashboard, attachments, events
+from .services.llm_client import llm_client
+from .services.flashcard_jobs import flashcard_job_queue
+from .services.calendar_service import reminder_dispatcher
+from .services.email_service import email_service
+from .services.email_outbox import email_outbox
+from .services.email_templates import email_templates
+from .services.auth_service import reset_token_purger
+from .services.token_revocation import token_revocations
+from .services.attachment_service import orphan_sweeper
+from .services.event_broker import event_broker
+from .utils.metrics import registry as metrics_registry, MetricsMiddleware
+from .utils.profiler import ProfilerMiddleware
+from .utils.log import configure_logging, RequestLoggingMiddleware
 
-# Criar tabelas
+configure_logging(
+    level=settings.log_level,
+    fmt=settings.log_format,
+    levels=settings.log_levels,
+    debug_sample_rate=settings.log_debug_sample_rate,
+    queue_size=settings.log_queue_size
+)
+logger = logging.getLogger(__name__)
+logger.info(
+    "Configurações carregadas",
+    extra={"debug": settings.debug, "llm_provider": settings.llm_provider, "groq_api_key_set": bool(settings.groq_api_key)}
+)
+
+# Criar tabelas e colunas novas
 Base.metadata.create_all(bind=engine)
+sync_schema()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Recursos compartilhados pelo worker durante toda a sua vida
+    email_templates.load()
+    if settings.metrics_multiproc_dir:
+        metrics_registry.configure_multiprocess(settings.metrics_multiproc_dir)
+        await metrics_registry.start_flusher(settings.metrics_flush_seconds)
+    await token_revocations.start()
+    await llm_client.start()
+    await flashcard_job_queue.start()
+    await reminder_dispatcher.start()
+    await email_outbox.start()
+    await reset_token_purger.start()
+    await orphan_sweeper.start()
+    await event_broker.start()
+    yield
+    health.health_state.begin_shutdown()
+    await event_broker.stop()
+    await reset_token_purger.stop()
+    await orphan_sweeper.stop()
+    await token_revocations.stop()
+    await email_outbox.stop()
+    await reminder_dispatcher.stop()
+    await flashcard_job_queue.stop()
+    await llm_client.close()
+    await email_service.close()
+    await metrics_registry.stop_flusher()
 
 app = FastAPI(
     title=settings.app_name,
     description="API para aplicação de estudos",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -24,6 +84,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.profiler_enabled:
+    app.add_middleware(
+        ProfilerMiddleware,
+        directory=settings.profiler_dir or os.path.join(tempfile.gettempdir(), "studyapp-profiles"),
+        sample_rate=settings.profiler_sample_rate,
+        debug_token=settings.profiler_debug_token,
+        interval=settings.profiler_interval_ms / 1000,
+        max_files=settings.profiler_max_files
+    )
+
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+# Por último para ficar por fora: o contexto de log vale para todos os middlewares
+app.add_middleware(
+    RequestLoggingMiddleware,
+    debug_sample_rate=settings.log_debug_sample_rate,
+    access_log=settings.log_access
+)
+
 # Incluir routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
@@ -31,6 +111,12 @@ app.include_router(subjects.router, prefix="/api/subjects", tags=["Subjects"])
 app.include_router(notes.router, prefix="/api/notes", tags=["Notes"])
 app.include_router(calendar.router, prefix="/api/calendar", tags=["Calendar"])
 app.include_router(flashcards.router, prefix="/api/flashcards", tags=["Flashcards"])
+app.include_router(attachments.router, prefix="/api", tags=["Attachments"])
+app.include_router(events.router, prefix="/api/events", tags=["Events"])
+app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
+app.include_router(health.router, prefix="/health", tags=["Health"])
+if settings.metrics_enabled:
+    app.include_router(metrics.router, tags=["Metrics"])
 
 @app.get("/")
 async def root():
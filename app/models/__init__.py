@@ -3,8 +3,18 @@
 from .user import User, UserSettings, EventType, UserReminderSettings
 from .subject import Subject
 from .note import Note
+from .note_revision import NoteRevision
+from .note_similarity import NoteSignature, NoteLSHBucket
 from .calendar_event import CalendarEvent
 from .password_reset import PasswordResetToken
+from .flashcard_cache import FlashcardCacheEntry
+from .flashcard import FlashcardDeck, FlashcardCard
+from .flashcard_job import FlashcardJob
+from .scheduler_lease import SchedulerLease
+from .email_outbox import EmailOutbox
+from .token_revocation import TokenRevocation
+from .attachment import StoredBlob, NoteAttachment
+from .change_event import ChangeEvent
 
 __all__ = [
     "User",
@@ -13,6 +23,19 @@ __all__ = [
     "UserReminderSettings",
     "Subject",
     "Note",
+    "NoteRevision",
+    "NoteSignature",
+    "NoteLSHBucket",
     "CalendarEvent",
-    "PasswordResetToken"
+    "PasswordResetToken",
+    "FlashcardCacheEntry",
+    "FlashcardDeck",
+    "FlashcardCard",
+    "FlashcardJob",
+    "SchedulerLease",
+    "EmailOutbox",
+    "TokenRevocation",
+    "StoredBlob",
+    "NoteAttachment",
+    "ChangeEvent"
 ]
\ No newline at end of file
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from ..database import Base
+
+class StoredBlob(Base):
+    """Arquivo guardado uma única vez em disco, endereçado pelo sha256 do conteúdo"""
+    __tablename__ = "stored_blobs"
+    
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    # Atualizado a cada upload que reaproveita o blob; protege do coletor de órfãos
+    last_used_at = Column(DateTime, nullable=False, index=True)
+
+class NoteAttachment(Base):
+    __tablename__ = "note_attachments"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    note_id = Column(Integer, ForeignKey("notes.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    blob_sha256 = Column(String(64), ForeignKey("stored_blobs.sha256"), nullable=False, index=True)
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    
+    # Relationships
+    note = relationship("Note", back_populates="attachments")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Date, Time, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, Date, Time, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
@@ -19,6 +19,11 @@ class CalendarEvent(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
+    # Consulta do disparador de lembretes: reminder_sent = 0 AND event_date BETWEEN ...
+    __table_args__ = (
+        Index("ix_calendar_events_reminder_due", "reminder_sent", "event_date"),
+    )
+    
     # Relationships
     event_type = relationship("EventType", back_populates="calendar_events")
     subject = relationship("Subject", back_populates="calendar_events")
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.sql import func
+from ..database import Base
+
+class ChangeEvent(Base):
+    """
+    Evento de alteração repassado entre workers pelo backend "database" do
+    broker de eventos. Cada worker lê as linhas novas (por created_at, com
+    sobreposição entre leituras) e ignora as que ele mesmo gravou. Vive
+    poucos minutos.
+    """
+    __tablename__ = "change_events"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    origin = Column(String(64), nullable=False)  # worker que publicou
+    payload = Column(Text, nullable=False)  # JSON já serializado
+    created_at = Column(DateTime, server_default=func.now(), index=True)
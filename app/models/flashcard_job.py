@@ -0,0 +1,27 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Index
+from ..database import Base
+
+class FlashcardJob(Base):
+    __tablename__ = "flashcard_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # queued -> running -> succeeded | failed
+    status = Column(String(20), nullable=False, default="queued")
+    subject = Column(String(255), nullable=False)
+    topic = Column(String(255), nullable=True)
+    count = Column(Integer, nullable=False)
+    regenerate = Column(Boolean, nullable=False, default=False)
+    result = Column(Text, nullable=True)  # JSON com os flashcards gerados
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String(100), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=True)  # depois de uma falha, só volta a rodar a partir daqui
+    
+    __table_args__ = (
+        Index("ix_flashcard_jobs_status_created", "status", "created_at"),
+    )
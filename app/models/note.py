@@ -1,14 +1,19 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, LargeBinary
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
+from ..config import settings
+from ..utils.compression import compress_text, decompress_text
 
 class Note(Base):
     __tablename__ = "notes"
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
-    content = Column(Text, nullable=False)
+    # Texto puro; fica vazio quando o conteúdo está comprimido em content_compressed
+    _content = Column("content", Text, nullable=False, default="")
+    content_compressed = Column(LargeBinary, nullable=True)
+    content_codec = Column(String(10), nullable=True)
     subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime, server_default=func.now())
@@ -16,4 +21,41 @@ class Note(Base):
     
     # Relationships
     subject = relationship("Subject", back_populates="notes")
-    user = relationship("User", back_populates="notes")
\ No newline at end of file
+    user = relationship("User", back_populates="notes")
+    revisions = relationship("NoteRevision", back_populates="note", cascade="all, delete-orphan")
+    signature = relationship("NoteSignature", back_populates="note", uselist=False, cascade="all, delete-orphan")
+    lsh_buckets = relationship("NoteLSHBucket", back_populates="note", cascade="all, delete-orphan")
+    attachments = relationship("NoteAttachment", back_populates="note", cascade="all, delete-orphan")
+
+    @property
+    def content(self) -> str:
+        """Conteúdo da anotação, descomprimido apenas quando acessado"""
+        if self.content_codec is None:
+            return self._content
+
+        blob = self.content_compressed
+        cached = getattr(self, "_content_cache", None)
+        if cached is not None and cached[0] is blob:
+            return cached[1]
+
+        text = decompress_text(self.content_codec, blob)
+        self._content_cache = (blob, text)
+        return text
+
+    @content.setter
+    def content(self, value: str):
+        compressed = compress_text(
+            value,
+            codec=settings.note_compression_codec,
+            threshold=settings.note_compression_threshold,
+            level=settings.note_compression_level
+        )
+        if compressed:
+            self.content_codec, self.content_compressed = compressed
+            self._content = ""
+            self._content_cache = (self.content_compressed, value)
+        else:
+            self.content_codec = None
+            self.content_compressed = None
+            self._content = value
+            self._content_cache = None
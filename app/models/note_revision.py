@@ -0,0 +1,27 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, LargeBinary, Index
+from sqlalchemy.orm import relationship
+from ..database import Base
+
+class NoteRevision(Base):
+    __tablename__ = "note_revisions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    note_id = Column(Integer, ForeignKey("notes.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    revision = Column(Integer, nullable=False)
+    title = Column(String(255), nullable=False)
+    # "snapshot" guarda o texto completo; "delta" guarda um diff contra base_revision
+    kind = Column(String(10), nullable=False)
+    base_revision = Column(Integer, nullable=True)
+    payload = Column(LargeBinary, nullable=False)
+    content_size = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_note_revisions_note_revision", "note_id", "revision", unique=True),
+    )
+    
+    # Relationships
+    note = relationship("Note", back_populates="revisions")
@@ -0,0 +1,32 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, DateTime, ForeignKey, LargeBinary, Index
+from sqlalchemy.orm import relationship
+from ..database import Base
+
+class NoteSignature(Base):
+    __tablename__ = "note_signatures"
+    
+    note_id = Column(Integer, ForeignKey("notes.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    signature = Column(LargeBinary, nullable=False)
+    shingles_digest = Column(LargeBinary(16), nullable=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    note = relationship("Note", back_populates="signature")
+
+class NoteLSHBucket(Base):
+    __tablename__ = "note_lsh_buckets"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    note_id = Column(Integer, ForeignKey("notes.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    band = Column(Integer, nullable=False)
+    bucket = Column(BigInteger, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_note_lsh_buckets_lookup", "user_id", "band", "bucket"),
+    )
+    
+    # Relationships
+    note = relationship("Note", back_populates="lsh_buckets")
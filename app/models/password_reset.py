@@ -1,6 +1,6 @@
 # backend/app/models/password_reset.py
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -11,10 +11,16 @@ class PasswordResetToken(Base):
     id = Column(Integer, primary_key=True, index=True)
     # A linha abaixo corrige o erro original, conectando esta tabela à tabela "users"
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    token = Column(String(255), nullable=False, index=True)
+    # sha256 do token enviado por email; a coluna continua se chamando "token"
+    token_hash = Column("token", String(64), nullable=False)
     expires_at = Column(DateTime, nullable=False, index=True)
     used = Column(Boolean, default=False)
     created_at = Column(DateTime, server_default=func.now())
     
     # Relação de volta para o User
-    user = relationship("User", back_populates="password_reset_tokens")
\ No newline at end of file
+    user = relationship("User", back_populates="password_reset_tokens")
+    
+    __table_args__ = (
+        Index("ux_password_reset_tokens_token", "token", unique=True),
+        Index("ix_password_reset_tokens_user_open", "user_id", "used"),
+    )
\ No newline at end of file
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DateTime
+from ..database import Base
+
+class SchedulerLease(Base):
+    """Trava com prazo de validade para tarefas que só um worker deve executar por vez"""
+    __tablename__ = "scheduler_leases"
+    
+    name = Column(String(100), primary_key=True)
+    owner = Column(String(100), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
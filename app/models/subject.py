@@ -17,4 +17,5 @@ class Subject(Base):
     # Relationships
     user = relationship("User", back_populates="subjects")
     notes = relationship("Note", back_populates="subject", cascade="all, delete-orphan")
-    calendar_events = relationship("CalendarEvent", back_populates="subject")
\ No newline at end of file
+    calendar_events = relationship("CalendarEvent", back_populates="subject")
+    flashcard_decks = relationship("FlashcardDeck", back_populates="subject", cascade="all, delete-orphan")
\ No newline at end of file
@@ -0,0 +1,19 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from ..database import Base
+
+class TokenRevocation(Base):
+    """
+    Revogação de tokens de acesso: um token (jti) ou todos os tokens de um
+    usuário emitidos antes de `token_version`. Só vale até `expires_at`,
+    quando os tokens afetados já venceram de qualquer forma.
+    """
+    __tablename__ = "token_revocations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    jti = Column(String(32), nullable=True)  # vazio = todos os tokens do usuário
+    token_version = Column(Integer, nullable=True)  # tokens com versão menor são recusados
+    expires_at = Column(DateTime, nullable=False, index=True)
+    # Relógio da aplicação (UTC), comparado com o de quem sincroniza
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Text, ForeignKey
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
@@ -11,6 +11,7 @@ class User(Base):
     name = Column(String(255), nullable=False)
     password_hash = Column(String(255), nullable=False)
     is_active = Column(Boolean, default=True)
+    token_version = Column(Integer, default=0)  # incrementado para revogar todos os tokens do usuário
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
@@ -29,6 +30,10 @@ class UserSettings(Base):
     user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
     email_notifications = Column(Boolean, default=True)
     timezone = Column(String(50), default="America/Sao_Paulo")
+    locale = Column(String(10), default="pt-BR")  # idioma dos emails
+    reminder_digest = Column(Boolean, default=False)  # um resumo por dia em vez de um email por evento
+    digest_hour = Column(Integer, default=8)  # hora local de envio do resumo
+    last_digest_sent_on = Column(Date, nullable=True)  # data local do último resumo enviado
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
@@ -0,0 +1,19 @@
+# app/schemas/attachment.py
+from pydantic import BaseModel
+from datetime import datetime
+
+class AttachmentResponse(BaseModel):
+    id: int
+    note_id: int
+    filename: str
+    content_type: str
+    size: int
+    blob_sha256: str
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class AttachmentUsage(BaseModel):
+    used_bytes: int
+    quota_bytes: int
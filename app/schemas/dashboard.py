@@ -0,0 +1,27 @@
+# app/schemas/dashboard.py
+from pydantic import BaseModel
+from datetime import date, time
+from typing import List, Optional
+from .subject import SubjectResponse
+from .note import NoteSummary
+from .user import UserResponse
+
+class DashboardSubject(SubjectResponse):
+    note_count: int
+
+class DashboardEvent(BaseModel):
+    id: int
+    title: str
+    event_date: date
+    event_time: Optional[time] = None
+    event_type_id: int
+    event_type_name: str
+    event_type_color: Optional[str] = None
+    subject_id: Optional[int] = None
+    subject_name: Optional[str] = None
+
+class DashboardResponse(BaseModel):
+    user: UserResponse
+    subjects: List[DashboardSubject]
+    recent_notes: List[NoteSummary]
+    upcoming_events: List[DashboardEvent]
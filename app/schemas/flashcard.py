@@ -0,0 +1,73 @@
+# app/schemas/flashcard.py
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+class FlashcardCardBase(BaseModel):
+    question: str
+    answer: str
+
+class FlashcardDeckCreate(BaseModel):
+    subject_id: int
+    title: str
+    topic: Optional[str] = None
+    flashcards: List[FlashcardCardBase]
+
+class FlashcardCardResponse(FlashcardCardBase):
+    id: int
+    deck_id: int
+    ease_factor: float
+    interval_days: int
+    repetitions: int
+    lapses: int
+    due_at: datetime
+    last_reviewed_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class FlashcardDeckResponse(BaseModel):
+    id: int
+    title: str
+    topic: Optional[str] = None
+    subject_id: int
+    user_id: int
+    created_at: datetime
+    updated_at: datetime
+    card_count: int = 0
+    due_count: int = 0
+    
+    class Config:
+        from_attributes = True
+
+class FlashcardDeckWithCards(FlashcardDeckResponse):
+    cards: List[FlashcardCardResponse]
+
+class FlashcardReview(BaseModel):
+    card_id: int
+    grade: int  # 0 (esqueceu) a 5 (lembrou com facilidade)
+    reviewed_at: Optional[datetime] = None
+
+class FlashcardReviewBatch(BaseModel):
+    reviews: List[FlashcardReview]
+
+class FlashcardReviewResult(BaseModel):
+    card_id: int
+    ease_factor: float
+    interval_days: int
+    repetitions: int
+    due_at: datetime
+
+class FlashcardJobResponse(BaseModel):
+    id: int
+    status: str
+    subject: str
+    topic: Optional[str] = None
+    count: int
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    next_attempt_at: Optional[datetime] = None
+    flashcards: Optional[List[FlashcardCardBase]] = None
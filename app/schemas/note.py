@@ -1,7 +1,7 @@
 # app/schemas/note.py
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from .subject import SubjectResponse
 
 class NoteBase(BaseModel):
@@ -30,4 +30,31 @@ class NoteWithSubject(NoteResponse):
     subject: SubjectResponse
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class NoteRevisionResponse(BaseModel):
+    revision: int
+    title: str
+    kind: str
+    content_size: int
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class NoteRevisionDetail(NoteRevisionResponse):
+    content: str
+
+class NoteSummary(BaseModel):
+    id: int
+    title: str
+    subject_id: int
+    updated_at: datetime
+
+class SimilarNote(NoteSummary):
+    similarity: float
+
+class DuplicateNotePair(BaseModel):
+    similarity: float
+    notes: List[NoteSummary]
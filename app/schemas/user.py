@@ -26,9 +26,16 @@ class UserResponse(UserBase):
 class UserSettingsBase(BaseModel):
     email_notifications: bool = True
     timezone: str = "America/Sao_Paulo"
+    locale: Optional[str] = "pt-BR"
+    reminder_digest: Optional[bool] = False
+    digest_hour: Optional[int] = 8
 
-class UserSettingsUpdate(UserSettingsBase):
-    pass
+class UserSettingsUpdate(BaseModel):
+    email_notifications: Optional[bool] = None
+    timezone: Optional[str] = None
+    locale: Optional[str] = None
+    reminder_digest: Optional[bool] = None
+    digest_hour: Optional[int] = None
 
 class UserSettingsResponse(UserSettingsBase):
     id: int
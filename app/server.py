@@ -0,0 +1,342 @@
+"""
+Servidor de produção: python -m app.server
+
+Um processo mestre carrega o app uma vez e cria os workers com fork, que
+compartilham o código já importado e o socket de escuta. O mestre
+reinicia workers que morrem e trata os sinais:
+
+- SIGTERM/SIGINT: cada worker tira o readiness do ar, espera
+  SERVER_DRAIN_SECONDS para o balanceador perceber, termina as requisições
+  em andamento, roda o shutdown do lifespan (outbox, métricas) e fecha o
+  pool do banco.
+- SIGHUP: reload sem downtime. O mestre se reexecuta (mesmo PID) com o
+  código novo, herdando o socket, e troca os workers um de cada vez: sobe
+  um novo, espera ficar pronto e encerra um antigo como no SIGTERM.
+
+Sem fork (Windows) roda um único processo com uvicorn.
+
+Atrás de um balanceador, FORWARDED_ALLOW_IPS precisa listar os IPs dele:
+só assim o IP do cliente (X-Forwarded-For) chega ao app, usado nos
+logs e no limite de tentativas de login por IP.
+
+É o entrypoint suportado em produção. Com `uvicorn app.main:app` o
+lifespan só roda depois que todas as conexões terminam, e as de eventos
+(SSE/WebSocket) não terminam sozinhas: o SIGTERM só completa com
+--timeout-graceful-shutdown, e os clientes perdem a conexão sem o aviso
+de reconexão que o WorkerServer manda ao fim da drenagem.
+"""
+
+import asyncio
+import glob
+import logging
+import os
+import select
+import signal
+import socket
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+import uvicorn
+from .config import settings
+
+logger = logging.getLogger("app.server")
+
+LISTEN_FD_ENV = "STUDYAPP_LISTEN_FD"
+OLD_WORKERS_ENV = "STUDYAPP_OLD_WORKERS"
+
+@dataclass
+class WorkerPlan:
+    workers: int
+    pool_size: int
+    max_overflow: int
+
+def plan_workers(cpu_count: int) -> WorkerPlan:
+    """
+    Número de workers e tamanho do pool de cada um, de forma que
+    (workers + 1) × (pool_size + max_overflow) não passe de
+    DB_MAX_CONNECTIONS: o worker a mais é o novo que sobe no reload
+    enquanto o antigo ainda não fechou o pool.
+    """
+    workers = settings.server_workers or max(cpu_count, 1)
+    pool_size = settings.db_pool_size
+    max_overflow = settings.db_max_overflow
+
+    if settings.db_max_connections > 0:
+        # Pelo menos 2 conexões por worker: requisições e tarefas de fundo
+        workers = max(1, min(workers, settings.db_max_connections // 2 - 1))
+        per_worker = settings.db_max_connections // (workers + 1)
+        pool_size = max(1, min(pool_size, per_worker))
+        max_overflow = max(0, min(max_overflow, per_worker - pool_size))
+
+    return WorkerPlan(workers=workers, pool_size=pool_size, max_overflow=max_overflow)
+
+class WorkerServer(uvicorn.Server):
+    """uvicorn.Server que avisa o mestre quando está pronto e drena antes de parar"""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: Optional[int] = None):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+        self.draining = False
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        if self.ready_fd is not None and not self.should_exit:
+            os.write(self.ready_fd, b"1")
+            os.close(self.ready_fd)
+            self.ready_fd = None
+
+    def handle_exit(self, sig, frame):
+        if self.draining:
+            self._stop_serving(sig, frame)
+            return
+
+        from .api.health import health_state
+        self.draining = True
+        health_state.begin_shutdown()
+        # Continua atendendo enquanto o balanceador ainda manda tráfego
+        asyncio.get_event_loop().call_later(settings.server_drain_seconds, self._stop_serving, sig, frame)
+
+    def _stop_serving(self, sig, frame):
+        from .services.event_broker import event_broker
+        # Conexões de eventos não terminam sozinhas: os clientes reconectam em outro worker
+        event_broker.close_all()
+        super().handle_exit(sig, frame)
+
+def run_worker(sock: socket.socket, ready_fd: int) -> int:
+    from .database import engine
+    from .main import app
+
+    # Conexões herdadas do mestre não podem ser usadas por este processo
+    engine.dispose(close=False)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    config = uvicorn.Config(
+        app,
+        lifespan="on",
+        log_config=None,  # usa o logging do app (app.utils.log)
+        access_log=False,  # RequestLoggingMiddleware já registra os acessos
+        proxy_headers=True,
+        forwarded_allow_ips=settings.forwarded_allow_ips,
+        timeout_graceful_shutdown=settings.server_graceful_timeout_seconds
+    )
+    server = WorkerServer(config, ready_fd)
+    try:
+        server.run(sockets=[sock])
+    finally:
+        engine.dispose()
+    return 0 if server.started else 1
+
+class Master:
+    def __init__(self, sock: socket.socket, workers: int):
+        self.sock = sock
+        self.workers = workers
+        self.children: Dict[int, Optional[int]] = {}  # pid -> pipe de "pronto" (None depois de pronto)
+        self.retiring: Set[int] = set()
+        self.stopping = False
+        self.reloading = False
+
+    def spawn(self) -> int:
+        ready_read, ready_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            code = 1
+            try:
+                code = run_worker(self.sock, ready_write)
+            except BaseException:
+                logger.exception("Worker crashed")
+            finally:
+                from .utils.log import shutdown_logging
+                shutdown_logging()
+                os._exit(code)
+        os.close(ready_write)
+        self.children[pid] = ready_read
+        return pid
+
+    def wait_ready(self, pids: List[int], timeout: float) -> bool:
+        pending = {self.children[pid]: pid for pid in pids if self.children.get(pid) is not None}
+        deadline = time.monotonic() + timeout
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select(list(pending), [], [], remaining)
+            for fd in readable:
+                pid = pending.pop(fd)
+                if not os.read(fd, 1):
+                    return False  # o worker terminou antes de ficar pronto
+                os.close(fd)
+                self.children[pid] = None
+        return True
+
+    def handle_stop(self, sig, frame):
+        self.stopping = True
+
+    def handle_reload(self, sig, frame):
+        self.reloading = True
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            ready_fd = self.children.pop(pid, None)
+            if ready_fd is not None:
+                os.close(ready_fd)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+            elif not self.stopping:
+                logger.warning("Worker %s exited (status %s); starting a new one", pid, status)
+                time.sleep(1)
+                self.spawn()
+
+    def stop_workers(self, pids):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def retire(self, pids: List[int]):
+        self.retiring.update(pids)
+        self.stop_workers(pids)
+
+    def wait_retired(self, pid: int):
+        """Espera o worker encerrado sair (e fechar o pool do banco)"""
+        deadline = time.monotonic() + settings.server_drain_seconds + settings.server_graceful_timeout_seconds + 10
+        while pid in self.retiring and not self.stopping:
+            if time.monotonic() >= deadline:
+                logger.warning("Killing worker %s after shutdown timeout", pid)
+                os.kill(pid, signal.SIGKILL)
+                deadline = float("inf")
+            self.reap()
+            time.sleep(0.2)
+
+    def roll(self, old_workers: List[int]):
+        """
+        Troca os workers antigos pelos novos um de cada vez, para nunca haver
+        mais que workers + 1 pools abertos no banco (ver plan_workers).
+        """
+        # Como filhos: se o mestre parar no meio da troca, eles param junto
+        for pid in old_workers:
+            self.children[pid] = None
+        old_workers = list(old_workers)
+        for _ in range(self.workers):
+            if self.stopping:
+                return
+            pid = self.spawn()
+            if not self.wait_ready([pid], settings.server_ready_timeout_seconds):
+                # Código novo não sobe: mantém os workers antigos que restam atendendo
+                logger.error("New worker did not become ready; keeping %s old workers", len(old_workers))
+                self.retire([pid])
+                return
+            if old_workers:
+                old = old_workers.pop(0)
+                self.retire([old])
+                self.wait_retired(old)
+        # Reload com menos workers que antes
+        self.retire(old_workers)
+        logger.info("%s workers ready", self.workers)
+
+    def reexec(self):
+        """Reexecuta o mestre com o código novo; os workers atuais viram "antigos" do novo mestre"""
+        logger.info("Reloading: re-executing master with %s workers running", len(self.children))
+        os.environ[LISTEN_FD_ENV] = str(self.sock.fileno())
+        os.environ[OLD_WORKERS_ENV] = ",".join(str(pid) for pid in list(self.children) + list(self.retiring))
+        from .utils.log import shutdown_logging
+        shutdown_logging()
+        os.execv(sys.executable, [sys.executable] + sys.orig_argv[1:])
+
+    def run(self, old_workers: List[int]):
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGHUP, self.handle_reload)
+
+        if old_workers:
+            self.roll(old_workers)
+        else:
+            pids = [self.spawn() for _ in range(self.workers)]
+            if self.wait_ready(pids, settings.server_ready_timeout_seconds):
+                logger.info("%s workers ready", len(pids))
+            else:
+                logger.error("New workers did not become ready")
+                self.retire(pids)
+
+        while not self.stopping:
+            if self.reloading:
+                self.reexec()
+            self.reap()
+            time.sleep(0.5)
+
+        logger.info("Stopping %s workers", len(self.children))
+        self.stop_workers(list(self.children) + list(self.retiring))
+        deadline = time.monotonic() + settings.server_drain_seconds + settings.server_graceful_timeout_seconds + 10
+        while (self.children or self.retiring) and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.2)
+        for pid in list(self.children) + list(self.retiring):
+            logger.warning("Killing worker %s after shutdown timeout", pid)
+            os.kill(pid, signal.SIGKILL)
+
+def _listen_socket() -> socket.socket:
+    inherited = os.environ.pop(LISTEN_FD_ENV, None)
+    if inherited is not None:
+        sock = socket.socket(fileno=int(inherited))
+    else:
+        sock = socket.create_server((settings.server_host, settings.server_port), backlog=2048, reuse_port=False)
+    sock.set_inheritable(True)
+    return sock
+
+def _prepare_metrics_dir(workers: int, reloading: bool):
+    if workers <= 1 and not settings.metrics_multiproc_dir:
+        return
+    if not settings.metrics_multiproc_dir:
+        # O PID do mestre não muda no reload, então o diretório também não
+        directory = os.path.join(tempfile.gettempdir(), f"studyapp-metrics-{os.getpid()}")
+        settings.metrics_multiproc_dir = directory
+        os.environ["METRICS_MULTIPROC_DIR"] = directory
+    if not reloading:
+        # Snapshots de uma execução anterior somariam aos contadores novos
+        for path in glob.glob(os.path.join(settings.metrics_multiproc_dir, "metrics_*.json")):
+            os.remove(path)
+
+def main():
+    if not hasattr(os, "fork"):
+        # Sem o mestre, mas com a drenagem e o aviso às conexões de eventos
+        WorkerServer(uvicorn.Config(
+            "app.main:app",
+            host=settings.server_host,
+            port=settings.server_port,
+            proxy_headers=True,
+            forwarded_allow_ips=settings.forwarded_allow_ips,
+            timeout_graceful_shutdown=settings.server_graceful_timeout_seconds
+        )).run()
+        return
+
+    old_workers = [int(pid) for pid in os.environ.pop(OLD_WORKERS_ENV, "").split(",") if pid]
+    plan = plan_workers(os.cpu_count() or 1)
+    # Antes de importar o app: o engine é criado com esses valores
+    settings.db_pool_size = plan.pool_size
+    settings.db_max_overflow = plan.max_overflow
+    _prepare_metrics_dir(plan.workers, reloading=bool(old_workers))
+
+    sock = _listen_socket()
+    from . import main as app_main  # noqa: F401 -- carrega o app uma vez; os workers herdam pelo fork
+    from .database import engine
+    engine.dispose()
+
+    logger.info(
+        "Starting %s workers on %s:%s (db pool %s + %s overflow per worker)",
+        plan.workers, settings.server_host, settings.server_port, plan.pool_size, plan.max_overflow
+    )
+    Master(sock, plan.workers).run(old_workers)
+
+if __name__ == "__main__":
+    main()
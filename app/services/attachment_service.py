@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional, Tuple
+from sqlalchemy import func, exists
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import SessionLocal
+from ..models.note import Note
+from ..models.attachment import StoredBlob, NoteAttachment
+from .lease_service import acquire_lease, worker_identity
+
+logger = logging.getLogger(__name__)
+
+SWEEP_LEASE = "attachment_sweep"
+WRITE_BUFFER_BYTES = 1024 * 1024
+SWEEP_BATCH_SIZE = 500
+
+class FileTooLargeError(Exception):
+    pass
+
+class QuotaExceededError(Exception):
+    pass
+
+class BlobStore:
+    """
+    Arquivos em disco endereçados pelo sha256 do conteúdo
+    (<root>/ab/cd/abcd...). Conteúdo igual vira um arquivo só.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    async def write_stream(self, chunks: AsyncIterator[bytes], max_bytes: int) -> Tuple[str, int, str]:
+        """
+        Grava o stream num arquivo temporário calculando o hash no caminho,
+        sem juntar o arquivo em memória. Para assim que passar de `max_bytes`.
+        Retorna (sha256, tamanho, caminho temporário).
+        """
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix=".part")
+        hasher = hashlib.sha256()
+        size = 0
+        buffer = bytearray()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise FileTooLargeError(max_bytes)
+                    hasher.update(chunk)
+                    buffer += chunk
+                    # Escritas em lotes e fora do event loop
+                    if len(buffer) >= WRITE_BUFFER_BYTES:
+                        await asyncio.to_thread(f.write, buffer)
+                        buffer = bytearray()
+                if buffer:
+                    await asyncio.to_thread(f.write, buffer)
+                await asyncio.to_thread(os.fsync, f.fileno())
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return hasher.hexdigest(), size, tmp_path
+
+    def store(self, tmp_path: str, sha256: str):
+        """Move o temporário para o lugar definitivo; se o conteúdo já existe, fica igual"""
+        target = self.path(sha256)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(tmp_path, target)
+
+    def delete(self, sha256: str):
+        try:
+            os.remove(self.path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def sweep_tmp(self, older_than: float) -> int:
+        """Apaga uploads interrompidos que ficaram em tmp/"""
+        removed = 0
+        if not os.path.isdir(self.tmp_dir):
+            return removed
+        for entry in os.scandir(self.tmp_dir):
+            if entry.is_file() and entry.stat().st_mtime < older_than:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+def user_usage(db: Session, user_id: int) -> int:
+    """Bytes em anexos do usuário; cada anexo conta, mesmo com o conteúdo compartilhado"""
+    return db.query(func.coalesce(func.sum(NoteAttachment.size), 0)).filter(
+        NoteAttachment.user_id == user_id
+    ).scalar()
+
+def _touch_blob(db: Session, sha256: str, size: int):
+    """Cria a linha do blob ou renova last_used_at, para o coletor não apagá-lo agora"""
+    now = datetime.utcnow()
+    updated = db.query(StoredBlob).filter(StoredBlob.sha256 == sha256).update(
+        {"last_used_at": now}, synchronize_session=False
+    )
+    if not updated:
+        try:
+            db.add(StoredBlob(sha256=sha256, size=size, last_used_at=now))
+            db.flush()
+        except IntegrityError:
+            # Mesmo conteúdo enviado ao mesmo tempo por outro pedido
+            db.rollback()
+            db.query(StoredBlob).filter(StoredBlob.sha256 == sha256).update(
+                {"last_used_at": now}, synchronize_session=False
+            )
+    db.commit()
+
+async def save_attachment(
+    db: Session,
+    store: BlobStore,
+    note: Note,
+    user_id: int,
+    filename: str,
+    content_type: str,
+    chunks: AsyncIterator[bytes]
+) -> NoteAttachment:
+    """Recebe o upload em stream, guarda o conteúdo (sem duplicar) e cria o anexo"""
+    note_id = note.id
+    remaining = settings.attachment_user_quota_bytes - user_usage(db, user_id)
+    # Libera a conexão do banco enquanto o upload chega
+    db.commit()
+
+    limit = min(settings.attachment_max_bytes, max(remaining, 0))
+    try:
+        sha256, size, tmp_path = await store.write_stream(chunks, limit)
+    except FileTooLargeError:
+        if limit < settings.attachment_max_bytes:
+            raise QuotaExceededError()
+        raise
+
+    try:
+        # Outros uploads do mesmo usuário podem ter terminado nesse meio tempo
+        if user_usage(db, user_id) + size > settings.attachment_user_quota_bytes:
+            raise QuotaExceededError()
+        # A linha do blob vem antes do arquivo: um arquivo nunca fica sem linha
+        _touch_blob(db, sha256, size)
+        await asyncio.to_thread(store.store, tmp_path, sha256)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    attachment = NoteAttachment(
+        note_id=note_id,
+        user_id=user_id,
+        blob_sha256=sha256,
+        filename=filename,
+        content_type=content_type,
+        size=size
+    )
+    db.add(attachment)
+    db.commit()
+    db.refresh(attachment)
+    return attachment
+
+def sweep_orphans(db: Session, store: BlobStore, now: Optional[datetime] = None) -> int:
+    """
+    Apaga blobs sem nenhum anexo que não foram usados no período de
+    carência (o upload que acabou de gravá-los pode ainda não ter criado o
+    anexo). O DELETE repete as condições, então um blob reaproveitado entre
+    a consulta e o DELETE fica.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=settings.attachment_orphan_grace_seconds)
+    orphan = ~exists().where(NoteAttachment.blob_sha256 == StoredBlob.sha256)
+    removed = 0
+    while True:
+        candidates = [row.sha256 for row in db.query(StoredBlob.sha256).filter(
+            StoredBlob.last_used_at < cutoff, orphan
+        ).limit(SWEEP_BATCH_SIZE)]
+        for sha256 in candidates:
+            deleted = db.query(StoredBlob).filter(
+                StoredBlob.sha256 == sha256,
+                StoredBlob.last_used_at < cutoff,
+                orphan
+            ).delete(synchronize_session=False)
+            db.commit()
+            if deleted:
+                store.delete(sha256)
+                removed += 1
+        if len(candidates) < SWEEP_BATCH_SIZE:
+            return removed
+
+class OrphanSweeper:
+    """Coleta periódica de blobs órfãos; a trava fica com um worker por intervalo"""
+
+    def __init__(self, store: BlobStore):
+        self.store = store
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def owner(self) -> str:
+        return worker_identity()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Attachment sweep failed")
+            await asyncio.sleep(settings.attachment_sweep_interval_seconds)
+
+    def run_once(self) -> Optional[int]:
+        """Executa uma coleta; retorna None se outro worker tem a trava"""
+        db = SessionLocal()
+        try:
+            if not acquire_lease(db, SWEEP_LEASE, self.owner, settings.attachment_sweep_interval_seconds):
+                return None
+            removed = sweep_orphans(db, self.store)
+            self.store.sweep_tmp(time.time() - settings.attachment_orphan_grace_seconds)
+            if removed:
+                logger.info("Removed %s orphan attachment blobs", removed)
+            return removed
+        finally:
+            db.close()
+
+blob_store = BlobStore(settings.attachment_dir)
+orphan_sweeper = OrphanSweeper(blob_store)
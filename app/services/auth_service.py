@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import SessionLocal
+from ..models.password_reset import PasswordResetToken
+from ..models.email_outbox import EmailOutbox
+from ..utils.security import generate_reset_token, hash_reset_token, create_reset_token_expires
+from .email_outbox import PENDING, SENT, FAILED
+from .lease_service import acquire_lease, worker_identity
+
+logger = logging.getLogger(__name__)
+
+RESET_PURGE_LEASE = "password_reset_purge"
+
+def issue_reset_token(db: Session, user_id: int) -> Tuple[str, PasswordResetToken]:
+    """
+    Cria um token de reset para o usuário e invalida os anteriores ainda
+    abertos; só o hash vai para o banco. Não faz commit. Retorna o token em
+    texto (para o email) e a linha criada.
+    """
+    db.query(PasswordResetToken).filter(
+        PasswordResetToken.user_id == user_id,
+        PasswordResetToken.used == False
+    ).update({"used": True}, synchronize_session=False)
+
+    token = generate_reset_token()
+    record = PasswordResetToken(
+        user_id=user_id,
+        token_hash=hash_reset_token(token),
+        expires_at=create_reset_token_expires()
+    )
+    db.add(record)
+    return token, record
+
+def consume_reset_token(db: Session, token: str) -> Optional[PasswordResetToken]:
+    """
+    Busca o token pelo hash (uma linha, pelo índice único) e o marca como
+    usado. O UPDATE condicional garante que dois pedidos simultâneos com o
+    mesmo token não funcionem os dois. Não faz commit.
+    """
+    record = db.query(PasswordResetToken).filter(
+        PasswordResetToken.token_hash == hash_reset_token(token)
+    ).first()
+    if record is None or record.used or record.expires_at <= datetime.utcnow():
+        return None
+
+    claimed = db.query(PasswordResetToken).filter(
+        PasswordResetToken.id == record.id,
+        PasswordResetToken.used == False
+    ).update({"used": True}, synchronize_session=False)
+    return record if claimed else None
+
+def purge_reset_tokens(db: Session, now: Optional[datetime] = None, batch_size: int = 1000) -> int:
+    """
+    Apaga, em lotes, tokens vencidos há mais de PASSWORD_RESET_RETENTION_HOURS.
+    Tokens usados ou invalidados também vencem, então saem pelo mesmo filtro
+    (e pelo índice de expires_at).
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(hours=settings.password_reset_retention_hours)
+    deleted = 0
+    while True:
+        ids = [row.id for row in db.query(PasswordResetToken.id).filter(
+            PasswordResetToken.expires_at < cutoff
+        ).limit(batch_size)]
+        if not ids:
+            return deleted
+        db.query(PasswordResetToken).filter(
+            PasswordResetToken.id.in_(ids)
+        ).delete(synchronize_session=False)
+        # Commit por lote: transações curtas não travam a tabela
+        db.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            return deleted
+
+def purge_reset_emails(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Emails de reset guardam o link em texto até serem entregues. Quando o
+    link já venceu, os que ainda não saíram (pendentes ou que falharam de
+    vez) são apagados, e os já tratados perdem o corpo que ainda tiverem
+    (linhas anteriores à remoção do corpo na entrega). Retorna quantos
+    foram apagados.
+    """
+    now = now or datetime.utcnow()
+    expired = now - timedelta(minutes=settings.password_reset_token_expire_minutes)
+    deleted = db.query(EmailOutbox).filter(
+        EmailOutbox.kind == "password_reset",
+        EmailOutbox.status.in_((PENDING, FAILED)),
+        EmailOutbox.created_at < expired
+    ).delete(synchronize_session=False)
+    db.query(EmailOutbox).filter(
+        EmailOutbox.kind == "password_reset",
+        EmailOutbox.status == SENT,
+        EmailOutbox.html_body != ""
+    ).update({"html_body": "", "text_body": None}, synchronize_session=False)
+    db.commit()
+    return deleted
+
+class ResetTokenPurger:
+    """
+    Limpeza periódica dos tokens de reset. A trava fica com o worker por um
+    intervalo inteiro, então só um deles faz a limpeza a cada intervalo.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def owner(self) -> str:
+        return worker_identity()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Password reset token purge failed")
+            await asyncio.sleep(settings.password_reset_purge_interval_seconds)
+
+    def run_once(self) -> Optional[int]:
+        """Executa uma limpeza; retorna None se outro worker tem a trava"""
+        db = SessionLocal()
+        try:
+            if not acquire_lease(db, RESET_PURGE_LEASE, self.owner, settings.password_reset_purge_interval_seconds):
+                return None
+            deleted = purge_reset_tokens(db, batch_size=settings.password_reset_purge_batch_size)
+            purge_reset_emails(db)
+            if deleted:
+                logger.info("Purged %s password reset tokens", deleted)
+            return deleted
+        finally:
+            db.close()
+
+reset_token_purger = ResetTokenPurger()
@@ -0,0 +1,133 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, status
+from ..config import settings
+from ..utils.metrics import registry
+
+AUTH_THROTTLED = registry.counter(
+    "auth_throttled_total", "Tentativas de autenticação recusadas pelo limite", ("action", "key")
+)
+
+class RateLimitBackend:
+    """
+    Interface dos contadores de tentativas. O backend em memória vale por
+    worker; um backend compartilhado (ex.: Redis) implementa os mesmos
+    métodos para o limite valer para o conjunto de workers.
+    """
+
+    def hit(self, key: str, limit: int, window_seconds: float) -> float:
+        """Registra uma tentativa; retorna 0 se permitida ou os segundos até a próxima ser aceita"""
+        raise NotImplementedError
+
+    def reset(self, key: str):
+        raise NotImplementedError
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    Janela deslizante aproximada (janela atual + anterior ponderada), com
+    O(1) de memória por chave. No máximo `max_keys` chaves: as usadas há
+    mais tempo são descartadas primeiro.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # chave -> [início da janela atual, tentativas na atual, tentativas na anterior]
+        self._windows: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, window_seconds: float, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        start = now - (now % window_seconds)
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None:
+                state = [start, 0, 0]
+            elif state[0] != start:
+                previous = state[1] if start - state[0] == window_seconds else 0
+                state = [start, 0, previous]
+            self._windows[key] = state
+            self._windows.move_to_end(key)
+            while len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+
+            elapsed = now - start
+            _, current, previous = state
+            if previous * (1 - elapsed / window_seconds) + current < limit:
+                state[1] += 1
+                return 0.0
+            return self._retry_after(limit, window_seconds, elapsed, current, previous)
+
+    @staticmethod
+    def _retry_after(limit: int, window: float, elapsed: float, current: float, previous: float) -> float:
+        # Mesma conta de hit: aceita quando previous × (1 - t/window) + current < limit
+        room = limit - current
+        if room > 0 and previous > 0:
+            # Ainda nesta janela, quando o peso da anterior cair o suficiente
+            wait = window * (1 - room / previous) - elapsed
+        else:
+            # Só na próxima janela, quando a atual virar a anterior
+            wait = (window - elapsed) + window * max(0.0, 1 - limit / max(current, 1))
+        return max(wait, 1.0)
+
+    def reset(self, key: str):
+        with self._lock:
+            self._windows.pop(key, None)
+
+class AuthThrottle:
+    """
+    Limita login e recuperação de senha por IP e por email. A checagem
+    acontece antes de qualquer consulta ao banco ou verificação de bcrypt,
+    para que rajadas de credential stuffing custem quase nada.
+    """
+
+    def __init__(self, backend: RateLimitBackend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.rules = {
+            "login": (
+                settings.login_limit_per_ip,
+                settings.login_limit_per_email,
+                settings.login_window_seconds
+            ),
+            "forgot_password": (
+                settings.forgot_password_limit_per_ip,
+                settings.forgot_password_limit_per_email,
+                settings.forgot_password_window_seconds
+            ),
+        }
+
+    @staticmethod
+    def _keys(action: str, ip: Optional[str], email: Optional[str]) -> Tuple[str, str]:
+        return f"{action}:ip:{ip or 'unknown'}", f"{action}:email:{(email or '').strip().lower()}"
+
+    def check(self, action: str, ip: Optional[str], email: Optional[str]):
+        """Levanta 429 com Retry-After se o IP ou o email passou do limite"""
+        if not self.enabled:
+            return
+        per_ip, per_email, window = self.rules[action]
+        ip_key, email_key = self._keys(action, ip, email)
+
+        for kind, key, limit in (("ip", ip_key, per_ip), ("email", email_key, per_email)):
+            if limit <= 0:
+                continue
+            retry_after = self.backend.hit(key, limit, window)
+            if retry_after:
+                AUTH_THROTTLED.inc(action, kind)
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many attempts, try again later",
+                    headers={"Retry-After": str(math.ceil(retry_after))}
+                )
+
+    def reset_email(self, action: str, email: str):
+        """Depois de um login certo as tentativas erradas daquele email não contam mais"""
+        if self.enabled:
+            self.backend.reset(self._keys(action, None, email)[1])
+
+auth_throttle = AuthThrottle(
+    backend=MemoryRateLimitBackend(max_keys=settings.auth_rate_limit_max_keys),
+    enabled=settings.auth_rate_limit_enabled
+)
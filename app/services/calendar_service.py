@@ -0,0 +1,332 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from itertools import groupby
+from sqlalchemy import and_, false, func, true
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import SessionLocal
+from ..models.calendar_event import CalendarEvent
+from ..models.user import User, UserSettings, EventType, UserReminderSettings
+from .email_service import email_service
+from .email_templates import email_templates
+from .lease_service import acquire_lease, release_lease, worker_identity
+
+logger = logging.getLogger(__name__)
+
+REMINDER_LEASE = "calendar_reminders"
+DEFAULT_TIMEZONE = "America/Sao_Paulo"
+
+@dataclass
+class DueReminder:
+    event_id: int
+    user_id: int
+    title: str
+    event_date: date
+    event_type: str
+    email: str
+    user_name: str
+    days_until: int
+    locale: Optional[str] = None
+
+@dataclass
+class ReminderRunStats:
+    scanned: int = 0
+    sent: int = 0
+    failed: int = 0
+    digests: int = 0
+
+_zone_cache: Dict[str, ZoneInfo] = {}
+
+def get_zone(name: Optional[str]) -> ZoneInfo:
+    """Fuso horário do usuário; nomes inválidos caem para o padrão do app"""
+    name = name or DEFAULT_TIMEZONE
+    zone = _zone_cache.get(name)
+    if zone is None:
+        try:
+            zone = ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            zone = ZoneInfo(DEFAULT_TIMEZONE)
+        _zone_cache[name] = zone
+    return zone
+
+def effective_reminder_days():
+    """
+    Antecedência do lembrete em SQL: a configuração do usuário para o tipo
+    de evento tem prioridade sobre o valor gravado no evento e o padrão do tipo.
+    """
+    return func.coalesce(
+        UserReminderSettings.reminder_days,
+        CalendarEvent.reminder_days,
+        EventType.default_reminder_days
+    )
+
+def _candidate_query(db: Session, today: date):
+    """
+    Eventos ainda sem lembrete numa janela de datas larga o bastante para
+    qualquer fuso (±1 dia), coberta por ix_calendar_events_reminder_due.
+    O corte exato por fuso do usuário é feito em Python.
+    """
+    return db.query(
+        CalendarEvent.id,
+        CalendarEvent.user_id,
+        CalendarEvent.title,
+        CalendarEvent.event_date,
+        EventType.name.label("event_type"),
+        User.email,
+        User.name.label("user_name"),
+        UserSettings.timezone,
+        UserSettings.locale,
+        effective_reminder_days().label("reminder_days")
+    ).join(
+        User, User.id == CalendarEvent.user_id
+    ).join(
+        EventType, EventType.id == CalendarEvent.event_type_id
+    ).outerjoin(
+        UserSettings, UserSettings.user_id == CalendarEvent.user_id
+    ).outerjoin(
+        UserReminderSettings, and_(
+            UserReminderSettings.user_id == CalendarEvent.user_id,
+            UserReminderSettings.event_type_id == CalendarEvent.event_type_id
+        )
+    ).filter(
+        CalendarEvent.reminder_sent == False,
+        CalendarEvent.event_date >= today - timedelta(days=1),
+        CalendarEvent.event_date <= today + timedelta(days=settings.reminder_lookahead_days + 1),
+        User.is_active == True,
+        func.coalesce(UserSettings.email_notifications, true()) == True
+    )
+
+def fetch_reminder_candidates(db: Session, today: date, after_id: int, limit: int):
+    """Próximo lote de eventos de usuários que recebem um email por lembrete"""
+    return _candidate_query(db, today).filter(
+        CalendarEvent.id > after_id,
+        func.coalesce(UserSettings.reminder_digest, false()) == False
+    ).order_by(CalendarEvent.id.asc()).limit(limit).all()
+
+def fetch_digest_users(db: Session, after_user_id: int, limit: int):
+    """Próximo lote de usuários com o resumo diário ativado"""
+    return db.query(
+        User.id,
+        UserSettings.timezone,
+        UserSettings.digest_hour,
+        UserSettings.last_digest_sent_on
+    ).join(
+        UserSettings, UserSettings.user_id == User.id
+    ).filter(
+        UserSettings.reminder_digest == True,
+        func.coalesce(UserSettings.email_notifications, true()) == True,
+        User.is_active == True,
+        User.id > after_user_id
+    ).order_by(User.id.asc()).limit(limit).all()
+
+def fetch_digest_events(db: Session, today: date, user_ids: List[int]):
+    """Eventos de todo um lote de usuários numa consulta só, agrupados por usuário"""
+    return _candidate_query(db, today).filter(
+        CalendarEvent.user_id.in_(user_ids)
+    ).order_by(CalendarEvent.user_id, CalendarEvent.event_date, CalendarEvent.id).all()
+
+def select_due_reminders(rows, now: datetime, check_send_hour: bool = True) -> List[DueReminder]:
+    """Filtra as linhas cujo lembrete já venceu no fuso de cada usuário"""
+    due = []
+    for row in rows:
+        local_now = now.astimezone(get_zone(row.timezone))
+        if check_send_hour and local_now.hour < settings.reminder_send_hour:
+            continue
+
+        days_until = (row.event_date - local_now.date()).days
+        if 0 <= days_until <= (row.reminder_days or 0):
+            due.append(DueReminder(
+                event_id=row.id,
+                user_id=row.user_id,
+                title=row.title,
+                event_date=row.event_date,
+                event_type=row.event_type,
+                email=row.email,
+                user_name=row.user_name,
+                days_until=days_until,
+                locale=row.locale
+            ))
+    return due
+
+def mark_reminders_sent(db: Session, event_ids: List[int]):
+    """Marca os lembretes enviados com um único UPDATE"""
+    if not event_ids:
+        return
+    db.query(CalendarEvent).filter(
+        CalendarEvent.id.in_(event_ids),
+        CalendarEvent.reminder_sent == False
+    ).update({"reminder_sent": True}, synchronize_session=False)
+    db.commit()
+
+def mark_digests_sent(db: Session, sent_on: Dict[date, List[int]]):
+    """Registra o dia (local) do último resumo; um UPDATE por data"""
+    for local_date, user_ids in sent_on.items():
+        db.query(UserSettings).filter(
+            UserSettings.user_id.in_(user_ids)
+        ).update({"last_digest_sent_on": local_date}, synchronize_session=False)
+    db.commit()
+
+async def send_digests(digests: List[List[DueReminder]]) -> List[bool]:
+    """Envia um email por usuário com todos os lembretes do dia"""
+    rendered = email_templates.render_many("digest", [
+        (reminders[0].locale, {
+            "user_name": reminders[0].user_name,
+            "events": [
+                {
+                    "title": reminder.title,
+                    "event_date": reminder.event_date,
+                    "event_type": reminder.event_type,
+                    "days_until": reminder.days_until
+                }
+                for reminder in reminders
+            ]
+        })
+        for reminders in digests
+    ])
+    messages = [
+        email_service.build_rendered(reminders[0].email, email)
+        for reminders, email in zip(digests, rendered)
+    ]
+    return await email_service.send_many(messages)
+
+async def send_reminders(reminders: List[DueReminder]) -> List[int]:
+    """Envia os lembretes pelo pool SMTP; retorna os ids enviados"""
+    rendered = email_templates.render_many("reminder", [
+        (reminder.locale, {
+            "user_name": reminder.user_name,
+            "event_title": reminder.title,
+            "event_date": reminder.event_date,
+            "event_type": reminder.event_type,
+            "days_until": reminder.days_until
+        })
+        for reminder in reminders
+    ])
+    messages = [
+        email_service.build_rendered(reminder.email, email)
+        for reminder, email in zip(reminders, rendered)
+    ]
+    results = await email_service.send_many(messages)
+    return [reminder.event_id for reminder, ok in zip(reminders, results) if ok]
+
+class ReminderDispatcher:
+    """
+    Verifica periodicamente os lembretes vencidos e envia os emails. Pode
+    rodar em todos os workers: a cada rodada só quem obtiver a trava
+    "calendar_reminders" faz o trabalho.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def owner(self) -> str:
+        return worker_identity()
+
+    async def start(self):
+        if self._task is None and settings.reminder_dispatch_enabled:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Reminder dispatch failed")
+            await asyncio.sleep(settings.reminder_interval_seconds)
+
+    async def run_once(self, now: Optional[datetime] = None) -> Optional[ReminderRunStats]:
+        """Executa uma rodada completa; retorna None se outro worker tem a trava"""
+        now = now or datetime.now(timezone.utc)
+        db = SessionLocal()
+        try:
+            if not acquire_lease(db, REMINDER_LEASE, self.owner, settings.reminder_lease_seconds):
+                return None
+
+            stats = ReminderRunStats()
+            after_id = 0
+            try:
+                while True:
+                    rows = fetch_reminder_candidates(db, now.date(), after_id, settings.reminder_batch_size)
+                    if not rows:
+                        break
+                    after_id = rows[-1].id
+                    stats.scanned += len(rows)
+
+                    due = select_due_reminders(rows, now)
+                    sent_ids = await send_reminders(due)
+                    mark_reminders_sent(db, sent_ids)
+                    stats.sent += len(sent_ids)
+                    stats.failed += len(due) - len(sent_ids)
+
+                    # Renova a trava a cada lote; se ela expirou e outro worker a pegou, para aqui
+                    if not acquire_lease(db, REMINDER_LEASE, self.owner, settings.reminder_lease_seconds):
+                        return stats
+
+                await self._dispatch_digests(db, now, stats)
+            finally:
+                release_lease(db, REMINDER_LEASE, self.owner)
+
+            if stats.sent or stats.failed:
+                logger.info(
+                    "Reminders: %s sent (%s digests), %s failed, %s scanned",
+                    stats.sent, stats.digests, stats.failed, stats.scanned
+                )
+            return stats
+        finally:
+            db.close()
+
+    async def _dispatch_digests(self, db: Session, now: datetime, stats: ReminderRunStats):
+        """Resumo diário: um email por usuário, na hora local escolhida por ele"""
+        after_user_id = 0
+        while True:
+            users = fetch_digest_users(db, after_user_id, settings.reminder_batch_size)
+            if not users:
+                break
+            after_user_id = users[-1].id
+
+            local_dates = {}
+            for user in users:
+                local_now = now.astimezone(get_zone(user.timezone))
+                digest_hour = user.digest_hour if user.digest_hour is not None else settings.reminder_send_hour
+                if local_now.hour >= digest_hour and user.last_digest_sent_on != local_now.date():
+                    local_dates[user.id] = local_now.date()
+            if not local_dates:
+                continue
+
+            rows = fetch_digest_events(db, now.date(), list(local_dates))
+            stats.scanned += len(rows)
+            due = select_due_reminders(rows, now, check_send_hour=False)
+            digests = [list(group) for _, group in groupby(due, key=lambda reminder: reminder.user_id)]
+
+            results = await send_digests(digests)
+            sent_event_ids = []
+            sent_on: Dict[date, List[int]] = {}
+            for reminders, ok in zip(digests, results):
+                if not ok:
+                    stats.failed += len(reminders)
+                    continue
+                user_id = reminders[0].user_id
+                sent_event_ids.extend(reminder.event_id for reminder in reminders)
+                sent_on.setdefault(local_dates[user_id], []).append(user_id)
+
+            mark_reminders_sent(db, sent_event_ids)
+            mark_digests_sent(db, sent_on)
+            stats.sent += len(sent_event_ids)
+            stats.digests += sum(len(user_ids) for user_ids in sent_on.values())
+
+            if not acquire_lease(db, REMINDER_LEASE, self.owner, settings.reminder_lease_seconds):
+                break
+
+reminder_dispatcher = ReminderDispatcher()
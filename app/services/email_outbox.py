@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import SessionLocal
+from ..models.email_outbox import EmailOutbox
+from .email_service import email_service, RenderedEmail
+from .lease_service import worker_identity
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL_SECONDS = 3600
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+# O corpo destes emails carrega um segredo (ex.: link de reset): depois da
+# entrega ou da desistência só ficam os metadados
+REDACTED_KINDS = ("password_reset",)
+
+def enqueue_email(
+    db: Session,
+    kind: str,
+    to_email: str,
+    rendered: RenderedEmail,
+    user_id: Optional[int] = None
+) -> EmailOutbox:
+    """
+    Grava o email na outbox sem fazer commit: ele só existe se a transação
+    de quem o criou (ex.: o token de reset) for confirmada.
+    """
+    entry = EmailOutbox(
+        user_id=user_id,
+        kind=kind,
+        to_email=to_email,
+        subject=rendered.subject,
+        html_body=rendered.html_content,
+        text_body=rendered.text_content,
+        status=PENDING,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.add(entry)
+    return entry
+
+def retry_delay(attempts: int) -> float:
+    """Backoff exponencial com jitter para a tentativa seguinte"""
+    ceiling = min(
+        settings.email_outbox_backoff_max_seconds,
+        settings.email_outbox_backoff_base_seconds * (2 ** max(attempts - 1, 0))
+    )
+    return random.uniform(ceiling / 2, ceiling)
+
+class EmailOutboxDispatcher:
+    """
+    Envia os emails da outbox em segundo plano. Acorda na hora quando o
+    próprio worker grava um email (wake) e, fora isso, a cada
+    EMAIL_OUTBOX_POLL_SECONDS para retentativas e emails de outros workers.
+    """
+
+    def __init__(self):
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_purge = 0.0
+        self._stopping = False
+
+    @property
+    def worker_id(self) -> str:
+        return worker_identity()
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self, timeout: float = 10.0):
+        """Deixa o lote em andamento terminar (até `timeout`) em vez de deixá-lo preso como "sending" """
+        if self._task is not None:
+            self._stopping = True
+            self.wake()
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout)
+            except Exception:
+                self._task.cancel()
+                await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def wake(self):
+        """Avisa que há email novo na outbox"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _loop(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                # Continua enquanto houver lotes cheios
+                while await self.dispatch_once() >= settings.email_outbox_batch_size:
+                    pass
+                if time.monotonic() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                    self._purge()
+                    self._last_purge = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email outbox dispatch failed")
+
+            if self._stopping:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.email_outbox_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def _claim(self, db: Session) -> List[EmailOutbox]:
+        """Reserva um lote para este worker com UPDATE condicional (seguro entre workers)"""
+        now = datetime.utcnow()
+
+        # Envios interrompidos (worker morreu no meio) voltam para a fila
+        stale_before = now - timedelta(seconds=settings.email_outbox_claim_timeout_seconds)
+        db.query(EmailOutbox).filter(
+            EmailOutbox.status == SENDING,
+            EmailOutbox.claimed_at < stale_before
+        ).update({"status": PENDING, "worker_id": None}, synchronize_session=False)
+
+        ids = [row.id for row in db.query(EmailOutbox.id).filter(
+            EmailOutbox.status == PENDING,
+            EmailOutbox.next_attempt_at <= now
+        ).order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).limit(settings.email_outbox_batch_size)]
+        if not ids:
+            db.commit()
+            return []
+
+        db.query(EmailOutbox).filter(
+            EmailOutbox.id.in_(ids),
+            EmailOutbox.status == PENDING
+        ).update({
+            "status": SENDING,
+            "worker_id": self.worker_id,
+            "claimed_at": now
+        }, synchronize_session=False)
+        db.commit()
+
+        return db.query(EmailOutbox).filter(
+            EmailOutbox.id.in_(ids),
+            EmailOutbox.status == SENDING,
+            EmailOutbox.worker_id == self.worker_id
+        ).all()
+
+    async def dispatch_once(self) -> int:
+        """Envia um lote da outbox; retorna quantos emails foram tentados"""
+        db = SessionLocal()
+        try:
+            entries = self._claim(db)
+            if not entries:
+                return 0
+
+            messages = [
+                email_service.build_message(
+                    to_email=entry.to_email,
+                    subject=entry.subject,
+                    html_content=entry.html_body,
+                    text_content=entry.text_body
+                )
+                for entry in entries
+            ]
+            results = await asyncio.gather(
+                *(email_service.pool.send_message(message) for message in messages),
+                return_exceptions=True
+            )
+
+            now = datetime.utcnow()
+            sent_ids = []
+            for entry, result in zip(entries, results):
+                if not isinstance(result, BaseException):
+                    sent_ids.append(entry.id)
+                    continue
+
+                entry.attempts += 1
+                entry.last_error = repr(result)[:1000]
+                entry.worker_id = None
+                if entry.attempts >= settings.email_outbox_max_attempts:
+                    entry.status = FAILED
+                    if entry.kind in REDACTED_KINDS:
+                        entry.html_body = ""
+                        entry.text_body = None
+                    logger.error("Giving up on email %s to %s: %r", entry.id, entry.to_email, result)
+                else:
+                    entry.status = PENDING
+                    entry.next_attempt_at = now + timedelta(seconds=retry_delay(entry.attempts))
+                    logger.warning("Email %s failed (attempt %s): %r", entry.id, entry.attempts, result)
+
+            if sent_ids:
+                db.query(EmailOutbox).filter(EmailOutbox.id.in_(sent_ids)).update({
+                    "status": SENT,
+                    "attempts": EmailOutbox.attempts + 1,
+                    "last_error": None,
+                    "sent_at": now
+                }, synchronize_session=False)
+                db.query(EmailOutbox).filter(
+                    EmailOutbox.id.in_(sent_ids),
+                    EmailOutbox.kind.in_(REDACTED_KINDS)
+                ).update({"html_body": "", "text_body": None}, synchronize_session=False)
+            db.commit()
+            return len(entries)
+        finally:
+            db.close()
+
+    def _purge(self):
+        """Apaga emails enviados e os que falharam de vez depois dos prazos de retenção"""
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            db.query(EmailOutbox).filter(
+                EmailOutbox.status == SENT,
+                EmailOutbox.sent_at < now - timedelta(days=settings.email_outbox_retention_days)
+            ).delete(synchronize_session=False)
+            # Sem sent_at: a idade conta da criação
+            db.query(EmailOutbox).filter(
+                EmailOutbox.status == FAILED,
+                EmailOutbox.created_at < now - timedelta(days=settings.email_outbox_failed_retention_days)
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+email_outbox = EmailOutboxDispatcher()
@@ -1,9 +1,14 @@
-import aiosmtplib
+import asyncio
+import logging
+from datetime import date
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List
-from jinja2 import Template
+from typing import List, Optional, Union
 from ..config import settings
+from .email_templates import email_templates, RenderedEmail
+from .smtp_pool import SMTPPool
+
+logger = logging.getLogger(__name__)
 
 class EmailService:
     def __init__(self):
@@ -13,100 +18,117 @@ class EmailService:
         self.smtp_password = settings.smtp_password
         self.from_email = settings.smtp_from_email
         self.from_name = settings.smtp_from_name
+        self.pool = SMTPPool(
+            hostname=self.smtp_host,
+            port=self.smtp_port,
+            username=self.smtp_user,
+            password=self.smtp_password,
+            start_tls=settings.smtp_start_tls,
+            size=settings.smtp_pool_size,
+            max_messages=settings.smtp_pool_max_messages,
+            idle_timeout=settings.smtp_pool_idle_seconds,
+            check_after=settings.smtp_pool_check_seconds,
+            timeout=settings.smtp_timeout_seconds,
+            rate_limit=settings.smtp_rate_limit_per_second
+        )
 
-    async def send_email(
+    async def close(self):
+        await self.pool.close()
+
+    def build_message(
         self, 
         to_email: str, 
         subject: str, 
         html_content: str, 
         text_content: str = None
-    ) -> bool:
-        """Envia email"""
+    ) -> MIMEMultipart:
+        """Monta a mensagem MIME (texto + HTML)"""
+        message = MIMEMultipart("alternative")
+        message["Subject"] = subject
+        message["From"] = f"{self.from_name} <{self.from_email}>"
+        message["To"] = to_email
+
+        # Text part
+        if text_content:
+            text_part = MIMEText(text_content, "plain", "utf-8")
+            message.attach(text_part)
+
+        # HTML part
+        html_part = MIMEText(html_content, "html", "utf-8")
+        message.attach(html_part)
+
+        return message
+
+    def build_rendered(self, to_email: str, rendered: RenderedEmail) -> MIMEMultipart:
+        return self.build_message(
+            to_email=to_email,
+            subject=rendered.subject,
+            html_content=rendered.html_content,
+            text_content=rendered.text_content
+        )
+
+    async def send_message(self, message: MIMEMultipart) -> bool:
+        """Envia uma mensagem já montada por uma conexão do pool"""
         try:
-            message = MIMEMultipart("alternative")
-            message["Subject"] = subject
-            message["From"] = f"{self.from_name} <{self.from_email}>"
-            message["To"] = to_email
-
-            # Text part
-            if text_content:
-                text_part = MIMEText(text_content, "plain", "utf-8")
-                message.attach(text_part)
-
-            # HTML part
-            html_part = MIMEText(html_content, "html", "utf-8")
-            message.attach(html_part)
-
-            await aiosmtplib.send(
-                message,
-                hostname=self.smtp_host,
-                port=self.smtp_port,
-                start_tls=True,
-                username=self.smtp_user,
-                password=self.smtp_password,
-            )
+            await self.pool.send_message(message)
             return True
         except Exception as e:
-            print(f"Error sending email: {e}")
+            logger.warning("Error sending email to %s: %r", message["To"], e)
             return False
 
-    async def send_password_reset_email(self, to_email: str, reset_token: str, user_name: str) -> bool:
+    async def send_many(self, messages: List[MIMEMultipart]) -> List[bool]:
+        """
+        Envia várias mensagens reaproveitando as conexões do pool. A
+        concorrência é limitada pelo tamanho do pool e pelo rate limit.
+        Retorna, na mesma ordem, se cada mensagem foi enviada.
+        """
+        return list(await asyncio.gather(*(self.send_message(message) for message in messages)))
+
+    async def send_email(
+        self, 
+        to_email: str, 
+        subject: str, 
+        html_content: str, 
+        text_content: str = None
+    ) -> bool:
+        """Envia email"""
+        message = self.build_message(to_email, subject, html_content, text_content)
+        return await self.send_message(message)
+
+    async def send_password_reset_email(
+        self, 
+        to_email: str, 
+        reset_token: str, 
+        user_name: str, 
+        locale: Optional[str] = None
+    ) -> bool:
         """Envia email de reset de senha"""
-        reset_url = f"{settings.frontend_url}/reset-password?token={reset_token}"
-        
-        html_template = Template("""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>Reset de Senha - StudyApp</title>
-        </head>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #3B82F6;">Olá, {{ user_name }}!</h2>
-                <p>Você solicitou a redefinição da sua senha no StudyApp.</p>
-                <p>Clique no botão abaixo para criar uma nova senha:</p>
-                <div style="text-align: center; margin: 30px 0;">
-                    <a href="{{ reset_url }}" style="background-color: #3B82F6; color: white; padding: 12px 30px; text-decoration: none; border-radius: 5px; display: inline-block;">
-                        Redefinir Senha
-                    </a>
-                </div>
-                <p><strong>Atenção:</strong> Este link expira em 30 minutos.</p>
-                <p>Se você não solicitou esta redefinição, ignore este email.</p>
-                <hr style="margin: 30px 0; border: none; border-top: 1px solid #eee;">
-                <p style="font-size: 12px; color: #666;">
-                    StudyApp - Sistema de Organização de Estudos
-                </p>
-            </div>
-        </body>
-        </html>
-        """)
-        
-        html_content = html_template.render(
+        message = self.build_password_reset_email(to_email, reset_token, user_name, locale)
+        return await self.send_message(message)
+
+    def build_password_reset_email(
+        self, 
+        to_email: str, 
+        reset_token: str, 
+        user_name: str, 
+        locale: Optional[str] = None
+    ) -> MIMEMultipart:
+        """Monta o email de reset de senha"""
+        return self.build_rendered(to_email, self.render_password_reset_email(reset_token, user_name, locale))
+
+    def render_password_reset_email(
+        self, 
+        reset_token: str, 
+        user_name: str, 
+        locale: Optional[str] = None
+    ) -> RenderedEmail:
+        """Renderiza assunto e corpo do email de reset de senha"""
+        return email_templates.render(
+            "password_reset",
+            locale,
             user_name=user_name,
-            reset_url=reset_url
-        )
-        
-        text_content = f"""
-        Olá, {user_name}!
-        
-        Você solicitou a redefinição da sua senha no StudyApp.
-        
-        Acesse o link abaixo para criar uma nova senha:
-        {reset_url}
-        
-        Atenção: Este link expira em 30 minutos.
-        
-        Se você não solicitou esta redefinição, ignore este email.
-        
-        StudyApp - Sistema de Organização de Estudos
-        """
-        
-        return await self.send_email(
-            to_email=to_email,
-            subject="Reset de Senha - StudyApp",
-            html_content=html_content,
-            text_content=text_content
+            reset_url=f"{settings.frontend_url}/reset-password?token={reset_token}",
+            expire_minutes=settings.password_reset_token_expire_minutes
         )
 
     async def send_reminder_email(
@@ -114,75 +136,51 @@ class EmailService:
         to_email: str, 
         user_name: str, 
         event_title: str, 
-        event_date: str, 
+        event_date: Union[date, str], 
         event_type: str,
-        days_until: int
+        days_until: int,
+        locale: Optional[str] = None
     ) -> bool:
         """Envia email de lembrete de evento"""
-        subject = f"Lembrete: {event_title}"
-        
-        if days_until == 0:
-            time_text = "hoje"
-        elif days_until == 1:
-            time_text = "amanhã"
-        else:
-            time_text = f"em {days_until} dias"
-        
-        html_template = Template("""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>Lembrete - StudyApp</title>
-        </head>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h2 style="color: #3B82F6;">Olá, {{ user_name }}!</h2>
-                <p>Este é um lembrete sobre o seu compromisso:</p>
-                <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                    <h3 style="margin: 0 0 10px 0; color: #1f2937;">{{ event_title }}</h3>
-                    <p style="margin: 5px 0;"><strong>Tipo:</strong> {{ event_type }}</p>
-                    <p style="margin: 5px 0;"><strong>Data:</strong> {{ event_date }}</p>
-                    <p style="margin: 5px 0;"><strong>Acontece:</strong> {{ time_text }}</p>
-                </div>
-                <p>Não se esqueça de se preparar!</p>
-                <hr style="margin: 30px 0; border: none; border-top: 1px solid #eee;">
-                <p style="font-size: 12px; color: #666;">
-                    StudyApp - Sistema de Organização de Estudos
-                </p>
-            </div>
-        </body>
-        </html>
-        """)
-        
-        html_content = html_template.render(
+        message = self.build_reminder_email(
+            to_email, user_name, event_title, event_date, event_type, days_until, locale
+        )
+        return await self.send_message(message)
+
+    def build_reminder_email(
+        self, 
+        to_email: str, 
+        user_name: str, 
+        event_title: str, 
+        event_date: Union[date, str], 
+        event_type: str,
+        days_until: int,
+        locale: Optional[str] = None
+    ) -> MIMEMultipart:
+        """Monta o email de lembrete de evento"""
+        return self.build_rendered(
+            to_email,
+            self.render_reminder_email(user_name, event_title, event_date, event_type, days_until, locale)
+        )
+
+    def render_reminder_email(
+        self, 
+        user_name: str, 
+        event_title: str, 
+        event_date: Union[date, str], 
+        event_type: str,
+        days_until: int,
+        locale: Optional[str] = None
+    ) -> RenderedEmail:
+        """Renderiza assunto e corpo do email de lembrete de evento"""
+        return email_templates.render(
+            "reminder",
+            locale,
             user_name=user_name,
             event_title=event_title,
-            event_type=event_type,
             event_date=event_date,
-            time_text=time_text
-        )
-        
-        text_content = f"""
-        Olá, {user_name}!
-        
-        Este é um lembrete sobre o seu compromisso:
-        
-        {event_title}
-        Tipo: {event_type}
-        Data: {event_date}
-        Acontece: {time_text}
-        
-        Não se esqueça de se preparar!
-        
-        StudyApp - Sistema de Organização de Estudos
-        """
-        
-        return await self.send_email(
-            to_email=to_email,
-            subject=subject,
-            html_content=html_content,
-            text_content=text_content
+            event_type=event_type,
+            days_until=days_until
         )
 
-email_service = EmailService()
\ No newline at end of file
+email_service = EmailService()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, StrictUndefined
+from ..config import settings
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "email")
+
+@dataclass
+class RenderedEmail:
+    """Conteúdo de um email já renderizado, pronto para montar a mensagem"""
+    subject: str
+    html_content: str
+    text_content: str = None
+
+def format_date(value, fmt: str) -> str:
+    """Filtro datefmt: formata datas e deixa strings já formatadas como estão"""
+    if isinstance(value, date):
+        return value.strftime(fmt)
+    return value
+
+class EmailTemplateRegistry:
+    """
+    Templates de email em arquivos (app/templates/email/<locale>/<nome>.j2).
+    Cada arquivo gera assunto, HTML e texto a partir dos blocos subject,
+    content e text, com o mesmo contexto. Os templates são compilados uma
+    vez (load) e o bytecode fica em cache em disco entre reinícios.
+    """
+
+    def __init__(self, directory: str, cache_dir: str, default_locale: str, auto_reload: bool = False):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.directory = directory
+        self.default_locale = default_locale
+        self.env = Environment(
+            loader=FileSystemLoader(directory),
+            bytecode_cache=FileSystemBytecodeCache(cache_dir),
+            autoescape=True,
+            auto_reload=auto_reload,
+            undefined=StrictUndefined,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            cache_size=-1
+        )
+        self.env.filters["datefmt"] = format_date
+        self.locales = sorted(
+            name for name in os.listdir(directory)
+            if os.path.isdir(os.path.join(directory, name))
+        )
+
+    def load(self) -> int:
+        """Compila todos os templates agora, para o primeiro envio não pagar por isso"""
+        names = self.env.list_templates(filter_func=lambda name: name.endswith(".j2"))
+        for name in names:
+            self.env.get_template(name)
+        return len(names)
+
+    def resolve_locale(self, locale: Optional[str]) -> str:
+        """Locale suportado mais próximo: exato, depois pelo idioma ("en-US" -> "en"), depois o padrão"""
+        if locale:
+            if locale in self.locales:
+                return locale
+            language = locale.replace("_", "-").split("-")[0].lower()
+            for candidate in self.locales:
+                if candidate.split("-")[0].lower() == language:
+                    return candidate
+        return self.default_locale
+
+    def render(self, name: str, locale: Optional[str] = None, **context) -> RenderedEmail:
+        template = self.env.get_template(f"{self.resolve_locale(locale)}/{name}.j2")
+        return self._render(template, context)
+
+    def render_many(self, name: str, items: Iterable[Tuple[Optional[str], dict]]) -> List[RenderedEmail]:
+        """Renderiza vários emails do mesmo tipo buscando cada template uma vez só"""
+        templates = {}
+        rendered = []
+        for locale, context in items:
+            locale = self.resolve_locale(locale)
+            template = templates.get(locale)
+            if template is None:
+                template = templates[locale] = self.env.get_template(f"{locale}/{name}.j2")
+            rendered.append(self._render(template, context))
+        return rendered
+
+    def _render(self, template, context: dict) -> RenderedEmail:
+        ctx = template.new_context(dict(context))
+        # A renderização completa gera o HTML e executa os {% set %} do topo,
+        # que ficam no contexto para os blocos de assunto e texto
+        html = self.env.concat(template.root_render_func(ctx))
+        subject = self.env.concat(template.blocks["subject"](ctx))
+        text = self.env.concat(template.blocks["text"](ctx))
+        return RenderedEmail(
+            subject=" ".join(subject.split()),
+            html_content=html.strip(),
+            text_content=text.strip()
+        )
+
+email_templates = EmailTemplateRegistry(
+    directory=settings.email_template_dir or TEMPLATE_DIR,
+    cache_dir=settings.email_template_cache_dir or os.path.join(tempfile.gettempdir(), "studyapp-email-templates"),
+    default_locale=settings.email_default_locale,
+    auto_reload=settings.debug
+)
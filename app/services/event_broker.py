@@ -0,0 +1,354 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+from sqlalchemy import and_, or_
+from ..config import settings
+from ..database import SessionLocal
+from ..models.change_event import ChangeEvent
+from ..utils.metrics import registry
+from ..utils.overlap_cursor import OverlapCursor
+from .lease_service import worker_identity
+from .token_revocation import token_revocations
+
+logger = logging.getLogger(__name__)
+
+PING = object()  # heartbeat na fila da conexão; cada transporte o escreve do seu jeito
+READY = json.dumps({"type": "ready"})
+RESYNC = json.dumps({"type": "resync"})
+RECONNECT = json.dumps({"type": "reconnect"})
+UNAUTHORIZED = json.dumps({"type": "unauthorized"})
+
+EXCHANGE_BATCH_SIZE = 1000
+PURGE_INTERVAL_SECONDS = 60
+
+EVENTS_CONNECTIONS = registry.gauge(
+    "events_connections", "Conexões de eventos abertas no worker", ("transport",)
+)
+EVENTS_PUBLISHED = registry.counter(
+    "events_published_total", "Eventos de alteração publicados", ("type",)
+)
+EVENTS_OVERFLOWS = registry.counter(
+    "events_buffer_overflows_total", "Filas de conexão descartadas por atraso do cliente (viram resync)"
+)
+
+class ConnectionLimitError(Exception):
+    def __init__(self, per_user: bool):
+        super().__init__("per user" if per_user else "per worker")
+        self.per_user = per_user
+
+class Subscription:
+    """
+    Uma conexão de eventos (SSE ou WebSocket) de um usuário. As mensagens
+    esperam numa fila limitada a EVENTS_BUFFER_SIZE; se o cliente não
+    acompanha, a fila é descartada e ele recebe um único "resync" para
+    buscar as listas de novo.
+    """
+    __slots__ = ("user_id", "claims", "transport", "max_items", "closed", "_items", "_waiter")
+
+    def __init__(self, user_id: int, claims: dict, transport: str, max_items: int):
+        self.user_id = user_id
+        self.claims = claims
+        self.transport = transport
+        self.max_items = max_items
+        self.closed = False
+        self._items: Deque = deque()
+        self._waiter: Optional[asyncio.Future] = None
+
+    def push(self, message: str) -> bool:
+        """Enfileira uma mensagem; retorna False se a fila estourou"""
+        if self.closed:
+            return True
+        if self._items and self._items[0] is RESYNC:
+            # O resync pendente já cobre qualquer alteração nova
+            return True
+        if len(self._items) >= self.max_items:
+            self._items.clear()
+            self._items.append(RESYNC)
+            self._wake()
+            return False
+        self._items.append(message)
+        self._wake()
+        return True
+
+    def ping(self):
+        if not self.closed and not self._items:
+            self._items.append(PING)
+            self._wake()
+
+    def close(self, message: Optional[str] = None):
+        """Encerra a conexão depois de entregar `message`, se houver"""
+        self._items.clear()
+        if message is not None:
+            self._items.append(message)
+        self.closed = True
+        self._wake()
+
+    def expired(self, now: float) -> bool:
+        exp = self.claims.get("exp")
+        return (exp is not None and exp <= now) or token_revocations.is_revoked(self.claims)
+
+    async def next(self):
+        """Próxima mensagem (ou PING); None quando a conexão deve ser encerrada"""
+        while not self._items:
+            if self.closed:
+                return None
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._items.popleft()
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+class EventBackend:
+    """
+    Repasse dos eventos entre workers. O broker entrega na hora às conexões
+    do próprio worker; o backend leva o evento aos demais e chama `deliver`
+    com os que vieram deles. Um backend compartilhado (ex.: Redis pub/sub)
+    implementa os mesmos métodos.
+    """
+
+    async def start(self, deliver: Callable[[int, str], None]):
+        pass
+
+    async def stop(self):
+        pass
+
+    def publish(self, user_id: int, payload: str):
+        pass
+
+class LocalEventBackend(EventBackend):
+    """Sem repasse: basta quando há um único worker"""
+
+class DatabaseEventBackend(EventBackend):
+    """
+    Repasse pela tabela change_events. Os eventos publicados ficam em memória
+    e são gravados em lote no mesmo ciclo que lê os dos outros workers: a
+    requisição que publicou não espera o banco e cada worker faz uma
+    consulta por ciclo, não uma por conexão. O ciclo roda a cada
+    EVENTS_POLL_SECONDS ou logo que o worker publica algo. Um evento
+    perdido (worker derrubado antes de gravar) só atrasa a atualização até
+    a próxima reconexão do cliente.
+    """
+
+    def __init__(self, poll_seconds: float, retention_seconds: int):
+        self.poll_seconds = poll_seconds
+        self.retention_seconds = retention_seconds
+        self._pending: List[Tuple[int, str]] = []
+        # Releitura de dois ciclos: pega eventos cujo commit saiu fora da ordem dos ids
+        self._cursor = OverlapCursor(timedelta(seconds=poll_seconds * 2))
+        self._resume: Optional[Tuple[datetime, int]] = None  # (created_at, id) do fim do último lote cheio
+        self._last_purge = 0.0
+        self._deliver: Optional[Callable[[int, str], None]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    def owner(self) -> str:
+        return worker_identity()
+
+    async def start(self, deliver: Callable[[int, str], None]):
+        if self._task is not None:
+            return
+        self._deliver = deliver
+        # Só interessa o que for publicado daqui em diante
+        self._cursor.move_to(datetime.utcnow())
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._pending:
+            pending, self._pending = self._pending, []
+            try:
+                await asyncio.to_thread(self.exchange, pending)
+            except Exception:
+                logger.exception("Change event flush failed")
+
+    def publish(self, user_id: int, payload: str):
+        self._pending.append((user_id, payload))
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            # O que for publicado durante a troca entra no lote seguinte. A
+            # lista é trocada aqui, no event loop, onde publish acrescenta
+            self._wake.clear()
+            pending, self._pending = self._pending, []
+            try:
+                for user_id, payload in await asyncio.to_thread(self.exchange, pending):
+                    self._deliver(user_id, payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Change event sync failed")
+
+    def exchange(self, pending: List[Tuple[int, str]]) -> List[Tuple[int, str]]:
+        """Grava os eventos `pending` e retorna os publicados pelos outros workers (roda numa thread)"""
+        db = SessionLocal()
+        try:
+            if pending:
+                now = datetime.utcnow()
+                db.add_all([
+                    ChangeEvent(user_id=user_id, origin=self.owner, payload=payload, created_at=now)
+                    for user_id, payload in pending
+                ])
+                db.commit()
+
+            started = datetime.utcnow()
+            query = db.query(
+                ChangeEvent.id, ChangeEvent.user_id, ChangeEvent.origin, ChangeEvent.payload, ChangeEvent.created_at
+            ).filter(ChangeEvent.created_at >= self._cursor.since)
+            if self._resume is not None:
+                # Cada lote é gravado com um só created_at: continua pelo id
+                created_at, row_id = self._resume
+                query = query.filter(or_(
+                    ChangeEvent.created_at > created_at,
+                    and_(ChangeEvent.created_at == created_at, ChangeEvent.id > row_id)
+                ))
+            rows = query.order_by(ChangeEvent.created_at, ChangeEvent.id).limit(EXCHANGE_BATCH_SIZE).all()
+            received = []
+            for row in rows:
+                if self._cursor.seen(row.id, row.created_at) or row.origin == self.owner:
+                    continue
+                received.append((row.user_id, row.payload))
+            if len(rows) == EXCHANGE_BATCH_SIZE:
+                # Lote cheio: o próximo ciclo continua de onde este parou
+                self._resume = (rows[-1].created_at, rows[-1].id)
+                self._cursor.move_to(rows[-1].created_at)
+            else:
+                self._resume = None
+                self._cursor.advance(started)
+
+            if time.monotonic() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                db.query(ChangeEvent).filter(
+                    ChangeEvent.created_at < datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+                ).delete(synchronize_session=False)
+                db.commit()
+                self._last_purge = time.monotonic()
+            return received
+        finally:
+            db.close()
+
+class EventBroker:
+    """
+    Distribui eventos de alteração (ex.: {"type": "note.updated", "id": 7})
+    às conexões abertas de cada usuário, para os clientes não precisarem
+    consultar as listas periodicamente. Tudo roda no event loop do worker:
+    publish deve ser chamado de endpoints async, sem locks.
+
+    Um único timer por worker manda o heartbeat a todas as conexões ociosas
+    e, no mesmo passo, encerra as de tokens vencidos ou revogados.
+    """
+
+    def __init__(self, backend: EventBackend):
+        self.backend = backend
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._counts: Dict[str, int] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    @property
+    def connections(self) -> int:
+        return sum(self._counts.values())
+
+    def subscribe(self, user_id: int, claims: dict, transport: str) -> Subscription:
+        if self.connections >= settings.events_max_connections:
+            raise ConnectionLimitError(per_user=False)
+        subscriptions = self._subscribers.setdefault(user_id, set())
+        if len(subscriptions) >= settings.events_max_connections_per_user:
+            raise ConnectionLimitError(per_user=True)
+
+        subscription = Subscription(user_id, claims, transport, settings.events_buffer_size)
+        subscriptions.add(subscription)
+        self._count(transport, 1)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Pode ser chamado mais de uma vez para a mesma conexão"""
+        subscription.closed = True
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscribers[subscription.user_id]
+        self._count(subscription.transport, -1)
+
+    def _count(self, transport: str, delta: int):
+        self._counts[transport] = self._counts.get(transport, 0) + delta
+        EVENTS_CONNECTIONS.set(self._counts[transport], transport)
+
+    def publish(self, user_id: int, event_type: str, **fields):
+        """Publica uma alteração; chame depois do commit"""
+        payload = json.dumps({"type": event_type, **fields}, separators=(",", ":"), default=str)
+        EVENTS_PUBLISHED.inc(event_type)
+        self.deliver(user_id, payload)
+        self.backend.publish(user_id, payload)
+
+    def deliver(self, user_id: int, payload: str):
+        """Entrega às conexões deste worker (serializado uma vez para todas)"""
+        for subscription in self._subscribers.get(user_id, ()):
+            if not subscription.push(payload):
+                EVENTS_OVERFLOWS.inc()
+
+    def heartbeat(self, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        for subscriptions in list(self._subscribers.values()):
+            for subscription in list(subscriptions):
+                if subscription.expired(now):
+                    subscription.close(UNAUTHORIZED)
+                else:
+                    subscription.ping()
+
+    def close_all(self):
+        """Pede aos clientes que reconectem (em outro worker); usado no desligamento"""
+        for subscriptions in list(self._subscribers.values()):
+            for subscription in list(subscriptions):
+                subscription.close(RECONNECT)
+
+    async def start(self):
+        if self._heartbeat_task is not None:
+            return
+        await self.backend.start(self.deliver)
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+        self.close_all()
+        await self.backend.stop()
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(settings.events_heartbeat_seconds)
+            try:
+                self.heartbeat()
+            except Exception:
+                logger.exception("Event heartbeat failed")
+
+def _build_backend() -> EventBackend:
+    backend = settings.events_backend.lower()
+    if backend == "local":
+        return LocalEventBackend()
+    if backend == "database":
+        return DatabaseEventBackend(settings.events_poll_seconds, settings.events_retention_seconds)
+    raise ValueError(f"Unknown events backend: {settings.events_backend}")
+
+event_broker = EventBroker(_build_backend())
@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from ..config import settings
+from ..database import SessionLocal
+from ..models.flashcard_cache import FlashcardCacheEntry
+
+logger = logging.getLogger(__name__)
+
+_SPACES_RE = re.compile(r"\s+")
+
+def normalize_text(value: Optional[str]) -> str:
+    """Minúsculas, sem acentos e com espaços colapsados ("Cálculo  I" -> "calculo i")"""
+    value = unicodedata.normalize("NFKD", (value or "").casefold())
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    return _SPACES_RE.sub(" ", value).strip()
+
+def flashcard_cache_key(subject: str, topic: Optional[str], count: int, **extra) -> str:
+    """Chave normalizada para um pedido de geração de flashcards"""
+    parts = {
+        "subject": normalize_text(subject),
+        "topic": normalize_text(topic),
+        "count": count,
+        **extra
+    }
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class DatabaseCacheBackend:
+    """Guarda as entradas na tabela flashcard_cache_entries, compartilhada entre workers"""
+
+    def get(self, key: str) -> Optional[list]:
+        db = SessionLocal()
+        try:
+            entry = db.query(FlashcardCacheEntry).filter(
+                FlashcardCacheEntry.cache_key == key,
+                FlashcardCacheEntry.expires_at > datetime.utcnow()
+            ).first()
+            return json.loads(entry.payload) if entry else None
+        finally:
+            db.close()
+
+    def set(self, key: str, value: list, ttl_seconds: int):
+        db = SessionLocal()
+        try:
+            entry = db.query(FlashcardCacheEntry).filter(
+                FlashcardCacheEntry.cache_key == key
+            ).first()
+            if entry is None:
+                entry = FlashcardCacheEntry(cache_key=key)
+                db.add(entry)
+            entry.payload = json.dumps(value, ensure_ascii=False)
+            entry.expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Failed to persist flashcard cache entry")
+        finally:
+            db.close()
+
+class FlashcardCache:
+    """
+    Cache LRU com TTL na frente da geração de flashcards. Pedidos
+    simultâneos com a mesma chave compartilham uma única chamada ao LLM.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, backend: Optional[DatabaseCacheBackend] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._entries: "OrderedDict[str, Tuple[float, list]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def get(self, key: str) -> Optional[list]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                return value
+            del self._entries[key]
+
+        if self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                self._store(key, value)
+                return value
+        return None
+
+    def set(self, key: str, value: list):
+        self._store(key, value)
+        if self.backend is not None:
+            self.backend.set(key, value, self.ttl_seconds)
+
+    def _store(self, key: str, value: list):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_create(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[list]],
+        refresh: bool = False
+    ) -> Tuple[list, bool]:
+        """
+        Retorna (valor, veio_do_cache). Com refresh=True ignora o valor em
+        cache, mas ainda se junta a uma geração que já esteja em andamento.
+        """
+        if not refresh:
+            value = self.get(key)
+            if value is not None:
+                return value, True
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._generate(key, factory))
+            future.add_done_callback(self._discard_result)
+            self._inflight[key] = future
+
+        # shield: se quem iniciou desconectar, os demais continuam esperando
+        return await asyncio.shield(future), False
+
+    async def _generate(self, key: str, factory: Callable[[], Awaitable[list]]) -> list:
+        try:
+            value = await factory()
+            if value:
+                self.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def _discard_result(future: asyncio.Future):
+        # Evita "exception was never retrieved" quando todos os clientes cancelaram
+        if not future.cancelled():
+            future.exception()
+
+flashcard_cache = FlashcardCache(
+    max_entries=settings.flashcard_cache_max_entries,
+    ttl_seconds=settings.flashcard_cache_ttl_seconds,
+    backend=DatabaseCacheBackend() if settings.flashcard_cache_backend == "database" else None
+)
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional, Set
+from sqlalchemy import or_
+from ..config import settings
+from ..database import SessionLocal
+from ..models.flashcard_job import FlashcardJob
+from . import flashcard_service
+from .flashcard_cache import flashcard_cache
+from .llm_client import LLMError
+from .lease_service import worker_identity
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+class FlashcardJobQueue:
+    """
+    Fila de geração de flashcards processada por tarefas asyncio dentro do
+    worker. Os jobs ficam no banco (sobrevivem a reinícios); em memória
+    fica só a ordem de execução, em rodízio entre usuários para que um
+    usuário com muitos jobs não atrase os demais.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self._pending: Dict[int, Deque[int]] = {}
+        self._rotation: Deque[int] = deque()
+        self._known: Set[int] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def worker_id(self) -> str:
+        return worker_identity()
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._recover()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._poll()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, job_id: int, user_id: int):
+        """Coloca um job já gravado como "queued" na fila local"""
+        if job_id in self._known:
+            return
+        self._known.add(job_id)
+
+        queue = self._pending.get(user_id)
+        if queue is None:
+            queue = self._pending[user_id] = deque()
+            self._rotation.append(user_id)
+        queue.append(job_id)
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _next(self) -> Optional[int]:
+        if not self._rotation:
+            return None
+
+        user_id = self._rotation.popleft()
+        queue = self._pending[user_id]
+        job_id = queue.popleft()
+        if queue:
+            self._rotation.append(user_id)
+        else:
+            del self._pending[user_id]
+        return job_id
+
+    def _recover(self):
+        """
+        Trata jobs presos em "running" (worker morto ou travado) como uma
+        tentativa que falhou e carrega os jobs da fila que já podem rodar
+        """
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            stale = db.query(FlashcardJob.id, FlashcardJob.attempts).filter(
+                FlashcardJob.status == RUNNING,
+                FlashcardJob.started_at < now - timedelta(seconds=settings.flashcard_job_timeout_seconds)
+            ).all()
+            for job_id, attempts in stale:
+                db.query(FlashcardJob).filter(
+                    FlashcardJob.id == job_id,
+                    FlashcardJob.status == RUNNING
+                ).update(
+                    _failure_values(attempts, "Job timed out", now), synchronize_session=False
+                )
+            db.commit()
+
+            rows = db.query(FlashcardJob.id, FlashcardJob.user_id).filter(
+                FlashcardJob.status == QUEUED,
+                _due(now)
+            ).order_by(FlashcardJob.id).limit(1000).all()
+        finally:
+            db.close()
+
+        for job_id, user_id in rows:
+            self.enqueue(job_id, user_id)
+
+    async def _poll(self):
+        # Pega jobs de outros workers que morreram e jobs que voltaram para a fila
+        while True:
+            await asyncio.sleep(settings.flashcard_job_poll_seconds)
+            try:
+                self._recover()
+            except Exception:
+                logger.exception("Failed to poll flashcard jobs")
+
+    def _claim(self, job_id: int) -> Optional[FlashcardJob]:
+        """Marca o job como "running" só se ainda estiver na fila (seguro entre workers)"""
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            claimed = db.query(FlashcardJob).filter(
+                FlashcardJob.id == job_id,
+                FlashcardJob.status == QUEUED,
+                _due(now)
+            ).update({
+                "status": RUNNING,
+                "worker_id": self.worker_id,
+                "started_at": now,
+                "attempts": FlashcardJob.attempts + 1
+            }, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                return None
+
+            job = db.query(FlashcardJob).filter(FlashcardJob.id == job_id).first()
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _update(self, job_id: int, **values):
+        db = SessionLocal()
+        try:
+            db.query(FlashcardJob).filter(FlashcardJob.id == job_id).update(
+                values, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    async def _worker(self):
+        while True:
+            job_id = self._next()
+            if job_id is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            self._known.discard(job_id)
+            try:
+                job = self._claim(job_id)
+                if job is not None:
+                    await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Flashcard job %s crashed", job_id)
+
+    async def _run(self, job: FlashcardJob):
+        try:
+            flashcards, _ = await flashcard_cache.get_or_create(
+                flashcard_service.cache_key_for(job.subject, job.topic, job.count),
+                lambda: flashcard_service.request_flashcards(job.subject, job.topic, job.count),
+                refresh=job.regenerate
+            )
+        except asyncio.CancelledError:
+            # Worker encerrando: o job volta para a fila e outro worker continua
+            self._update(job.id, status=QUEUED, worker_id=None)
+            raise
+        except Exception as e:
+            if isinstance(e, (LLMError, ValueError)):
+                logger.warning("Flashcard job %s failed (attempt %s): %s", job.id, job.attempts, e)
+            else:
+                logger.exception("Flashcard job %s crashed (attempt %s)", job.id, job.attempts)
+            # Volta para a fila com espera; o poll periódico tenta de novo quando vencer
+            self._update(job.id, **_failure_values(job.attempts, str(e) or type(e).__name__, datetime.utcnow()))
+            return
+
+        self._update(
+            job.id,
+            status=SUCCEEDED,
+            result=json.dumps(flashcards, ensure_ascii=False),
+            error=None,
+            finished_at=datetime.utcnow()
+        )
+
+def _due(now: datetime):
+    return or_(FlashcardJob.next_attempt_at.is_(None), FlashcardJob.next_attempt_at <= now)
+
+def _failure_values(attempts: int, error: str, now: datetime) -> dict:
+    """Próximo estado de um job cuja tentativa falhou: de volta à fila com backoff exponencial, ou falha definitiva"""
+    if attempts >= settings.flashcard_job_max_attempts:
+        return {"status": FAILED, "worker_id": None, "error": error, "finished_at": now}
+    delay = settings.flashcard_job_retry_base_seconds * 2 ** max(attempts - 1, 0)
+    return {
+        "status": QUEUED,
+        "worker_id": None,
+        "error": error,
+        "next_attempt_at": now + timedelta(seconds=delay)
+    }
+
+flashcard_job_queue = FlashcardJobQueue(concurrency=settings.flashcard_job_concurrency)
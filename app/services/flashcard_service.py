@@ -0,0 +1,292 @@
+import asyncio
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+from ..config import settings
+from .flashcard_cache import flashcard_cache, flashcard_cache_key, normalize_text
+from .llm_client import llm_client, LLMError
+from ..utils.json_stream import JSONArrayStreamParser
+
+def build_flashcard_prompt(subject: str, topic: str = None, count: int = 20) -> str:
+    """Monta o prompt de geração de flashcards"""
+    if topic:
+        prompt = f"""Crie exatamente {count} flashcards educacionais sobre {subject}, focando especificamente em: {topic}.
+
+Cada flashcard deve ter:
+- Uma pergunta clara e direta
+- Uma resposta concisa e precisa
+
+Formate sua resposta como um JSON array com objetos contendo 'question' e 'answer'.
+
+Exemplo de formato esperado:
+[
+  {{"question": "O que é...?", "answer": "É..."}},
+  {{"question": "Como funciona...?", "answer": "Funciona através de..."}}
+]
+
+Agora crie os {count} flashcards:"""
+    else:
+        prompt = f"""Crie exatamente {count} flashcards educacionais sobre {subject}.
+
+Cada flashcard deve ter:
+- Uma pergunta clara e direta
+- Uma resposta concisa e precisa
+
+Formate sua resposta como um JSON array com objetos contendo 'question' e 'answer'.
+
+Exemplo de formato esperado:
+[
+  {{"question": "O que é...?", "answer": "É..."}},
+  {{"question": "Como funciona...?", "answer": "Funciona através de..."}}
+]
+
+Agora crie os {count} flashcards:"""
+    
+    return prompt
+
+def parse_flashcards(content: str) -> List[dict]:
+    """
+    Extrai o JSON array de flashcards da resposta do modelo. Itens sem
+    pergunta e resposta em texto são descartados; lança ValueError se não
+    sobra nenhum (o resultado vai para o cache e para os jobs, então precisa
+    estar no formato de FlashcardCardBase).
+    """
+    content = content.strip()
+    if content.startswith('```json'):
+        content = content[7:]
+    if content.startswith('```'):
+        content = content[3:]
+    if content.endswith('```'):
+        content = content[:-3]
+    
+    try:
+        items = json.loads(content.strip())
+    except ValueError:
+        # Resposta com lixo no final ou um objeto quebrado: aproveita o que der
+        parser = JSONArrayStreamParser()
+        items = parser.feed(content)
+        if not items:
+            raise
+    
+    if not isinstance(items, list):
+        raise ValueError("Expected a JSON array of flashcards")
+    flashcards = [
+        {"question": item["question"], "answer": item["answer"]}
+        for item in items
+        if isinstance(item, dict)
+        and isinstance(item.get("question"), str) and item["question"].strip()
+        and isinstance(item.get("answer"), str) and item["answer"].strip()
+    ]
+    if not flashcards:
+        raise ValueError("No valid flashcards in the model response")
+    return flashcards
+
+def flashcard_messages(prompt: str) -> List[dict]:
+    return [
+        {"role": "system", "content": "Você é um professor especializado em criar flashcards educacionais."},
+        {"role": "user", "content": prompt}
+    ]
+
+def cache_key_for(subject: str, topic: Optional[str], count: int) -> str:
+    """Chave de cache do pedido, incluindo provedor e modelo em uso"""
+    return flashcard_cache_key(
+        subject, topic, count,
+        provider=llm_client.provider.name,
+        model=llm_client.provider.model
+    )
+
+async def request_flashcards(subject: str, topic: Optional[str] = None, count: int = 20) -> List[dict]:
+    """
+    Pede os flashcards ao LLM e interpreta a resposta.
+    Lança LLMError (falha no provedor) ou ValueError (resposta inválida).
+    """
+    content = await llm_client.chat(
+        flashcard_messages(build_flashcard_prompt(subject, topic, count)),
+        temperature=0.7,
+        max_tokens=2000
+    )
+    return parse_flashcards(content)
+
+# Mudar o prompt de anotações exige mudar a versão para não reaproveitar cache antigo
+NOTES_PROMPT_VERSION = 1
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+
+def build_notes_prompt(subject: str, text: str, count: int) -> str:
+    """Monta o prompt de geração de flashcards a partir de um trecho de anotações"""
+    return f"""Crie até {count} flashcards educacionais sobre {subject} usando apenas o conteúdo das anotações abaixo.
+
+Cada flashcard deve ter:
+- Uma pergunta clara e direta
+- Uma resposta concisa e precisa, baseada nas anotações
+
+Formate sua resposta como um JSON array com objetos contendo 'question' e 'answer'.
+
+Anotações:
+---
+{text}
+---
+
+Agora crie os flashcards:"""
+
+def _paragraphs(text: str, max_chars: int) -> List[str]:
+    paragraphs = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        # Parágrafos enormes (transcrições sem quebra) são fatiados
+        for start in range(0, len(paragraph), max_chars):
+            paragraphs.append(paragraph[start:start + max_chars])
+    return paragraphs
+
+def chunk_text(text: str, max_chars: int, min_chars: int) -> List[str]:
+    """
+    Divide o texto em trechos de até max_chars respeitando parágrafos.
+    Além do limite de tamanho, um trecho termina depois de parágrafos cujo
+    hash cai num valor fixo: assim as fronteiras dependem do conteúdo e uma
+    edição num parágrafo não desloca todos os trechos seguintes.
+    """
+    chunks = []
+    current: List[str] = []
+    size = 0
+
+    for paragraph in _paragraphs(text, max_chars):
+        if current and size + len(paragraph) > max_chars:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+
+        current.append(paragraph)
+        size += len(paragraph) + 2
+
+        boundary = hashlib.blake2b(paragraph.encode("utf-8"), digest_size=1).digest()[0] % 4 == 0
+        if size >= min_chars and boundary:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+def chunk_cache_key(subject: str, text: str, count: int) -> str:
+    """Chave pelo hash do conteúdo do trecho (mais matéria, quantidade e modelo)"""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return flashcard_cache_key(
+        subject, None, count,
+        chunk=digest,
+        prompt_version=NOTES_PROMPT_VERSION,
+        provider=llm_client.provider.name,
+        model=llm_client.provider.model
+    )
+
+@dataclass
+class NotesGenerationResult:
+    flashcards: List[dict]
+    chunk_count: int
+    cached_chunk_count: int
+    failed_chunk_count: int
+
+async def generate_from_notes(
+    subject: str,
+    note_texts: List[str],
+    cards_per_chunk: int,
+    max_cards: int
+) -> NotesGenerationResult:
+    """
+    Gera flashcards a partir das anotações: os trechos são gerados em
+    paralelo (com limite de concorrência) e cacheados pelo hash do conteúdo;
+    depois os cards são juntados na ordem dos trechos e as perguntas
+    repetidas são descartadas. Um trecho novo só começa se os cards já
+    obtidos mais os esperados dos que estão em andamento não chegam a
+    max_cards, e nunca passam de flashcard_notes_max_chunks trechos.
+    """
+    chunks = []
+    for text in note_texts:
+        chunks.extend(chunk_text(
+            text,
+            max_chars=settings.flashcard_notes_chunk_chars,
+            min_chars=settings.flashcard_notes_chunk_chars // 4
+        ))
+    chunks = chunks[:settings.flashcard_notes_max_chunks]
+
+    results = {}
+    unique_questions = set()
+    running = {}
+    next_chunk = 0
+    try:
+        while True:
+            while (
+                next_chunk < len(chunks)
+                and len(running) < settings.flashcard_notes_concurrency
+                and len(unique_questions) + len(running) * cards_per_chunk < max_cards
+            ):
+                text = chunks[next_chunk]
+                task = asyncio.ensure_future(flashcard_cache.get_or_create(
+                    chunk_cache_key(subject, text, cards_per_chunk),
+                    lambda text=text: _request_chunk(subject, text, cards_per_chunk)
+                ))
+                running[task] = next_chunk
+                next_chunk += 1
+            if not running:
+                break
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = running.pop(task)
+                error = task.exception()
+                if isinstance(error, (LLMError, ValueError)):
+                    results[index] = error
+                    continue
+                if error is not None:
+                    raise error
+                results[index] = task.result()
+                for card in task.result()[0]:
+                    question = _card_question(card)
+                    if question:
+                        unique_questions.add(question)
+    finally:
+        for task in running:
+            task.cancel()
+
+    flashcards = []
+    seen = set()
+    cached_count = failed_count = 0
+    for index in sorted(results):
+        result = results[index]
+        if isinstance(result, BaseException):
+            failed_count += 1
+            continue
+
+        cards, cached = result
+        cached_count += cached
+        for card in cards:
+            question = _card_question(card)
+            if not question or question in seen:
+                continue
+            seen.add(question)
+            flashcards.append({"question": card["question"], "answer": card["answer"]})
+
+    return NotesGenerationResult(
+        flashcards=flashcards[:max_cards],
+        chunk_count=len(results),
+        cached_chunk_count=cached_count,
+        failed_chunk_count=failed_count
+    )
+
+def _card_question(card) -> Optional[str]:
+    """
+    Pergunta normalizada, ou None se o card está malformado. parse_flashcards
+    já valida, mas o cache pode ter resultados gravados antes disso.
+    """
+    if not isinstance(card, dict) or not isinstance(card.get("question"), str) or not isinstance(card.get("answer"), str):
+        return None
+    if not card["answer"].strip():
+        return None
+    return normalize_text(card["question"]) or None
+
+async def _request_chunk(subject: str, text: str, count: int) -> List[dict]:
+    content = await llm_client.chat(
+        flashcard_messages(build_notes_prompt(subject, text, count)),
+        temperature=0.3,
+        max_tokens=2000
+    )
+    return parse_flashcards(content)
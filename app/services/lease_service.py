@@ -0,0 +1,51 @@
+import os
+import socket
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..models.scheduler_lease import SchedulerLease
+
+def worker_identity() -> str:
+    """
+    Identificação do processo atual para travas e claims. Calculada a cada
+    uso: o app.server carrega o app antes do fork, então um valor guardado
+    na importação seria o do mestre, igual em todos os workers.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def acquire_lease(db: Session, name: str, owner: str, ttl_seconds: int) -> bool:
+    """
+    Tenta obter (ou renovar) a trava `name` para `owner` por `ttl_seconds`.
+    Só um dono por vez: a trava é tomada com um UPDATE condicional, que o
+    banco serializa, ou com o INSERT da primeira linha.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+
+    updated = db.query(SchedulerLease).filter(
+        SchedulerLease.name == name,
+        (SchedulerLease.owner == owner) | (SchedulerLease.expires_at < now)
+    ).update({"owner": owner, "expires_at": expires_at}, synchronize_session=False)
+    db.commit()
+    if updated:
+        return True
+
+    if db.query(SchedulerLease.name).filter(SchedulerLease.name == name).first():
+        return False
+
+    try:
+        db.add(SchedulerLease(name=name, owner=owner, expires_at=expires_at))
+        db.commit()
+        return True
+    except IntegrityError:
+        # Outro worker criou a linha ao mesmo tempo
+        db.rollback()
+        return False
+
+def release_lease(db: Session, name: str, owner: str):
+    """Libera a trava se ela ainda pertencer a `owner`"""
+    db.query(SchedulerLease).filter(
+        SchedulerLease.name == name,
+        SchedulerLease.owner == owner
+    ).update({"expires_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
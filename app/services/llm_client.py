@@ -0,0 +1,317 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from contextlib import aclosing, contextmanager
+from typing import AsyncIterator, Iterator, List, Optional
+import httpx
+from ..config import settings
+from ..utils.metrics import registry
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # sem o pacote h2 o httpx fica só com HTTP/1.1 (ainda com keep-alive)
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+LLM_LATENCY = registry.histogram(
+    "llm_request_duration_seconds",
+    "Duração das chamadas HTTP ao provedor de LLM, por tentativa (stream: até a resposta começar)",
+    ("provider", "operation", "outcome"),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+)
+
+class LLMError(Exception):
+    """Falha ao obter resposta do provedor de LLM"""
+
+class LLMUnavailableError(LLMError):
+    """O circuit breaker está aberto; o provedor não está sendo chamado"""
+
+class CircuitBreaker:
+    """
+    Abre depois de `failure_threshold` falhas seguidas e deixa passar uma
+    chamada de teste após `reset_timeout` segundos.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._probe_generation = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            self._probe_generation += 1
+            return True
+        return False
+
+    @contextmanager
+    def guard(self) -> Iterator[bool]:
+        """
+        Envolve uma chamada: produz o resultado de allow(). Se a chamada de
+        teste terminar sem record_success/record_failure (cancelada, exceção
+        inesperada), a vaga de teste é liberada; senão o circuito ficaria
+        meio aberto para sempre.
+        """
+        allowed = self.allow()
+        generation = self._probe_generation if allowed and self._probing else None
+        try:
+            yield allowed
+        finally:
+            if generation is not None and self._probing and self._probe_generation == generation:
+                self._probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+class LLMProvider:
+    """Provedor com API compatível com /chat/completions da OpenAI"""
+
+    name = "openai"
+    default_base_url = "https://api.openai.com/v1"
+    default_model = "gpt-4o-mini"
+
+    def __init__(self, api_key: str, base_url: str = "", model: str = ""):
+        self.api_key = api_key
+        self.base_url = (base_url or self.default_base_url).rstrip("/")
+        self.model = model or self.default_model
+
+    @property
+    def chat_url(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    def headers(self) -> dict:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def chat_payload(self, messages: List[dict], **params) -> dict:
+        return {"model": self.model, "messages": messages, **params}
+
+    def parse_chat_response(self, data: dict) -> str:
+        return data["choices"][0]["message"]["content"]
+
+    def parse_stream_chunk(self, data: dict) -> str:
+        return data["choices"][0]["delta"].get("content") or ""
+
+class GroqProvider(LLMProvider):
+    name = "groq"
+    default_base_url = "https://api.groq.com/openai/v1"
+    default_model = "llama-3.3-70b-versatile"
+
+PROVIDERS = {
+    GroqProvider.name: GroqProvider,
+    LLMProvider.name: LLMProvider,
+}
+
+def get_provider() -> LLMProvider:
+    """Cria o provedor configurado em Settings"""
+    provider_class = PROVIDERS.get(settings.llm_provider.lower())
+    if provider_class is None:
+        raise ValueError(f"Unknown LLM provider: {settings.llm_provider}")
+
+    api_key = settings.groq_api_key if provider_class is GroqProvider else settings.openai_api_key
+    return provider_class(api_key=api_key, base_url=settings.llm_base_url, model=settings.llm_model)
+
+class LLMClient:
+    """
+    Cliente HTTP compartilhado para o LLM: pool de conexões com keep-alive,
+    limite de chamadas simultâneas, retry com backoff e circuit breaker.
+    """
+
+    def __init__(self, provider: LLMProvider):
+        self.provider = provider
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.llm_circuit_failure_threshold,
+            reset_timeout=settings.llm_circuit_reset_seconds
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def start(self):
+        if self._client is not None:
+            return
+        self._semaphore = asyncio.Semaphore(settings.llm_max_concurrency)
+        self._client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(
+                settings.llm_timeout_seconds,
+                connect=settings.llm_connect_timeout_seconds
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_connections,
+                keepalive_expiry=60.0
+            )
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), settings.llm_backoff_max_seconds)
+        # Backoff exponencial com "full jitter"
+        ceiling = min(settings.llm_backoff_max_seconds, settings.llm_backoff_base_seconds * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    async def chat(self, messages: List[dict], **params) -> str:
+        """Envia uma conversa e retorna o texto da resposta"""
+        await self.start()
+
+        with self.breaker.guard() as allowed:
+            if not allowed:
+                raise LLMUnavailableError(f"{self.provider.name} circuit is open")
+            return await self._chat(messages, **params)
+
+    async def _chat(self, messages: List[dict], **params) -> str:
+        last_error = None
+        for attempt in range(settings.llm_max_retries + 1):
+            response = None
+            try:
+                async with self._semaphore:
+                    start = time.perf_counter()
+                    try:
+                        response = await self._client.post(
+                            self.provider.chat_url,
+                            headers=self.provider.headers(),
+                            json=self.provider.chat_payload(messages, **params)
+                        )
+                    finally:
+                        outcome = str(response.status_code) if response is not None else "error"
+                        LLM_LATENCY.observe(time.perf_counter() - start, self.provider.name, "chat", outcome)
+            except httpx.TransportError as e:
+                last_error = LLMError(f"{self.provider.name} request failed: {e!r}")
+            else:
+                if response.status_code == 200:
+                    self.breaker.record_success()
+                    try:
+                        return self.provider.parse_chat_response(response.json())
+                    except (ValueError, KeyError, IndexError) as e:
+                        raise LLMError(f"Unexpected {self.provider.name} response: {e!r}")
+
+                last_error = LLMError(
+                    f"{self.provider.name} returned HTTP {response.status_code}: {response.text[:200]}"
+                )
+                if response.status_code not in RETRYABLE_STATUS:
+                    # Erros 4xx (chave inválida, payload ruim) não indicam provedor fora do ar
+                    self.breaker.record_success()
+                    raise last_error
+
+            if attempt < settings.llm_max_retries:
+                delay = self._backoff(attempt, response)
+                logger.warning("%s; retrying in %.2fs", last_error, delay)
+                await asyncio.sleep(delay)
+
+        self.breaker.record_failure()
+        raise last_error
+
+    async def stream_chat(self, messages: List[dict], **params) -> AsyncIterator[str]:
+        """
+        Envia uma conversa com stream=True e produz os pedaços de texto
+        conforme chegam (server-sent events). Só há retry antes do primeiro
+        pedaço; depois disso uma falha encerra o stream com LLMError.
+        """
+        await self.start()
+
+        with self.breaker.guard() as allowed:
+            if not allowed:
+                raise LLMUnavailableError(f"{self.provider.name} circuit is open")
+            # Fechado explicitamente: o cliente pode desconectar no meio
+            async with aclosing(self._stream_chat(messages, **params)) as chunks:
+                async for delta in chunks:
+                    yield delta
+
+    async def _stream_chat(self, messages: List[dict], **params) -> AsyncIterator[str]:
+        last_error = None
+        started = False
+        for attempt in range(settings.llm_max_retries + 1):
+            response = None
+            try:
+                async with self._semaphore:
+                    start = time.perf_counter()
+                    async with self._client.stream(
+                        "POST",
+                        self.provider.chat_url,
+                        headers=self.provider.headers(),
+                        json=self.provider.chat_payload(messages, stream=True, **params)
+                    ) as response:
+                        LLM_LATENCY.observe(
+                            time.perf_counter() - start, self.provider.name, "stream", str(response.status_code)
+                        )
+                        if response.status_code == 200:
+                            self.breaker.record_success()
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[5:].strip()
+                                if data == "[DONE]":
+                                    return
+                                try:
+                                    delta = self.provider.parse_stream_chunk(json.loads(data))
+                                except (ValueError, KeyError, IndexError):
+                                    continue
+                                if delta:
+                                    started = True
+                                    yield delta
+                            return
+
+                        await response.aread()
+                        last_error = LLMError(
+                            f"{self.provider.name} returned HTTP {response.status_code}: {response.text[:200]}"
+                        )
+                        if response.status_code not in RETRYABLE_STATUS:
+                            self.breaker.record_success()
+                            raise last_error
+            except httpx.TransportError as e:
+                if response is None:
+                    LLM_LATENCY.observe(time.perf_counter() - start, self.provider.name, "stream", "error")
+                last_error = LLMError(f"{self.provider.name} request failed: {e!r}")
+                if started:
+                    self.breaker.record_failure()
+                    raise last_error
+
+            if attempt < settings.llm_max_retries:
+                delay = self._backoff(attempt, response)
+                logger.warning("%s; retrying in %.2fs", last_error, delay)
+                await asyncio.sleep(delay)
+
+        self.breaker.record_failure()
+        raise last_error
+
+llm_client = LLMClient(get_provider())
@@ -0,0 +1,326 @@
+import asyncio
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from difflib import SequenceMatcher
+from typing import List, Optional
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, aliased
+from ..config import settings
+from ..models.note import Note
+from ..models.note_revision import NoteRevision
+from ..models.note_similarity import NoteSignature, NoteLSHBucket
+from ..utils import minhash
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+
+def _encode_payload(data) -> bytes:
+    return zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+def _decode_payload(payload: bytes):
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+def make_delta(base: str, target: str) -> list:
+    """
+    Gera um diff por linhas de base para target. Cada operação é
+    [inicio, fim] (copia linhas da base) ou uma string (texto novo).
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    matcher = SequenceMatcher(None, base_lines, target_lines, autojunk=False)
+
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif tag in ("replace", "insert"):
+            ops.append("".join(target_lines[j1:j2]))
+    return ops
+
+def apply_delta(base: str, ops: list) -> str:
+    """Reconstrói o texto a partir da base e das operações de make_delta"""
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return "".join(parts)
+
+def _lock_note(db: Session, note_id: int):
+    """
+    Trava a linha da anotação até o commit. Dois salvamentos ao mesmo tempo
+    (ex.: dois dispositivos) leriam a mesma última revisão e tentariam gravar
+    o mesmo número, batendo no índice único (note_id, revision).
+    """
+    # O SQL Server ignora FOR UPDATE; lá a trava é a dica UPDLOCK
+    db.query(Note.id).with_hint(Note, "WITH (UPDLOCK, ROWLOCK)", "mssql").filter(
+        Note.id == note_id
+    ).with_for_update().first()
+
+def _latest_revision(db: Session, note_id: int) -> Optional[NoteRevision]:
+    return db.query(NoteRevision).filter(
+        NoteRevision.note_id == note_id
+    ).order_by(NoteRevision.revision.desc()).first()
+
+def _latest_snapshot(db: Session, note_id: int) -> Optional[NoteRevision]:
+    return db.query(NoteRevision).filter(
+        NoteRevision.note_id == note_id,
+        NoteRevision.kind == SNAPSHOT
+    ).order_by(NoteRevision.revision.desc()).first()
+
+def get_revision(db: Session, note_id: int, revision: int) -> Optional[NoteRevision]:
+    return db.query(NoteRevision).filter(
+        NoteRevision.note_id == note_id,
+        NoteRevision.revision == revision
+    ).first()
+
+def list_revisions(db: Session, note_id: int) -> List[NoteRevision]:
+    return db.query(NoteRevision).filter(
+        NoteRevision.note_id == note_id
+    ).order_by(NoteRevision.revision.desc()).all()
+
+def revision_content(db: Session, revision: NoteRevision) -> str:
+    """Reconstrói o conteúdo de uma revisão (no máximo um snapshot + um delta)"""
+    data = _decode_payload(revision.payload)
+    if revision.kind == SNAPSHOT:
+        return data["content"]
+
+    base = get_revision(db, revision.note_id, revision.base_revision)
+    return apply_delta(_decode_payload(base.payload)["content"], data["ops"])
+
+def _write_payload(db: Session, revision: NoteRevision, content: str):
+    """Grava o conteúdo como delta do último snapshot ou como snapshot completo"""
+    snapshot_payload = _encode_payload({"content": content})
+    revision.kind = SNAPSHOT
+    revision.base_revision = None
+    revision.payload = snapshot_payload
+    revision.content_size = len(content)
+
+    snapshot = _latest_snapshot(db, revision.note_id)
+    if snapshot is None or snapshot is revision:
+        return
+    if revision.revision - snapshot.revision >= settings.note_revision_snapshot_interval:
+        return
+
+    base_content = _decode_payload(snapshot.payload)["content"]
+    delta_payload = _encode_payload({"ops": make_delta(base_content, content)})
+    # Se o texto mudou demais o delta não compensa; fica o snapshot
+    if len(delta_payload) < len(snapshot_payload):
+        revision.kind = DELTA
+        revision.base_revision = snapshot.revision
+        revision.payload = delta_payload
+
+def ensure_baseline_revision(db: Session, note: Note) -> bool:
+    """
+    Registra o estado atual de anotações criadas antes do histórico existir.
+    Retorna True se a revisão base foi criada agora.
+    """
+    _lock_note(db, note.id)
+    if _latest_revision(db, note.id) is not None:
+        return False
+
+    created = note.updated_at or note.created_at or datetime.utcnow()
+    baseline = NoteRevision(
+        note_id=note.id,
+        user_id=note.user_id,
+        revision=1,
+        title=note.title,
+        kind=SNAPSHOT,
+        payload=_encode_payload({"content": note.content}),
+        content_size=len(note.content),
+        created_at=created,
+        updated_at=created
+    )
+    db.add(baseline)
+    db.flush()
+    return True
+
+def record_revision(db: Session, note: Note, coalesce: bool = True) -> Optional[NoteRevision]:
+    """
+    Registra o estado atual da anotação no histórico. Edições feitas dentro
+    da janela de autosave são agrupadas na última revisão.
+    """
+    now = datetime.utcnow()
+    content = note.content
+    _lock_note(db, note.id)
+    latest = _latest_revision(db, note.id)
+
+    if latest is not None:
+        if latest.title == note.title and revision_content(db, latest) == content:
+            return latest
+
+        window = timedelta(seconds=settings.note_revision_coalesce_seconds)
+        if coalesce and now - latest.created_at < window:
+            latest.title = note.title
+            latest.updated_at = now
+            _write_payload(db, latest, content)
+            db.flush()
+            return latest
+
+    revision = NoteRevision(
+        note_id=note.id,
+        user_id=note.user_id,
+        revision=latest.revision + 1 if latest else 1,
+        title=note.title,
+        created_at=now,
+        updated_at=now
+    )
+    db.add(revision)
+    _write_payload(db, revision, content)
+    db.flush()
+    return revision
+
+@dataclass
+class SimilarityIndex:
+    digest: bytes
+    signature: Optional[bytes]
+    buckets: List[int]
+
+def compute_note_similarity(content: str, previous_digest: Optional[bytes] = None) -> Optional[SimilarityIndex]:
+    """
+    Calcula assinatura MinHash e buckets LSH do conteúdo, sem tocar na
+    sessão (roda fora do event loop). Retorna None se o conjunto de
+    shingles é o mesmo de `previous_digest`: a assinatura salva continua valendo.
+    """
+    shingles = minhash.shingles(content)
+    if not shingles:
+        return SimilarityIndex(digest=b"", signature=None, buckets=[])
+
+    digest = minhash.shingles_digest(shingles)
+    if digest == previous_digest:
+        return None
+
+    values = minhash.signature(shingles)
+    return SimilarityIndex(
+        digest=digest,
+        signature=minhash.pack_signature(values),
+        buckets=minhash.lsh_buckets(values)
+    )
+
+def apply_note_similarity(note: Note, index: Optional[SimilarityIndex]):
+    """Grava na anotação o resultado de compute_note_similarity"""
+    if index is None:
+        return
+    if index.signature is None:
+        note.signature = None
+        note.lsh_buckets = []
+        return
+
+    if note.signature is None:
+        note.signature = NoteSignature(user_id=note.user_id, signature=index.signature)
+    else:
+        note.signature.signature = index.signature
+    note.signature.shingles_digest = index.digest
+
+    note.lsh_buckets = [
+        NoteLSHBucket(user_id=note.user_id, band=band, bucket=bucket)
+        for band, bucket in enumerate(index.buckets)
+    ]
+
+def _previous_digest(note: Note) -> Optional[bytes]:
+    return note.signature.shingles_digest if note.signature is not None else None
+
+def index_note_similarity(db: Session, note: Note):
+    """Atualiza a assinatura MinHash e os buckets LSH da anotação"""
+    apply_note_similarity(note, compute_note_similarity(note.content, _previous_digest(note)))
+
+async def refresh_note_similarity(db: Session, note: Note):
+    """
+    Como index_note_similarity, para endpoints: as 128 permutações em Python
+    puro levam dezenas de ms em anotações longas e não podem rodar no event loop.
+    """
+    index = await asyncio.to_thread(compute_note_similarity, note.content, _previous_digest(note))
+    apply_note_similarity(note, index)
+
+def _note_summaries(db: Session, note_ids) -> dict:
+    rows = db.query(Note.id, Note.title, Note.subject_id, Note.updated_at).filter(
+        Note.id.in_(note_ids)
+    ).all()
+    return {row.id: {
+        "id": row.id,
+        "title": row.title,
+        "subject_id": row.subject_id,
+        "updated_at": row.updated_at
+    } for row in rows}
+
+def _signatures(db: Session, note_ids) -> dict:
+    rows = db.query(NoteSignature.note_id, NoteSignature.signature).filter(
+        NoteSignature.note_id.in_(note_ids)
+    ).all()
+    return {note_id: minhash.unpack_signature(data) for note_id, data in rows}
+
+def find_similar_notes(db: Session, note: Note, limit: int = 10, threshold: float = None) -> List[dict]:
+    """
+    Anotações parecidas com `note`. Os candidatos vêm dos buckets LSH
+    (consulta indexada) e só eles têm a similaridade estimada.
+    """
+    if threshold is None:
+        threshold = settings.note_similarity_threshold
+    if note.signature is None:
+        return []
+
+    values = minhash.unpack_signature(note.signature.signature)
+    bands = [
+        and_(NoteLSHBucket.band == band, NoteLSHBucket.bucket == bucket)
+        for band, bucket in enumerate(minhash.lsh_buckets(values))
+    ]
+    candidate_ids = [row[0] for row in db.query(NoteLSHBucket.note_id).filter(
+        NoteLSHBucket.user_id == note.user_id,
+        NoteLSHBucket.note_id != note.id,
+        or_(*bands)
+    ).distinct().all()]
+    if not candidate_ids:
+        return []
+
+    scored = []
+    for note_id, other in _signatures(db, candidate_ids).items():
+        similarity = minhash.estimate_similarity(values, other)
+        if similarity >= threshold:
+            scored.append((similarity, note_id))
+    scored.sort(reverse=True)
+    scored = scored[:limit]
+
+    summaries = _note_summaries(db, [note_id for _, note_id in scored])
+    return [
+        {**summaries[note_id], "similarity": similarity}
+        for similarity, note_id in scored if note_id in summaries
+    ]
+
+def find_duplicate_notes(db: Session, user_id: int, limit: int = 50, threshold: float = None) -> List[dict]:
+    """Pares de anotações do usuário que provavelmente são duplicadas"""
+    if threshold is None:
+        threshold = settings.note_duplicate_threshold
+
+    left = aliased(NoteLSHBucket)
+    right = aliased(NoteLSHBucket)
+    pairs = db.query(left.note_id, right.note_id).join(
+        right,
+        and_(
+            right.user_id == left.user_id,
+            right.band == left.band,
+            right.bucket == left.bucket,
+            right.note_id > left.note_id
+        )
+    ).filter(left.user_id == user_id).distinct().all()
+    if not pairs:
+        return []
+
+    signatures = _signatures(db, {note_id for pair in pairs for note_id in pair})
+    scored = []
+    for a, b in pairs:
+        if a in signatures and b in signatures:
+            similarity = minhash.estimate_similarity(signatures[a], signatures[b])
+            if similarity >= threshold:
+                scored.append((similarity, a, b))
+    scored.sort(reverse=True)
+    scored = scored[:limit]
+
+    summaries = _note_summaries(db, {note_id for _, a, b in scored for note_id in (a, b)})
+    return [
+        {"similarity": similarity, "notes": [summaries[a], summaries[b]]}
+        for similarity, a, b in scored if a in summaries and b in summaries
+    ]
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from email.message import Message
+from typing import Deque, Optional
+import aiosmtplib
+from ..utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+SMTP_LATENCY = registry.histogram(
+    "smtp_send_duration_seconds",
+    "Duração do envio de uma mensagem SMTP, incluindo espera por conexão e reconexões",
+    ("outcome",)
+)
+SMTP_CONNECTIONS = registry.counter(
+    "smtp_connections_opened_total", "Conexões SMTP abertas pelo pool"
+)
+
+# Falhas que indicam conexão morta: a mensagem pode ser reenviada em outra conexão
+CONNECTION_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+    ConnectionError,
+    OSError,
+)
+
+class RateLimiter:
+    """Token bucket: no máximo `rate` mensagens por segundo, com rajadas de até `burst`"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class TrackedSMTP(aiosmtplib.SMTP):
+    """Registra se o MAIL FROM da transação atual já foi aceito pelo servidor"""
+
+    mail_accepted = False
+
+    async def mail(self, *args, **kwargs):
+        response = await super().mail(*args, **kwargs)
+        self.mail_accepted = True
+        return response
+
+class PooledConnection:
+    def __init__(self, smtp: TrackedSMTP):
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.messages = 0
+
+class SMTPPool:
+    """
+    Pool de sessões SMTP já conectadas e autenticadas para um servidor.
+    Evita TCP + STARTTLS + AUTH a cada mensagem: conexões ociosas são
+    reaproveitadas (com NOOP antes se ficaram paradas), renovadas depois de
+    `max_messages` envios e descartadas quando o servidor as derruba.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        start_tls: bool = True,
+        size: int = 5,
+        max_messages: int = 100,
+        idle_timeout: float = 60.0,
+        check_after: float = 15.0,
+        timeout: float = 30.0,
+        rate_limit: float = 0.0
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username or None
+        self.password = password or None
+        self.start_tls = start_tls
+        self.size = size
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(rate_limit)
+        self._idle: Deque[PooledConnection] = deque()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind_loop(self):
+        # Conexões e semáforo pertencem a um event loop; se mudou (scripts que
+        # chamam asyncio.run mais de uma vez), começa um pool novo
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._idle.clear()
+            self._semaphore = asyncio.Semaphore(self.size)
+
+    async def _connect(self) -> PooledConnection:
+        smtp = TrackedSMTP(
+            hostname=self.hostname,
+            port=self.port,
+            start_tls=self.start_tls,
+            username=self.username,
+            password=self.password,
+            timeout=self.timeout
+        )
+        await smtp.connect()
+        SMTP_CONNECTIONS.inc()
+        return PooledConnection(smtp)
+
+    async def _discard(self, conn: PooledConnection):
+        try:
+            if conn.smtp.is_connected:
+                await conn.smtp.quit()
+        except Exception:
+            conn.smtp.close()
+
+    async def _is_healthy(self, conn: PooledConnection) -> bool:
+        if not conn.smtp.is_connected:
+            return False
+        idle = time.monotonic() - conn.last_used
+        if idle > self.idle_timeout:
+            return False
+        if idle > self.check_after:
+            try:
+                await conn.smtp.noop()
+            except Exception:
+                return False
+        return True
+
+    async def _acquire(self) -> PooledConnection:
+        while self._idle:
+            # LIFO: a conexão usada mais recentemente tem mais chance de estar viva
+            conn = self._idle.pop()
+            if await self._is_healthy(conn):
+                return conn
+            await self._discard(conn)
+        return await self._connect()
+
+    async def _release(self, conn: PooledConnection):
+        conn.last_used = time.monotonic()
+        if conn.messages >= self.max_messages:
+            await self._discard(conn)
+        else:
+            self._idle.append(conn)
+
+    async def send_message(self, message: Message):
+        """Envia a mensagem por uma conexão do pool; levanta SMTPException em caso de falha"""
+        self._bind_loop()
+        await self.rate_limiter.acquire()
+
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            await self._send(message)
+            outcome = "sent"
+        finally:
+            SMTP_LATENCY.observe(time.perf_counter() - start, outcome)
+
+    async def _send(self, message: Message):
+        async with self._semaphore:
+            for attempt in range(2):
+                conn = await self._acquire()
+                reused = conn.messages > 0
+                conn.smtp.mail_accepted = False
+                try:
+                    await conn.smtp.send_message(message)
+                except CONNECTION_ERRORS:
+                    await self._discard(conn)
+                    # O servidor fechou uma conexão ociosa: tenta de novo numa nova. Depois
+                    # do MAIL FROM aceito não: o servidor pode já ter recebido a mensagem
+                    if reused and attempt == 0 and not conn.smtp.mail_accepted:
+                        logger.info("SMTP connection to %s dropped; reconnecting", self.hostname)
+                        continue
+                    raise
+                except Exception:
+                    # Recusa da mensagem: a sessão fica num estado incerto
+                    await self._discard(conn)
+                    raise
+                except BaseException:
+                    # Cancelado no meio da transação: fecha sem QUIT, que esperaria a
+                    # resposta do servidor, e libera a vaga do pool
+                    conn.smtp.close()
+                    raise
+                conn.messages += 1
+                await self._release(conn)
+                return
+
+    async def close(self):
+        while self._idle:
+            await self._discard(self._idle.pop())
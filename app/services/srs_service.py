@@ -0,0 +1,47 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Tuple
+
+MIN_EASE_FACTOR = 1.3
+
+@dataclass
+class ReviewState:
+    ease_factor: float = 2.5
+    interval_days: int = 0
+    repetitions: int = 0
+    lapses: int = 0
+
+def schedule_review(state: ReviewState, grade: int, reviewed_at: datetime) -> Tuple[ReviewState, datetime]:
+    """
+    Aplica o algoritmo SM-2. `grade` vai de 0 (esqueceu totalmente) a
+    5 (lembrou com facilidade); abaixo de 3 o card volta para o início.
+    Retorna o novo estado e a próxima data de revisão.
+    """
+    grade = max(0, min(5, grade))
+    ease_factor = state.ease_factor
+    repetitions = state.repetitions
+    lapses = state.lapses
+
+    if grade >= 3:
+        if repetitions == 0:
+            interval = 1
+        elif repetitions == 1:
+            interval = 6
+        else:
+            interval = round(state.interval_days * ease_factor)
+        repetitions += 1
+    else:
+        interval = 1
+        repetitions = 0
+        lapses += 1
+
+    ease_factor += 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02)
+    ease_factor = max(MIN_EASE_FACTOR, ease_factor)
+
+    new_state = ReviewState(
+        ease_factor=ease_factor,
+        interval_days=interval,
+        repetitions=repetitions,
+        lapses=lapses
+    )
+    return new_state, reviewed_at + timedelta(days=interval)
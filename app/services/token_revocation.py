@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import SessionLocal
+from ..models.user import User
+from ..models.token_revocation import TokenRevocation
+from ..utils.overlap_cursor import OverlapCursor
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL_SECONDS = 3600
+
+def revoke_token(db: Session, user_id: int, jti: str, expires_at: datetime) -> TokenRevocation:
+    """Revoga um token (logout). Não faz commit; depois dele, chame token_revocations.apply"""
+    revocation = TokenRevocation(user_id=user_id, jti=jti, expires_at=expires_at)
+    db.add(revocation)
+    return revocation
+
+def revoke_all_tokens(db: Session, user: User) -> TokenRevocation:
+    """
+    Revoga todos os tokens já emitidos para o usuário (logout em todos os
+    dispositivos, troca de senha). Não faz commit.
+    """
+    user.token_version = (user.token_version or 0) + 1
+    revocation = TokenRevocation(
+        user_id=user.id,
+        token_version=user.token_version,
+        # Depois disso todo token com versão antiga já venceu sozinho
+        expires_at=datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
+    )
+    db.add(revocation)
+    return revocation
+
+class TokenRevocationList:
+    """
+    Cópia em memória das revogações ainda válidas, para checar cada
+    requisição em O(1) sem ir ao banco. Cada worker aplica as próprias
+    revogações na hora e busca as dos outros a cada
+    TOKEN_REVOCATION_POLL_SECONDS. A memória fica limitada porque cada
+    revogação é descartada quando os tokens que ela cobre vencem.
+    """
+
+    def __init__(self):
+        self._jtis: Dict[str, datetime] = {}
+        self._versions: Dict[int, Tuple[int, datetime]] = {}  # user_id -> (versão mínima, validade)
+        # Releitura de duas sincronizações: pega revogações cujo commit saiu fora da ordem dos ids
+        self._cursor = OverlapCursor(timedelta(seconds=settings.token_revocation_poll_seconds * 2))
+        self._last_purge = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def is_revoked(self, claims: dict) -> bool:
+        jti = claims.get("jti")
+        if jti is not None and jti in self._jtis:
+            return True
+        entry = self._versions.get(claims.get("uid"))
+        return entry is not None and claims.get("ver", 0) < entry[0]
+
+    def apply(self, revocation: TokenRevocation):
+        if revocation.jti:
+            self._jtis[revocation.jti] = revocation.expires_at
+            return
+        current = self._versions.get(revocation.user_id)
+        if current is None or revocation.token_version >= current[0]:
+            self._versions[revocation.user_id] = (revocation.token_version, revocation.expires_at)
+
+    def sync(self, db: Session) -> int:
+        """Aplica as revogações gravadas desde a última sincronização"""
+        started = datetime.utcnow()
+        query = db.query(TokenRevocation)
+        if self._cursor.since is None:
+            query = query.filter(TokenRevocation.expires_at > started)
+        else:
+            query = query.filter(TokenRevocation.created_at >= self._cursor.since)
+        applied = 0
+        for row in query.order_by(TokenRevocation.id).all():
+            if self._cursor.seen(row.id, row.created_at):
+                continue
+            self.apply(row)
+            applied += 1
+        self._cursor.advance(started)
+        return applied
+
+    def prune(self, now: Optional[datetime] = None):
+        now = now or datetime.utcnow()
+        self._jtis = {jti: expires_at for jti, expires_at in self._jtis.items() if expires_at > now}
+        self._versions = {
+            user_id: entry for user_id, entry in self._versions.items() if entry[1] > now
+        }
+
+    async def start(self):
+        if self._task is not None:
+            return
+        # Carrega antes de atender a primeira requisição
+        await asyncio.to_thread(self._sync_once)
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(settings.token_revocation_poll_seconds)
+            try:
+                await asyncio.to_thread(self._sync_once)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Token revocation sync failed")
+
+    def _sync_once(self):
+        db = SessionLocal()
+        try:
+            self.sync(db)
+            if time.monotonic() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                self.prune()
+                db.query(TokenRevocation).filter(
+                    TokenRevocation.expires_at < datetime.utcnow()
+                ).delete(synchronize_session=False)
+                db.commit()
+                self._last_purge = time.monotonic()
+        finally:
+            db.close()
+
+token_revocations = TokenRevocationList()
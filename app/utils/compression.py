@@ -0,0 +1,70 @@
+import zlib
+from typing import Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zstd é opcional; sem ele usamos zlib
+    zstandard = None
+
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+
+
+def available_codecs() -> Tuple[str, ...]:
+    """Lista os codecs disponíveis no ambiente atual"""
+    if zstandard is not None:
+        return (CODEC_ZLIB, CODEC_ZSTD)
+    return (CODEC_ZLIB,)
+
+
+def resolve_codec(codec: str) -> Optional[str]:
+    """Normaliza o codec configurado, caindo para zlib se zstd não estiver instalado"""
+    codec = (codec or "").lower()
+    if codec in ("", "none", "off"):
+        return None
+    if codec == CODEC_ZSTD and zstandard is None:
+        return CODEC_ZLIB
+    if codec not in (CODEC_ZLIB, CODEC_ZSTD):
+        raise ValueError(f"Unknown compression codec: {codec}")
+    return codec
+
+
+def compress_text(
+    text: str,
+    codec: str,
+    threshold: int,
+    level: int = 6
+) -> Optional[Tuple[str, bytes]]:
+    """
+    Comprime o texto se ele passar do limite (em bytes UTF-8) e se a
+    compressão realmente economizar espaço. Retorna (codec, dados) ou None.
+    """
+    codec = resolve_codec(codec)
+    if codec is None:
+        return None
+
+    raw = text.encode("utf-8")
+    if len(raw) < threshold:
+        return None
+
+    if codec == CODEC_ZSTD:
+        data = zstandard.ZstdCompressor(level=level).compress(raw)
+    else:
+        data = zlib.compress(raw, level)
+
+    if len(data) >= len(raw):
+        return None
+    return codec, data
+
+
+def decompress_text(codec: str, data: bytes) -> str:
+    """Descomprime dados gerados por compress_text"""
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed content")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == CODEC_ZLIB:
+        raw = zlib.decompress(data)
+    else:
+        raise ValueError(f"Unknown compression codec: {codec}")
+    return raw.decode("utf-8")
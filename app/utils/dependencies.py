@@ -1,33 +1,50 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional, Tuple
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..models.user import User
-from ..utils.security import verify_token
+from ..utils.security import decode_access_token
+from ..services.token_revocation import token_revocations
 
 security = HTTPBearer()
 
+def authenticate_token(db: Session, token: str) -> Optional[Tuple[User, dict]]:
+    """Valida o token JWT e retorna (usuário, claims), ou None se não vale"""
+    claims = decode_access_token(token)
+    
+    # Revogação checada em memória, antes de ir ao banco
+    if claims is None or token_revocations.is_revoked(claims):
+        return None
+    
+    user = db.query(User).filter(User.email == claims["sub"]).first()
+    if user is None:
+        return None
+    
+    # A linha do usuário já foi lida: a versão vale na hora em todos os workers
+    if claims.get("ver", 0) < (user.token_version or 0):
+        return None
+    
+    return user, claims
+
 def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> User:
     """Obtém o usuário atual baseado no token JWT"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    token = credentials.credentials
-    email = verify_token(token)
-    
-    if email is None:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise credentials_exception
+    authenticated = authenticate_token(db, credentials.credentials)
+    if authenticated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
+    user, claims = authenticated
+    request.state.token_claims = claims
+    # Usado pelo profiler e pelos logs para identificar o usuário da requisição
+    request.state.user_id = user.id
     return user
 
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -0,0 +1,97 @@
+import mmap
+import os
+from typing import Iterator, Optional, Tuple
+from urllib.parse import quote
+from fastapi.responses import Response, StreamingResponse
+
+CHUNK_SIZE = 256 * 1024
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Intervalo (início, fim inclusivo) de um cabeçalho Range de um único
+    intervalo ("bytes=0-99", "bytes=100-", "bytes=-500"). Retorna None para
+    responder o arquivo inteiro, inclusive com vários intervalos (permitido
+    pela RFC 9110).
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        return None
+    first, sep, last = spec.partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            start, end = max(size - suffix, 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start < 0 or start > end or start >= size:
+        raise RangeNotSatisfiable()
+    return start, end
+
+def iter_file_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    """
+    Lê o intervalo por um mapeamento em memória, sem read() intermediário.
+    É um iterador síncrono: o StreamingResponse o consome numa thread, então
+    as leituras de disco não bloqueiam o event loop.
+    """
+    if end < start:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        position = start
+        while position <= end:
+            stop = min(position + CHUNK_SIZE, end + 1)
+            yield mapped[position:stop]
+            position = stop
+
+def file_range_response(
+    path: str,
+    size: int,
+    media_type: str,
+    filename: str,
+    etag: str,
+    range_header: Optional[str] = None,
+    if_none_match: Optional[str] = None
+) -> Response:
+    """Resposta de download com suporte a Range (206), ETag forte e If-None-Match (304)"""
+    quoted_etag = f'"{etag}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": quoted_etag,
+        "Cache-Control": "private, max-age=0",
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+    }
+    if if_none_match and quoted_etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1 if size else 0)
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    return StreamingResponse(
+        iter_file_range(path, start, end),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers
+    )
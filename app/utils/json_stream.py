@@ -0,0 +1,79 @@
+import json
+from typing import List
+
+class JSONArrayStreamParser:
+    """
+    Parser incremental para um JSON array de objetos que chega em pedaços
+    (ex.: resposta em streaming de um LLM). Cada objeto é emitido assim que
+    fecha. Texto fora do array (cercas ```json, comentários do modelo) é
+    ignorado, objetos malformados são descartados e o que vier depois do
+    "]" final não é processado.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self.done = False
+        self.errors = 0
+
+    def feed(self, chunk: str) -> List[dict]:
+        """Processa mais um pedaço de texto e retorna os objetos completos"""
+        items = []
+        for ch in chunk:
+            if self.done:
+                break
+
+            if self._depth == 0:
+                if ch == "{":
+                    # Aceita também objetos soltos, sem o "[" de abertura
+                    self._started = True
+                    self._depth = 1
+                    self._parts = ["{"]
+                elif ch == "[" and not self._started:
+                    self._started = True
+                elif ch == "]" and self._started:
+                    self.done = True
+                continue
+
+            self._parts.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    item = self._parse("".join(self._parts))
+                    if item is not None:
+                        items.append(item)
+                    self._parts = []
+        return items
+
+    def close(self) -> None:
+        """Finaliza o stream; um objeto incompleto no final conta como erro"""
+        if self._depth > 0:
+            self.errors += 1
+        self._parts = []
+        self._depth = 0
+        self.done = True
+
+    def _parse(self, text: str):
+        try:
+            item = json.loads(text)
+        except ValueError:
+            self.errors += 1
+            return None
+        if not isinstance(item, dict):
+            self.errors += 1
+            return None
+        return item
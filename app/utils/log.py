@@ -0,0 +1,265 @@
+"""
+Logging estruturado sem I/O no caminho da requisição.
+
+Os registros vão para uma fila em memória (QueueHandler) e uma thread
+(QueueListener) os formata e escreve no stdout, uma linha JSON por
+registro. Cada linha leva o id da requisição, a rota e o usuário,
+obtidos do contexto da requisição em andamento.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+import traceback
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# Atributos padrão do LogRecord; o que não estiver aqui veio de extra={...}
+# (color_message é o texto colorido que o uvicorn anexa aos seus logs)
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "color_message"}
+
+class RequestContext:
+    """Dados da requisição em andamento, visíveis para todos os logs emitidos nela"""
+
+    __slots__ = ("request_id", "scope", "sample_debug")
+
+    def __init__(self, request_id: str, scope: dict, sample_debug: bool):
+        self.request_id = request_id
+        self.scope = scope
+        self.sample_debug = sample_debug
+
+    @property
+    def route(self) -> str:
+        # O roteador só define scope["route"] depois de encontrar a rota
+        return getattr(self.scope.get("route"), "path", None) or self.scope.get("path")
+
+    @property
+    def user_id(self) -> Optional[int]:
+        # get_current_user guarda o id do usuário autenticado em request.state
+        return self.scope.get("state", {}).get("user_id")
+
+request_context: ContextVar[Optional[RequestContext]] = ContextVar("request_context", default=None)
+
+def current_request_id() -> Optional[str]:
+    context = request_context.get()
+    return context.request_id if context is not None else None
+
+class DebugSampler(logging.Filter):
+    """
+    Deixa passar só uma fração dos logs DEBUG. A decisão é tomada uma vez
+    por requisição, para que uma requisição amostrada tenha todos os seus
+    logs; fora de requisições ela é tomada a cada registro.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        context = request_context.get()
+        if context is not None:
+            return context.sample_debug
+        return random.random() < self.rate
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler que nunca espera: com a fila cheia o registro é descartado
+    e contado. O contexto da requisição é copiado para o registro aqui,
+    ainda na thread que emitiu o log.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        context = request_context.get()
+        if context is not None:
+            record.request_id = context.request_id
+            record.route = context.route
+            record.user_id = context.user_id
+
+        # Resolve mensagem e traceback agora: args e exc_info podem não ser
+        # seguros de usar em outra thread
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro, com os campos de extra={...} no primeiro nível"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRS and value is not None:
+                entry[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Formato legível para desenvolvimento, com o id da requisição quando houver"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = " ".join(
+            f"{name}={value}" for name, value in vars(record).items()
+            if name not in _RECORD_ATTRS and value is not None
+        )
+        return f"{line} [{extras}]" if extras else line
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """"app.services.smtp_pool=DEBUG,sqlalchemy.engine=WARNING" -> {logger: nível}"""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[NonBlockingQueueHandler] = None
+
+def configure_logging(
+    level: str = "INFO",
+    fmt: str = "json",
+    levels: str = "",
+    debug_sample_rate: float = 1.0,
+    queue_size: int = 10000
+):
+    """Instala o handler com fila no logger raiz e inicia a thread de escrita"""
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _handler = NonBlockingQueueHandler(log_queue)
+    _handler.addFilter(DebugSampler(debug_sample_rate))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel(level.upper())
+    for name, module_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def _reinit_after_fork():
+    # A thread de escrita não existe no processo filho (workers do app.server)
+    global _listener
+    if _listener is None:
+        return
+    log_queue: queue.Queue = queue.Queue(maxsize=_handler.queue.maxsize)
+    _handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_after_fork)
+
+def shutdown_logging():
+    """Esvazia a fila e para a thread de escrita"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None and _handler.dropped:
+        sys.stderr.write(f"{_handler.dropped} log records dropped (queue full)\n")
+
+access_logger = logging.getLogger("app.access")
+
+class RequestLoggingMiddleware:
+    """
+    Middleware ASGI que define o contexto de log da requisição (id, rota,
+    usuário) e registra uma linha de acesso com status e duração. Reaproveita
+    o X-Request-ID recebido e o devolve na resposta.
+    """
+
+    HEADER = b"x-request-id"
+
+    def __init__(self, app, debug_sample_rate: float = 1.0, access_log: bool = True):
+        self.app = app
+        self.debug_sample_rate = debug_sample_rate
+        self.access_log = access_log
+
+    def _request_id(self, scope) -> str:
+        for name, value in scope["headers"]:
+            if name == self.HEADER:
+                request_id = value.decode("latin-1")
+                if 0 < len(request_id) <= 128 and request_id.isprintable():
+                    return request_id
+        return uuid.uuid4().hex
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = RequestContext(
+            request_id=self._request_id(scope),
+            scope=scope,
+            sample_debug=self.debug_sample_rate >= 1 or random.random() < self.debug_sample_rate
+        )
+        token = request_context.set(context)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((self.HEADER, context.request_id.encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if self.access_log:
+                access_logger.info(
+                    "%s %s %s", scope["method"], scope["path"], status_code,
+                    extra={
+                        "method": scope["method"],
+                        "status": status_code,
+                        "duration_ms": round((time.perf_counter() - start) * 1000, 2)
+                    }
+                )
+            request_context.reset(token)
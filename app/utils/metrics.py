@@ -0,0 +1,312 @@
+"""
+Métricas no formato texto do Prometheus, sem dependências externas.
+
+Cada processo mantém seus contadores em memória. Com vários workers do
+uvicorn, cada um grava periodicamente um snapshot em `multiproc_dir` e o
+/metrics soma os snapshots de todos: contadores e histogramas de todos os
+processos (inclusive os que já terminaram, para os totais não voltarem),
+gauges só dos processos vivos.
+"""
+
+import asyncio
+import glob
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def describe(self) -> dict:
+        return {"type": self.type, "help": self.documentation, "labelnames": list(self.labelnames)}
+
+    def samples(self) -> List[list]:
+        with self._lock:
+            return [[list(labels), self._copy(value)] for labels, value in self._values.items()]
+
+    def _copy(self, value):
+        return value
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = float(value)
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def describe(self) -> dict:
+        description = super().describe()
+        description["buckets"] = list(self.buckets)
+        return description
+
+    def observe(self, value: float, *labels: str):
+        # Contagem por bucket (não cumulativa); o acúmulo é feito na exportação
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, *labels: str) -> "_Timer":
+        return _Timer(self, labels)
+
+    def _copy(self, value):
+        return [list(value[0]), value[1], value[2]]
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self.multiproc_dir: Optional[str] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    def _register(self, metric: Metric) -> Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Função chamada antes de cada leitura, para atualizar gauges (ex.: pool do banco)"""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> dict:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                pass
+        return {
+            name: dict(metric.describe(), samples=metric.samples())
+            for name, metric in self._metrics.items()
+        }
+
+    # Vários processos
+
+    def configure_multiprocess(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.multiproc_dir = directory
+
+    def write_snapshot(self):
+        if not self.multiproc_dir:
+            return
+        pid = os.getpid()
+        path = os.path.join(self.multiproc_dir, f"metrics_{pid}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"pid": pid, "metrics": self.snapshot()}, f)
+        os.replace(tmp_path, path)
+
+    async def start_flusher(self, interval: float):
+        if not self.multiproc_dir or self._flusher is not None:
+            return
+
+        async def flush():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    self.write_snapshot()
+                except OSError:
+                    pass
+
+        self._flusher = asyncio.create_task(flush())
+
+    async def stop_flusher(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        # Último snapshot para os contadores deste processo não se perderem
+        self.write_snapshot()
+
+    def collect(self) -> Dict[str, dict]:
+        """Métricas deste processo ou, com multiproc_dir, a soma de todos os processos"""
+        if not self.multiproc_dir:
+            return self.snapshot()
+
+        self.write_snapshot()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.multiproc_dir, "metrics_*.json")):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return merge_snapshots(snapshots)
+
+    def render(self) -> str:
+        return render_text(self.collect())
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # No Windows os.kill(pid, 0) encerraria o processo
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+def merge_snapshots(snapshots: Iterable[dict]) -> Dict[str, dict]:
+    merged: Dict[str, dict] = {}
+    for snapshot in snapshots:
+        alive = _pid_alive(snapshot.get("pid", 0))
+        for name, metric in snapshot["metrics"].items():
+            if metric["type"] == "gauge" and not alive:
+                continue
+
+            target = merged.setdefault(name, dict(metric, samples={}))
+            samples = target["samples"]
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                if metric["type"] == "histogram":
+                    current = samples.get(key)
+                    if current is None or len(current[0]) != len(value[0]):
+                        samples[key] = [list(value[0]), value[1], value[2]]
+                    else:
+                        current[0] = [a + b for a, b in zip(current[0], value[0])]
+                        current[1] += value[1]
+                        current[2] += value[2]
+                else:
+                    samples[key] = samples.get(key, 0.0) + value
+
+    for metric in merged.values():
+        metric["samples"] = [[list(labels), value] for labels, value in metric["samples"].items()]
+    return merged
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def render_text(metrics: Dict[str, dict]) -> str:
+    """Formato de exposição texto do Prometheus (versão 0.0.4)"""
+    lines = []
+    for name in sorted(metrics):
+        metric = metrics[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labelnames = metric["labelnames"]
+
+        for labels, value in sorted(metric["samples"], key=lambda sample: sample[0]):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+                continue
+
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(list(metric["buckets"]) + [math.inf], counts):
+                cumulative += bucket_count
+                le = (("le", _format_value(bound)),)
+                lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labelnames, labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "Requisições HTTP atendidas", ("method", "route", "status")
+)
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Duração das requisições HTTP", ("method", "route", "status")
+)
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que conta requisições e mede a latência por rota. Usa o
+    template da rota (/api/notes/{note_id}), não o caminho, para não criar
+    uma série por id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # O roteador do FastAPI deixa a rota encontrada em scope["route"]
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            labels = (scope["method"], route, str(status_code))
+            HTTP_REQUESTS.inc(*labels)
+            HTTP_LATENCY.observe(time.perf_counter() - start, *labels)
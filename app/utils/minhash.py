@@ -0,0 +1,71 @@
+import hashlib
+import random
+import re
+import unicodedata
+from array import array
+from typing import List, Set
+
+NUM_PERM = 128
+LSH_BANDS = 32
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_RE = re.compile(r"\w+")
+
+# Parâmetros fixos das permutações: mudar a semente invalida as assinaturas salvas
+_rng = random.Random(20240601)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """Conjunto de hashes das sequências de `size` palavras do texto normalizado"""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    words = _WORD_RE.findall(text)
+
+    if len(words) < size:
+        return {_hash64(" ".join(words).encode("utf-8"))} if words else set()
+
+    return {
+        _hash64(" ".join(words[i:i + size]).encode("utf-8"))
+        for i in range(len(words) - size + 1)
+    }
+
+def shingles_digest(shingle_hashes: Set[int]) -> bytes:
+    """Resumo do conjunto de shingles; igual quando a edição não muda o conjunto"""
+    return hashlib.blake2b(array("Q", sorted(shingle_hashes)).tobytes(), digest_size=16).digest()
+
+def signature(shingle_hashes: Set[int]) -> List[int]:
+    """Assinatura MinHash com NUM_PERM permutações"""
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in shingle_hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+def pack_signature(values: List[int]) -> bytes:
+    return array("I", values).tobytes()
+
+def unpack_signature(data: bytes) -> List[int]:
+    values = array("I")
+    values.frombytes(data)
+    return values.tolist()
+
+def lsh_buckets(values: List[int]) -> List[int]:
+    """Um bucket por banda; assinaturas parecidas colidem em pelo menos uma banda"""
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = values[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        # 63 bits para caber em BIGINT com sinal
+        buckets.append(_hash64(array("I", rows).tobytes()) & 0x7FFFFFFFFFFFFFFF)
+    return buckets
+
+def estimate_similarity(a: List[int], b: List[int]) -> float:
+    """Estimativa da similaridade de Jaccard entre duas assinaturas"""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+class OverlapCursor:
+    """
+    Posição de leitura das linhas novas de uma tabela gravada por vários
+    workers. Um cursor "id maior que o último lido" pula linhas que ficam
+    visíveis fora de ordem: a transação que pegou o id menor faz commit
+    depois da que pegou o maior. Aqui cada leitura pega as linhas com
+    created_at >= since, com since recuado de `overlap` em relação à leitura
+    anterior, e as que já foram lidas são descartadas pelo id.
+    """
+
+    def __init__(self, overlap: timedelta):
+        self.overlap = overlap
+        self.since: Optional[datetime] = None  # None até a primeira leitura
+        self._seen: Dict[int, datetime] = {}
+
+    def seen(self, row_id: int, created_at: Optional[datetime]) -> bool:
+        """True se a linha já foi lida; senão a registra como lida"""
+        if row_id in self._seen:
+            return True
+        if created_at is not None:
+            self._seen[row_id] = created_at
+        return False
+
+    def advance(self, read_started: datetime):
+        """Próxima leitura volta `overlap` antes do início desta"""
+        self.move_to(read_started - self.overlap)
+
+    def move_to(self, since: datetime):
+        """Próxima leitura começa em `since`; as linhas anteriores não voltam mais"""
+        self.since = since
+        self._seen = {row_id: created_at for row_id, created_at in self._seen.items() if created_at >= since}
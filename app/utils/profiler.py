@@ -0,0 +1,157 @@
+"""
+Profiler estatístico por requisição, ligado só quando PROFILER_ENABLED=true.
+
+Uma thread amostra a pilha da thread do event loop a cada intervalo e só
+conta as amostras em que a task da requisição perfilada é a que está
+executando; assim outras requisições concorrentes não entram no perfil.
+O resultado é gravado no formato "folded" (uma pilha por linha seguida da
+contagem), aceito por flamegraph.pl, speedscope e inferno.
+"""
+
+import asyncio
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+
+# Prefixos removidos dos nomes de arquivo: raiz do projeto, site-packages e stdlib
+_ROOTS = sorted(
+    {os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))}
+    | {path for path in sys.path if path and os.path.isdir(path)},
+    key=len,
+    reverse=True
+)
+_labels: Dict[object, str] = {}
+
+def _frame_label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        for root in _ROOTS:
+            if filename.startswith(root + os.sep):
+                filename = filename[len(root) + 1:]
+                break
+        label = f"{filename.replace(os.sep, '/')}:{code.co_name}".replace(" ", "_").replace(";", ":")
+        _labels[code] = label
+    return label
+
+class RequestSampler(threading.Thread):
+    """Amostra a thread do loop enquanto `task` estiver executando nela"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, task: asyncio.Task, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.loop = loop
+        self.task = task
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            # Com o loop explícito, current_task funciona fora da thread do loop
+            if asyncio.current_task(self.loop) is not self.task:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.stacks[";".join(stack)] += 1
+                self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9{}_-]+", "_", value).strip("_")[:80] or "root"
+
+class ProfileWriter:
+    """Grava os perfis num diretório, mantendo só os `max_files` mais recentes"""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+
+    def write(self, sampler: RequestSampler, method: str, route: str, user_id, duration: float) -> Optional[str]:
+        if not sampler.stacks:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+
+        name = "_".join([
+            datetime.utcnow().strftime("%Y%m%dT%H%M%S%f"),
+            method,
+            _slug(route),
+            f"u{user_id}" if user_id is not None else "anon",
+            f"{int(duration * 1000)}ms"
+        ]) + ".folded"
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        self._rotate()
+        return path
+
+    def _rotate(self):
+        files = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".folded")),
+            key=lambda entry: entry.name
+        )
+        for entry in files[:-self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+class ProfilerMiddleware:
+    """
+    Perfila uma fração `sample_rate` das requisições e qualquer requisição
+    com o cabeçalho X-Debug-Profile igual ao token configurado. Quando o
+    profiler está desligado o middleware nem é instalado.
+    """
+
+    HEADER = b"x-debug-profile"
+
+    def __init__(self, app, directory: str, sample_rate: float = 0.0, debug_token: str = "",
+                 interval: float = 0.005, max_files: int = 200):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.debug_token = debug_token.encode()
+        self.interval = interval
+        self.writer = ProfileWriter(directory, max_files)
+
+    def _should_profile(self, scope) -> bool:
+        if self.debug_token:
+            for name, value in scope["headers"]:
+                if name == self.HEADER:
+                    return hmac.compare_digest(value, self.debug_token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = RequestSampler(asyncio.get_running_loop(), asyncio.current_task(), self.interval)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            sampler.stop()
+            duration = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            # get_current_user guarda o id do usuário autenticado em request.state
+            user_id = scope.get("state", {}).get("user_id")
+            await asyncio.to_thread(self.writer.write, sampler, scope["method"], route, user_id, duration)
@@ -2,8 +2,8 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+import hashlib
 import secrets
-import string
 from ..config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -24,25 +24,33 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     
-    to_encode.update({"exp": expire})
+    # jti identifica o token para revogação individual (logout)
+    to_encode.update({"exp": expire, "jti": secrets.token_hex(16)})
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[str]:
-    """Verifica e decodifica token JWT"""
+def decode_access_token(token: str) -> Optional[dict]:
+    """Verifica o token JWT e retorna as claims, ou None se inválido/vencido"""
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        return email
     except JWTError:
         return None
+    if payload.get("sub") is None:
+        return None
+    return payload
+
+def verify_token(token: str) -> Optional[str]:
+    """Verifica e decodifica token JWT"""
+    payload = decode_access_token(token)
+    return payload["sub"] if payload else None
 
 def generate_reset_token() -> str:
-    """Gera token aleatório para reset de senha"""
-    alphabet = string.ascii_letters + string.digits
-    return ''.join(secrets.choice(alphabet) for _ in range(32))
+    """Gera token aleatório para reset de senha (256 bits, seguro para URL)"""
+    return secrets.token_urlsafe(32)
+
+def hash_reset_token(token: str) -> str:
+    """Hash guardado no banco; o token em si só existe no email"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
 def create_reset_token_expires() -> datetime:
     """Cria data de expiração para token de reset"""
@@ -0,0 +1,131 @@
+# scripts/bench_dashboard.py
+"""
+Compara a latência da tela inicial: as quatro chamadas de antes
+(/api/users/me, /api/subjects/, /api/notes/ e /api/calendar/) contra o
+/api/dashboard. As requisições passam pelo app inteiro (middlewares,
+autenticação, banco), no próprio processo. Cria um usuário com dados no
+banco configurado; use um banco descartável:
+
+    DATABASE_URL=sqlite:////tmp/bench.db python scripts/bench_dashboard.py --notes 300
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+import logging
+import statistics
+from datetime import date, timedelta
+
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("LOG_ACCESS", "false")
+
+# Adicionar o diretório do app ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+from app.database import SessionLocal
+from app.main import app
+from app.models import User, Subject, Note, EventType, CalendarEvent
+from app.utils.security import create_access_token
+
+# Uma linha de log por requisição do cliente atrapalharia a leitura
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+FOUR_CALLS = ["/api/users/me", "/api/subjects/", "/api/notes/", "/api/calendar/"]
+
+def seed(subjects: int, notes: int, events: int) -> str:
+    """Cria um usuário com matérias, anotações e eventos; retorna um token de acesso"""
+    db = SessionLocal()
+    try:
+        event_type = db.query(EventType).first()
+        if event_type is None:
+            event_type = EventType(name="Prova", default_reminder_days=1)
+            db.add(event_type)
+            db.commit()
+
+        user = User(email=f"bench-dashboard-{time.time_ns()}@example.com", name="Bench", password_hash="-")
+        db.add(user)
+        db.flush()
+        subject_rows = [Subject(name=f"Matéria {i}", period=1 + i % 8, user_id=user.id) for i in range(subjects)]
+        db.add_all(subject_rows)
+        db.flush()
+
+        body = "Resumo da aula com definições, exemplos e exercícios. " * 40
+        db.add_all([
+            Note(title=f"Anotação {i}", content=body, subject_id=subject_rows[i % subjects].id, user_id=user.id)
+            for i in range(notes)
+        ])
+        db.add_all([
+            CalendarEvent(
+                title=f"Evento {i}",
+                event_date=date.today() + timedelta(days=i - events // 4),
+                event_type_id=event_type.id,
+                subject_id=subject_rows[i % subjects].id,
+                user_id=user.id
+            )
+            for i in range(events)
+        ])
+        db.commit()
+        return create_access_token({"sub": user.email, "uid": user.id, "ver": 0})
+    finally:
+        db.close()
+
+def summary(label: str, samples: list):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<28} média {statistics.mean(samples):7.2f} ms   p50 {statistics.median(samples):7.2f} ms   p95 {p95:7.2f} ms")
+
+async def measure(client: httpx.AsyncClient, iterations: int, flow) -> list:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await flow(client)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+async def main(subjects: int, notes: int, events: int, iterations: int):
+    token = seed(subjects, notes, events)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def sequential(client):
+        for path in FOUR_CALLS:
+            (await client.get(path)).raise_for_status()
+
+    async def parallel(client):
+        for response in await asyncio.gather(*(client.get(path) for path in FOUR_CALLS)):
+            response.raise_for_status()
+
+    async def dashboard(client):
+        (await client.get("/api/dashboard")).raise_for_status()
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            # Aquecimento: pool do banco, caches de compilação do SQLAlchemy
+            for flow in (sequential, dashboard):
+                await measure(client, 5, flow)
+
+            response = await client.get("/api/dashboard")
+            payload = response.json()
+            four_calls_bytes = sum([len((await client.get(path)).content) for path in FOUR_CALLS])
+            print(f"Dados: {subjects} matérias, {notes} anotações, {events} eventos")
+            print(f"Resposta do dashboard: {len(response.content)} bytes (as quatro chamadas: {four_calls_bytes} bytes)")
+            print(f"  {len(payload['subjects'])} matérias, {len(payload['recent_notes'])} anotações, "
+                  f"{len(payload['upcoming_events'])} eventos")
+            print()
+
+            summary("4 chamadas em sequência", await measure(client, iterations, sequential))
+            summary("4 chamadas em paralelo", await measure(client, iterations, parallel))
+            summary("/api/dashboard", await measure(client, iterations, dashboard))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subjects", type=int, default=12)
+    parser.add_argument("--notes", type=int, default=300)
+    parser.add_argument("--events", type=int, default=60)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.subjects, args.notes, args.events, args.iterations))
@@ -0,0 +1,91 @@
+# scripts/bench_email.py
+"""
+Compara uma conexão SMTP nova por mensagem (aiosmtplib.send) com o pool
+do EmailService (send_many) contra o SMTP stub (scripts/smtp_stub_server.py),
+que sobe no próprio processo.
+
+    python scripts/bench_email.py --messages 1000
+    STUB_SMTP_LATENCY_MS=20 python scripts/bench_email.py
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+
+# O stub roda sem TLS; precisa valer antes de carregar as configurações
+os.environ.setdefault("SMTP_HOST", "127.0.0.1")
+os.environ.setdefault("SMTP_PORT", "8025")
+os.environ.setdefault("SMTP_START_TLS", "false")
+os.environ.setdefault("DEBUG", "false")
+
+# Adicionar o diretório do app ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.dirname(__file__))
+
+import aiosmtplib
+from app.config import settings
+from app.services.email_service import email_service
+from smtp_stub_server import start_server, SMTPStats
+
+def build_messages(total: int):
+    return [
+        email_service.build_reminder_email(
+            to_email=f"aluno{i}@example.com",
+            user_name=f"Aluno {i}",
+            event_title="Prova de Cálculo",
+            event_date="20/10/2026",
+            event_type="Prova",
+            days_until=1
+        )
+        for i in range(total)
+    ]
+
+async def per_message_connection(messages, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(message):
+        async with semaphore:
+            await aiosmtplib.send(
+                message,
+                hostname=settings.smtp_host,
+                port=settings.smtp_port,
+                start_tls=False
+            )
+
+    await asyncio.gather(*(send(message) for message in messages))
+
+async def pooled(messages, concurrency: int):
+    results = await email_service.send_many(messages)
+    if not all(results):
+        print(f"  {results.count(False)} mensagens falharam")
+
+async def run(name, func, messages, concurrency):
+    SMTPStats.connections = SMTPStats.messages = 0
+    start = time.perf_counter()
+    await func(messages, concurrency)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:>24}: {len(messages) / elapsed:7.1f} msg/s  "
+        f"({SMTPStats.messages} mensagens, {SMTPStats.connections} conexões)"
+    )
+
+async def main(total: int):
+    server = await start_server(settings.smtp_host, settings.smtp_port)
+    try:
+        messages = build_messages(total)
+        concurrency = settings.smtp_pool_size
+        await run("conexão por mensagem", per_message_connection, messages, concurrency)
+        await run("pool (send_many)", pooled, messages, concurrency)
+        await email_service.close()
+    finally:
+        server.close()
+        await server.wait_closed()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=1000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.messages))
@@ -0,0 +1,74 @@
+# scripts/bench_llm_client.py
+"""
+Compara um AsyncClient novo por requisição com o cliente compartilhado
+(app.services.llm_client) contra o servidor stub (scripts/llm_stub_server.py).
+
+    python scripts/llm_stub_server.py &
+    LLM_BASE_URL=http://127.0.0.1:8900/v1 python scripts/bench_llm_client.py
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+import statistics
+
+# Adicionar o diretório do app ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+from app.services.llm_client import llm_client
+
+MESSAGES = [{"role": "user", "content": "Crie exatamente 5 flashcards"}]
+
+async def per_request_client():
+    provider = llm_client.provider
+    async with httpx.AsyncClient() as client:
+        response = await client.post(
+            provider.chat_url,
+            headers=provider.headers(),
+            json=provider.chat_payload(MESSAGES),
+            timeout=30.0
+        )
+        response.raise_for_status()
+
+async def shared_client():
+    await llm_client.chat(MESSAGES)
+
+async def run(name, func, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await func()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(total)])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:>18}: {total / elapsed:7.1f} req/s  "
+        f"p50 {statistics.median(latencies):6.1f} ms  p95 {p95:6.1f} ms"
+    )
+
+async def main(total, concurrency):
+    await llm_client.start()
+    try:
+        await run("client per request", per_request_client, total, concurrency)
+        await run("shared client", shared_client, total, concurrency)
+    finally:
+        await llm_client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,106 @@
+# scripts/bench_reminders.py
+"""
+Mede a vazão do disparador de lembretes (app.services.calendar_service)
+contra o SMTP stub (scripts/smtp_stub_server.py), que sobe no próprio
+processo. Cria usuários e eventos vencidos no banco configurado; use um
+banco descartável:
+
+    DATABASE_URL=sqlite:////tmp/bench.db python scripts/bench_reminders.py --users 200
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+from datetime import date, datetime, timedelta, timezone
+
+# O stub roda sem TLS; precisa valer antes de carregar as configurações
+os.environ.setdefault("SMTP_HOST", "127.0.0.1")
+os.environ.setdefault("SMTP_PORT", "8025")
+os.environ.setdefault("SMTP_START_TLS", "false")
+os.environ.setdefault("DEBUG", "false")
+
+# Adicionar o diretório do app ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.dirname(__file__))
+
+from app.config import settings
+from app.database import SessionLocal, engine, Base, sync_schema
+from app.models import User, UserSettings, EventType, CalendarEvent
+from app.services.calendar_service import reminder_dispatcher
+from app.services.email_service import email_service
+from smtp_stub_server import start_server, SMTPStats
+
+TIMEZONES = ["America/Sao_Paulo", "America/Manaus", "Europe/Lisbon", "Asia/Tokyo"]
+
+def seed(users: int, events_per_user: int, today: date, digest: bool):
+    """Cria usuários de teste com eventos para amanhã e ainda sem lembrete"""
+    db = SessionLocal()
+    try:
+        event_type = db.query(EventType).first()
+        if event_type is None:
+            event_type = EventType(name="Prova", default_reminder_days=1)
+            db.add(event_type)
+            db.commit()
+
+        tomorrow = today + timedelta(days=1)
+        for i in range(users):
+            user = User(email=f"bench-reminder-{time.time_ns()}-{i}@example.com", name=f"Usuário {i}", password_hash="-")
+            user.settings = UserSettings(
+                timezone=TIMEZONES[i % len(TIMEZONES)],
+                reminder_digest=digest,
+                digest_hour=8
+            )
+            db.add(user)
+            db.flush()
+            db.add_all([
+                CalendarEvent(
+                    title=f"Evento {j}",
+                    event_date=tomorrow,
+                    event_type_id=event_type.id,
+                    user_id=user.id,
+                    reminder_days=2,
+                    reminder_sent=False
+                )
+                for j in range(events_per_user)
+            ])
+        db.commit()
+    finally:
+        db.close()
+
+async def main(users: int, events_per_user: int, digest: bool):
+    # 12h UTC: todos os fusos de teste já passaram de reminder_send_hour
+    now = datetime.now(timezone.utc).replace(hour=12, minute=0)
+    Base.metadata.create_all(bind=engine)
+    sync_schema()
+    seed(users, events_per_user, now.date(), digest)
+
+    server = await start_server(settings.smtp_host, settings.smtp_port)
+    try:
+        start = time.perf_counter()
+        stats = await reminder_dispatcher.run_once(now=now)
+        elapsed = time.perf_counter() - start
+        await email_service.close()
+    finally:
+        server.close()
+        await server.wait_closed()
+
+    if stats is None:
+        print("Outro processo está com a trava dos lembretes")
+        return
+
+    print(f"Eventos lidos:    {stats.scanned}")
+    print(f"Lembretes:        {stats.sent} enviados, {stats.failed} com erro")
+    print(f"Resumos diários:  {stats.digests}")
+    print(f"Conexões SMTP:    {SMTPStats.connections}")
+    print(f"Tempo total:      {elapsed:.2f}s ({stats.sent / elapsed:.1f} lembretes/s)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--events-per-user", type=int, default=3)
+    parser.add_argument("--digest", action="store_true", help="usuários com resumo diário")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.users, args.events_per_user, args.digest))
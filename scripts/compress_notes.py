@@ -0,0 +1,97 @@
+# scripts/compress_notes.py
+"""Comprime em lotes o conteúdo das anotações que ainda estão em texto puro"""
+
+import sys
+import os
+import argparse
+
+# Adicionar o diretório do app ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import select, update, bindparam
+from app.config import settings
+from app.database import SessionLocal, sync_schema
+from app.models.note import Note
+from app.utils.compression import compress_text
+
+notes_table = Note.__table__
+
+def compress_existing_notes(batch_size: int = 500):
+    """Percorre as anotações por id e comprime as que passam do limite configurado"""
+    db = SessionLocal()
+    last_id = 0
+    scanned = compressed = 0
+    raw_bytes = stored_bytes = 0
+
+    # Mantém updated_at intacto: o backfill não é uma edição do usuário
+    stmt = (
+        update(notes_table)
+        .where(notes_table.c.id == bindparam("b_id"))
+        .values(
+            content="",
+            content_compressed=bindparam("b_data"),
+            content_codec=bindparam("b_codec"),
+            updated_at=notes_table.c.updated_at
+        )
+    )
+
+    try:
+        while True:
+            rows = db.execute(
+                select(notes_table.c.id, notes_table.c.content)
+                .where(notes_table.c.id > last_id, notes_table.c.content_codec.is_(None))
+                .order_by(notes_table.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            params = []
+            for note_id, content in rows:
+                content = content or ""
+                size = len(content.encode("utf-8"))
+                raw_bytes += size
+
+                result = compress_text(
+                    content,
+                    codec=settings.note_compression_codec,
+                    threshold=settings.note_compression_threshold,
+                    level=settings.note_compression_level
+                )
+                if result is None:
+                    stored_bytes += size
+                    continue
+
+                codec, data = result
+                stored_bytes += len(data)
+                params.append({"b_id": note_id, "b_codec": codec, "b_data": data})
+
+            if params:
+                db.execute(stmt, params)
+                db.commit()
+
+            scanned += len(rows)
+            compressed += len(params)
+            last_id = rows[-1][0]
+            print(f"{scanned} anotações verificadas, {compressed} comprimidas...")
+
+    except Exception as e:
+        print(f"Erro ao comprimir anotações: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    if raw_bytes:
+        ratio = stored_bytes / raw_bytes
+        print(f"Conteúdo original: {raw_bytes} bytes; armazenado: {stored_bytes} bytes ({ratio:.1%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    print("Comprimindo anotações existentes...")
+    sync_schema()
+    compress_existing_notes(batch_size=args.batch_size)
+    print("Concluído!")
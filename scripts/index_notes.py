@@ -0,0 +1,55 @@
+# scripts/index_notes.py
+"""Indexa em lotes as anotações que ainda não têm assinatura de similaridade"""
+
+import sys
+import os
+import argparse
+
+# Adicionar o diretório do app ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import SessionLocal
+from app.models import Note, NoteSignature
+from app.services.note_service import index_note_similarity
+
+def index_existing_notes(batch_size: int = 200):
+    """Calcula MinHash/LSH das anotações sem assinatura, em ordem de id"""
+    db = SessionLocal()
+    last_id = 0
+    indexed = 0
+
+    try:
+        while True:
+            notes = db.query(Note).outerjoin(
+                NoteSignature, NoteSignature.note_id == Note.id
+            ).filter(
+                Note.id > last_id,
+                NoteSignature.note_id.is_(None)
+            ).order_by(Note.id).limit(batch_size).all()
+            if not notes:
+                break
+
+            for note in notes:
+                index_note_similarity(db, note)
+            db.commit()
+
+            indexed += len(notes)
+            last_id = notes[-1].id
+            db.expunge_all()
+            print(f"{indexed} anotações indexadas...")
+
+    except Exception as e:
+        print(f"Erro ao indexar anotações: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    print("Indexando anotações existentes...")
+    index_existing_notes(batch_size=args.batch_size)
+    print("Concluído!")
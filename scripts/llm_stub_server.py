@@ -0,0 +1,77 @@
+# scripts/llm_stub_server.py
+"""
+Servidor local que imita a API /chat/completions (Groq/OpenAI) para testes
+e benchmarks sem custo. Aponte o app para ele com:
+
+    LLM_BASE_URL=http://127.0.0.1:8900/v1 uvicorn app.main:app
+
+Variáveis de ambiente:
+    STUB_LATENCY_MS     latência simulada por resposta (padrão 200)
+    STUB_FAILURE_RATE   fração de respostas com erro 503/429 (padrão 0)
+    STUB_TOKEN_DELAY_MS intervalo entre pedaços no modo stream (padrão 20)
+"""
+
+import asyncio
+import json
+import os
+import random
+import argparse
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "200"))
+FAILURE_RATE = float(os.getenv("STUB_FAILURE_RATE", "0"))
+TOKEN_DELAY_MS = float(os.getenv("STUB_TOKEN_DELAY_MS", "20"))
+
+app = FastAPI(title="LLM stub")
+
+def fake_flashcards(count: int) -> list:
+    return [
+        {"question": f"Pergunta {i + 1}?", "answer": f"Resposta {i + 1}."}
+        for i in range(count)
+    ]
+
+def requested_count(body: dict) -> int:
+    prompt = body["messages"][-1]["content"]
+    for word in prompt.split():
+        if word.isdigit():
+            return int(word)
+    return 5
+
+async def stream_content(content: str):
+    # Pedaços de ~8 caracteres, como tokens chegando do modelo
+    for i in range(0, len(content), 8):
+        chunk = {"choices": [{"index": 0, "delta": {"content": content[i:i + 8]}}]}
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        await asyncio.sleep(TOKEN_DELAY_MS / 1000)
+    yield "data: [DONE]\n\n"
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await asyncio.sleep(LATENCY_MS / 1000)
+
+    if random.random() < FAILURE_RATE:
+        status_code = random.choice([429, 503])
+        return JSONResponse({"error": {"message": "stub failure"}}, status_code=status_code)
+
+    content = "```json\n" + json.dumps(fake_flashcards(requested_count(body)), ensure_ascii=False) + "\n```"
+    if body.get("stream"):
+        return StreamingResponse(stream_content(content), media_type="text/event-stream")
+
+    return {
+        "id": "stub",
+        "object": "chat.completion",
+        "model": body.get("model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}]
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="LLM stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    args = parser.parse_args()
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,217 @@
+# scripts/load_events.py
+"""
+Teste de carga do canal de eventos: abre milhares de conexões ociosas
+(SSE ou WebSocket) contra um servidor rodando, mede a memória dos workers
+por conexão e o tempo até uma alteração chegar a todas as conexões do
+usuário. Cria os usuários direto no banco configurado, então use o mesmo
+.env do servidor e um banco descartável:
+
+    EVENTS_BACKEND=database SERVER_WORKERS=2 python -m app.server &
+    python scripts/load_events.py --connections 4000 --pids <pids dos workers>
+
+O servidor precisa de um limite de arquivos abertos maior que o número de
+conexões (ulimit -n). WebSocket exige o pacote websockets.
+"""
+
+import sys
+import os
+import time
+import json
+import asyncio
+import argparse
+import logging
+import random
+import resource
+import statistics
+from urllib.parse import urlsplit
+
+os.environ.setdefault("LOG_ACCESS", "false")
+
+# Adicionar o diretório do app ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+from app.database import SessionLocal
+from app.models import User
+from app.utils.security import create_access_token
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+def seed(users: int) -> list:
+    """Cria os usuários do teste; retorna um token de acesso por usuário"""
+    db = SessionLocal()
+    try:
+        stamp = time.time_ns()
+        rows = [User(email=f"load-events-{stamp}-{i}@example.com", name="Load", password_hash="-") for i in range(users)]
+        db.add_all(rows)
+        db.commit()
+        return [create_access_token({"sub": row.email, "uid": row.id, "ver": 0}) for row in rows]
+    finally:
+        db.close()
+
+def rss_kb(pids: list) -> int:
+    """Soma do VmRSS dos processos, em KB"""
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        except FileNotFoundError:
+            pass
+    return total
+
+def percentile(samples: list, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[max(int(len(samples) * fraction) - 1, 0)]
+
+class Connection:
+    """Uma conexão de eventos; registra quando cada mensagem chegou"""
+
+    def __init__(self, user: int):
+        self.user = user
+        self.received = {}  # id do subject criado -> instante de chegada
+        self.pings = 0
+        self.ready = asyncio.Event()
+        self.error = None
+
+    def handle(self, message: dict):
+        if message["type"] == "ready":
+            self.ready.set()
+        elif message["type"] == "ping":
+            self.pings += 1
+        elif message["type"] == "subject.created":
+            self.received[message["id"]] = time.perf_counter()
+
+    async def run_sse(self, host: str, port: int, path: str):
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode())
+            await writer.drain()
+            status_line = await reader.readline()
+            if b" 200 " not in status_line:
+                raise RuntimeError(status_line.decode().strip() or "connection closed")
+            while (await reader.readline()) not in (b"\r\n", b""):
+                pass
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                if line.startswith(b": ping"):
+                    self.pings += 1
+                # Corpo em chunked: as linhas de tamanho não começam com "data: "
+                elif line.startswith(b"data: "):
+                    self.handle(json.loads(line[6:]))
+        except Exception as exc:
+            self.error = exc
+            self.ready.set()
+
+    async def run_ws(self, url: str):
+        import websockets
+        try:
+            async with websockets.connect(url, ping_interval=None, max_queue=4) as websocket:
+                async for text in websocket:
+                    self.handle(json.loads(text))
+        except Exception as exc:
+            self.error = exc
+            self.ready.set()
+
+async def main(args):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = args.connections + 256
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+    tokens = seed(args.users)
+    base = urlsplit(args.url)
+    host, port = base.hostname, base.port or 80
+    pids = [int(pid) for pid in args.pids]
+
+    rss_before = rss_kb(pids)
+    connections = [Connection(i % args.users) for i in range(args.connections)]
+    tasks = []
+    start = time.perf_counter()
+    for index, connection in enumerate(connections):
+        token = tokens[connection.user]
+        if args.transport == "ws":
+            ws_url = f"ws://{host}:{port}/api/events/ws?access_token={token}"
+            tasks.append(asyncio.create_task(connection.run_ws(ws_url)))
+        else:
+            tasks.append(asyncio.create_task(connection.run_sse(host, port, f"/api/events/stream?access_token={token}")))
+        # Em lotes, para não estourar o backlog de conexões do servidor
+        if index % args.batch == args.batch - 1:
+            await asyncio.gather(*(c.ready.wait() for c in connections[index + 1 - args.batch:index + 1]))
+    await asyncio.gather(*(c.ready.wait() for c in connections))
+    connect_seconds = time.perf_counter() - start
+
+    failed = [c for c in connections if c.error is not None]
+    opened = len(connections) - len(failed)
+    print(f"Conexões ({args.transport}): {opened} abertas, {len(failed)} falharam em {connect_seconds:.1f} s")
+    if failed:
+        print(f"  primeiro erro: {failed[0].error!r}")
+
+    await asyncio.sleep(2)
+    rss_after = rss_kb(pids)
+    if pids and opened:
+        delta = rss_after - rss_before
+        print(f"Memória dos workers: {rss_before / 1024:.1f} MB -> {rss_after / 1024:.1f} MB "
+              f"({delta * 1024 / opened / 1024:.1f} KB por conexão)")
+
+    # Fan-out: cada alteração precisa chegar a todas as conexões do usuário
+    latencies = []
+    missed = 0
+    async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+        for i in range(args.publishes):
+            # Sem pausa aleatória as alterações entram em fase com a leitura do backend
+            await asyncio.sleep(random.uniform(0, 1))
+            user = i % args.users
+            targets = [c for c in connections if c.user == user and c.error is None]
+            sent = time.perf_counter()
+            response = await client.post(
+                "/api/subjects/",
+                json={"name": f"Carga {i}", "period": 1},
+                headers={"Authorization": f"Bearer {tokens[user]}"}
+            )
+            response.raise_for_status()
+            subject_id = response.json()["id"]
+            deadline = sent + args.timeout
+            while time.perf_counter() < deadline and not all(subject_id in c.received for c in targets):
+                await asyncio.sleep(0.005)
+            arrivals = [c.received[subject_id] for c in targets if subject_id in c.received]
+            missed += len(targets) - len(arrivals)
+            if arrivals:
+                latencies.append((max(arrivals) - sent) * 1000)
+
+    if latencies:
+        print(f"Alteração -> todas as conexões do usuário ({args.connections // args.users} por usuário): "
+              f"p50 {statistics.median(latencies):.1f} ms   p95 {percentile(latencies, 0.95):.1f} ms   "
+              f"máx {max(latencies):.1f} ms   não entregues {missed}")
+
+    if args.hold:
+        print(f"Mantendo as conexões ociosas por {args.hold} s...")
+        await asyncio.sleep(args.hold)
+        alive = sum(1 for c in connections if c.error is None and not tasks[connections.index(c)].done())
+        pings = sum(c.pings for c in connections)
+        print(f"  {alive} ainda abertas, {pings} heartbeats recebidos")
+        if pids:
+            print(f"  memória dos workers: {rss_kb(pids) / 1024:.1f} MB")
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--transport", choices=("sse", "ws"), default="sse")
+    parser.add_argument("--connections", type=int, default=4000)
+    parser.add_argument("--users", type=int, default=400)
+    parser.add_argument("--batch", type=int, default=200, help="conexões abertas por vez")
+    parser.add_argument("--publishes", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=10.0, help="espera máxima por uma entrega, em segundos")
+    parser.add_argument("--hold", type=int, default=0, help="segundos mantendo as conexões ociosas no fim")
+    parser.add_argument("--pids", nargs="*", default=[], help="pids dos workers, para medir a memória")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,74 @@
+# scripts/smtp_stub_server.py
+"""
+Servidor SMTP local que aceita e descarta as mensagens, para testes e
+benchmarks de envio de email sem um provedor real. Aponte o app para ele com:
+
+    SMTP_HOST=127.0.0.1 SMTP_PORT=8025 SMTP_START_TLS=false uvicorn app.main:app
+
+Variáveis de ambiente:
+    STUB_SMTP_LATENCY_MS  latência simulada por comando (padrão 5)
+"""
+
+import asyncio
+import os
+import argparse
+
+LATENCY_MS = float(os.getenv("STUB_SMTP_LATENCY_MS", "5"))
+
+class SMTPStats:
+    connections = 0
+    messages = 0
+
+async def reply(writer: asyncio.StreamWriter, line: str):
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+    writer.write(f"{line}\r\n".encode())
+    await writer.drain()
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    SMTPStats.connections += 1
+    await reply(writer, "220 localhost SMTP stub")
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode(errors="replace").strip().upper()
+
+            if command.startswith(("EHLO", "HELO")):
+                writer.write(b"250-localhost\r\n250-8BITMIME\r\n250-SMTPUTF8\r\n")
+                await reply(writer, "250 SIZE 10485760")
+            elif command == "DATA":
+                await reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                while (await reader.readline()) not in (b".\r\n", b".\n", b""):
+                    pass
+                SMTPStats.messages += 1
+                await reply(writer, "250 OK: queued")
+            elif command == "QUIT":
+                await reply(writer, "221 Bye")
+                break
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                await reply(writer, "250 OK")
+            else:
+                await reply(writer, "502 Command not implemented")
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+async def start_server(host: str = "127.0.0.1", port: int = 8025) -> asyncio.AbstractServer:
+    return await asyncio.start_server(handle, host, port)
+
+async def main(host: str, port: int):
+    server = await start_server(host, port)
+    print(f"SMTP stub ouvindo em {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.host, args.port))
@@ -0,0 +1,55 @@
+import copy
+import random
+
+import pytest
+
+from app.services.auth_throttle import MemoryRateLimitBackend
+
+KEY = "login:ip:10.0.0.1"
+
+def _accepted_at(backend: MemoryRateLimitBackend, limit: int, window: float, now: float) -> bool:
+    # Sonda numa cópia: hit registra a tentativa quando aceita
+    probe = MemoryRateLimitBackend(max_keys=backend.max_keys)
+    probe._windows = copy.deepcopy(backend._windows)
+    return probe.hit(KEY, limit, window, now=now) == 0.0
+
+def _assert_exact(backend, limit, window, now, retry_after):
+    """Recusada logo antes de Retry-After, aceita logo depois (salvo o mínimo de 1 s)"""
+    if retry_after > 1.0:
+        assert not _accepted_at(backend, limit, window, now + retry_after - 0.01)
+    assert _accepted_at(backend, limit, window, now + retry_after + 0.01)
+
+def test_retry_after_within_window_with_previous_weight():
+    backend = MemoryRateLimitBackend(max_keys=10)
+    for t in (0, 1, 2):
+        assert backend.hit(KEY, 3, 60, now=t) == 0.0
+    # Começo da janela seguinte: o peso da anterior ainda deixa passar uma
+    assert backend.hit(KEY, 3, 60, now=61) == 0.0
+
+    retry_after = backend.hit(KEY, 3, 60, now=62)
+    # 3 × (1 - t/60) + 1 < 3 a partir de t = 20 s da janela, ou seja, 18 s depois
+    assert retry_after == pytest.approx(18)
+    _assert_exact(backend, 3, 60, 62, retry_after)
+
+def test_retry_after_in_next_window():
+    backend = MemoryRateLimitBackend(max_keys=10)
+    for t in (0, 1, 2):
+        assert backend.hit(KEY, 3, 60, now=t) == 0.0
+
+    retry_after = backend.hit(KEY, 3, 60, now=3)
+    assert retry_after == pytest.approx(57)
+    _assert_exact(backend, 3, 60, 3, retry_after)
+
+@pytest.mark.parametrize("seed", range(20))
+def test_retry_after_matches_acceptance(seed):
+    rng = random.Random(seed)
+    limit = rng.randint(1, 10)
+    window = rng.choice((30.0, 60.0, 300.0))
+    backend = MemoryRateLimitBackend(max_keys=10)
+
+    now = 0.0
+    for _ in range(200):
+        now += rng.uniform(0, window / limit)
+        retry_after = backend.hit(KEY, limit, window, now=now)
+        if retry_after:
+            _assert_exact(backend, limit, window, now, retry_after)